@@ -0,0 +1,292 @@
+"""
+Backfill mistakes from feedback that was stored before mistake extraction existed.
+
+Streams db.feedback in _id order with a batch cursor, extracts and stores
+mistakes for each batch on a bounded thread pool (through
+MistakeService.process_feedback_batch, the same path as live feedback, which
+writes with bulk upserts and marks the feedback `mistakes_extracted_at`), and
+checkpoints the last fully processed _id in db.backfill_checkpoints.
+
+Stopping and restarting is safe: a run resumes after the checkpoint, and
+feedback already marked as extracted (by an earlier run or by the live
+EventHandler) is skipped. The run only covers feedback that existed when
+the backfill was first started; newer feedback is handled live. A rate
+limit on feedback per second keeps the backfill from starving live traffic.
+
+Usage (from the backend directory):
+    python -m app.commands.backfill_mistakes [--rate 50] [--workers 2] [--batch-size 100] [--restart]
+"""
+
+import argparse
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+
+from app.config.database import db
+from app.utils.load_smoothing import due_load_balancer
+from app.utils.mistake_service import MistakeService
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_ID = "mistakes_from_feedback"
+
+# Feedback records per extraction batch
+MISTAKE_BACKFILL_BATCH_SIZE = int(os.getenv("MISTAKE_BACKFILL_BATCH_SIZE", "100"))
+# Batches processed concurrently
+MISTAKE_BACKFILL_WORKERS = int(os.getenv("MISTAKE_BACKFILL_WORKERS", "2"))
+# Maximum feedback records per second (0 disables the limit)
+MISTAKE_BACKFILL_RATE = float(os.getenv("MISTAKE_BACKFILL_RATE", "50"))
+# Seconds between progress reports
+MISTAKE_BACKFILL_REPORT_SECONDS = int(os.getenv("MISTAKE_BACKFILL_REPORT_SECONDS", "30"))
+
+
+class RateLimiter:
+    """
+    Token bucket limiting items per second, with a burst of one second's worth.
+    """
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._tokens = rate
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, count: int):
+        """Block until `count` items may be processed."""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= count
+            wait_seconds = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait_seconds:
+            time.sleep(wait_seconds)
+
+
+class MistakeBackfill:
+    """
+    Resumable backfill of mistakes over the feedback collection.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = MISTAKE_BACKFILL_BATCH_SIZE,
+        workers: int = MISTAKE_BACKFILL_WORKERS,
+        rate: float = MISTAKE_BACKFILL_RATE,
+        report_seconds: int = MISTAKE_BACKFILL_REPORT_SECONDS
+    ):
+        self.batch_size = max(1, batch_size)
+        self.workers = max(1, workers)
+        self.rate_limiter = RateLimiter(rate)
+        self.report_seconds = report_seconds
+        self.mistake_service = MistakeService()
+        self._stop = threading.Event()
+
+    def stop(self):
+        """Stop after the batches in flight, keeping the checkpoint."""
+        self._stop.set()
+
+    def load_checkpoint(self, restart: bool = False) -> Dict[str, Any]:
+        """
+        Get the checkpoint, creating it on the first run.
+
+        The first run fixes the upper bound of the backfill to the newest
+        feedback at that time.
+
+        Args:
+            restart: Discard an existing checkpoint and start from the beginning
+
+        Returns:
+            Checkpoint document
+        """
+        if restart:
+            db.backfill_checkpoints.delete_one({"_id": CHECKPOINT_ID})
+
+        checkpoint = db.backfill_checkpoints.find_one({"_id": CHECKPOINT_ID})
+        if checkpoint:
+            return checkpoint
+
+        newest = db.feedback.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+        checkpoint = {
+            "_id": CHECKPOINT_ID,
+            "upper_id": newest["_id"] if newest else None,
+            "last_id": None,
+            "feedback_processed": 0,
+            "mistakes_stored": 0,
+            "started_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow(),
+            "completed_at": None
+        }
+        db.backfill_checkpoints.insert_one(checkpoint)
+        return checkpoint
+
+    def _save_checkpoint(self, last_id: ObjectId, feedback_processed: int, mistakes_stored: int):
+        """Record that everything up to `last_id` is processed."""
+        db.backfill_checkpoints.update_one(
+            {"_id": CHECKPOINT_ID},
+            {
+                "$set": {"last_id": last_id, "updated_at": datetime.utcnow()},
+                "$inc": {"feedback_processed": feedback_processed, "mistakes_stored": mistakes_stored}
+            }
+        )
+
+    def _batches(self, checkpoint: Dict[str, Any]):
+        """Yield (last _id scanned, items to process) for each batch after the checkpoint."""
+        query: Dict[str, Any] = {"_id": {"$lte": checkpoint["upper_id"]}}
+        if checkpoint.get("last_id"):
+            query["_id"]["$gt"] = checkpoint["last_id"]
+
+        cursor = db.feedback.find(
+            query,
+            {"_id": 1, "user_id": 1, "transcription": 1, "mistakes_extracted_at": 1}
+        ).sort("_id", 1).batch_size(self.batch_size)
+
+        items: List[Dict[str, Any]] = []
+        scanned = 0
+        last_id = None
+        for feedback in cursor:
+            last_id = feedback["_id"]
+            scanned += 1
+            if not feedback.get("mistakes_extracted_at"):
+                item = {"feedback_id": str(feedback["_id"])}
+                if feedback.get("user_id"):
+                    item["user_id"] = str(feedback["user_id"])
+                if feedback.get("transcription"):
+                    item["transcription"] = feedback["transcription"]
+                items.append(item)
+            if scanned >= self.batch_size:
+                yield last_id, items
+                items, scanned = [], 0
+        if scanned:
+            yield last_id, items
+
+    def run(self, restart: bool = False) -> Dict[str, Any]:
+        """
+        Run the backfill until done or stopped.
+
+        Batches can finish out of order; the checkpoint only advances past a
+        batch once every earlier batch has finished, so a restart never
+        skips unprocessed feedback.
+
+        Args:
+            restart: Discard an existing checkpoint and start from the beginning
+
+        Returns:
+            Summary with counts, elapsed time and throughput
+        """
+        checkpoint = self.load_checkpoint(restart)
+        if checkpoint.get("upper_id") is None or checkpoint.get("completed_at"):
+            logger.info("Nothing to backfill")
+            return {"feedback_processed": 0, "mistakes_stored": 0, "seconds": 0.0, "feedback_per_second": 0.0}
+
+        self.mistake_service.ensure_indexes()
+        logger.info(f"Backfilling mistakes after {checkpoint.get('last_id')} up to {checkpoint['upper_id']}")
+
+        started = time.monotonic()
+        last_report = started
+        totals = {"feedback_processed": 0, "mistakes_stored": 0}
+        # Batches in submission order: [last _id, number of items, future]
+        in_flight: List[list] = []
+        failed = False
+
+        def record_finished():
+            nonlocal failed
+            advanced_to: Optional[ObjectId] = None
+            processed = stored = 0
+            # After a failure nothing later may be checkpointed, or the next run would skip it
+            while in_flight and not failed and in_flight[0][2].done():
+                last_id, count, future = in_flight.pop(0)
+                try:
+                    stored += future.result()
+                except Exception as e:
+                    logger.error(f"Backfill batch ending at {last_id} failed: {str(e)}")
+                    failed = True
+                    self.stop()
+                    break
+                processed += count
+                advanced_to = last_id
+            if advanced_to is not None:
+                self._save_checkpoint(advanced_to, processed, stored)
+                totals["feedback_processed"] += processed
+                totals["mistakes_stored"] += stored
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="mistake-backfill") as executor:
+            for last_id, items in self._batches(checkpoint):
+                if self._stop.is_set():
+                    break
+
+                self.rate_limiter.acquire(len(items))
+                future: Future = (
+                    executor.submit(self.mistake_service.process_feedback_batch, items)
+                    if items else executor.submit(lambda: 0)
+                )
+                in_flight.append([last_id, len(items), future])
+
+                # Keep at most two batches per worker in memory. Only finishing the oldest
+                # batch frees a place, so wait for it rather than for any batch
+                while len(in_flight) >= self.workers * 2:
+                    wait([in_flight[0][2]])
+                    record_finished()
+
+                if time.monotonic() - last_report >= self.report_seconds:
+                    last_report = time.monotonic()
+                    self._report(totals, last_report - started)
+
+            wait([entry[2] for entry in in_flight])
+            record_finished()
+
+        elapsed = time.monotonic() - started
+        if not self._stop.is_set() and not failed:
+            db.backfill_checkpoints.update_one(
+                {"_id": CHECKPOINT_ID},
+                {"$set": {"completed_at": datetime.utcnow()}}
+            )
+        summary = self._report(totals, elapsed)
+        summary["completed"] = not self._stop.is_set() and not failed
+        return summary
+
+    def _report(self, totals: Dict[str, int], elapsed: float) -> Dict[str, Any]:
+        """Log and return progress with throughput."""
+        summary = {
+            **totals,
+            "seconds": elapsed,
+            "feedback_per_second": totals["feedback_processed"] / elapsed if elapsed else 0.0
+        }
+        logger.info(
+            f"Backfill: {summary['feedback_processed']} feedback, {summary['mistakes_stored']} mistakes "
+            f"in {elapsed:.0f}s ({summary['feedback_per_second']:.1f} feedback/s)"
+        )
+        return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill mistakes from existing feedback.")
+    parser.add_argument("--batch-size", type=int, default=MISTAKE_BACKFILL_BATCH_SIZE, help="Feedback per batch")
+    parser.add_argument("--workers", type=int, default=MISTAKE_BACKFILL_WORKERS, help="Concurrent batches")
+    parser.add_argument("--rate", type=float, default=MISTAKE_BACKFILL_RATE, help="Max feedback per second (0 = no limit)")
+    parser.add_argument("--report-seconds", type=int, default=MISTAKE_BACKFILL_REPORT_SECONDS)
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start over")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    backfill = MistakeBackfill(args.batch_size, args.workers, args.rate, args.report_seconds)
+    try:
+        backfill.run(restart=args.restart)
+    except KeyboardInterrupt:
+        # The checkpoint only covers finished batches, so the next run resumes safely
+        backfill.stop()
+        logger.info("Backfill interrupted; run again to resume")
+    finally:
+        due_load_balancer.flush()
+
+
+if __name__ == "__main__":
+    main()
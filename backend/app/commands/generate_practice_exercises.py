@@ -0,0 +1,229 @@
+"""
+Pre-generate practice exercises for active mistakes.
+
+Streams the mistakes still in the drill queue that have no exercises yet,
+in _id order, and asks Gemini for a fill-in-the-blank, a rewrite and a
+choose-the-correct exercise for a batch of mistakes per call. Calls run on
+a bounded thread pool under a rate limit, and the validated exercises are
+written back with one bulk write per batch. Practice items then rotate
+through the stored exercises (see app.utils.practice_exercises), so
+practice requests never wait on the model.
+
+Mistakes that get no valid exercises keep the template prompt and are
+retried on the next run, so the job can be stopped and rerun at any time,
+e.g. from cron.
+
+Usage (from the backend directory):
+    python -m app.commands.generate_practice_exercises [--batch-size 10] [--workers 2] [--rate 1] [--limit N] [--user-id ID]
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from app.commands.backfill_mistakes import RateLimiter
+from app.config.database import db
+from app.utils.gemini import generate_json_response
+from app.utils.practice_exercises import (
+    BATCH_EXERCISES_RESPONSE_SCHEMA,
+    build_exercises_prompt,
+    parse_exercises
+)
+
+logger = logging.getLogger(__name__)
+
+# Mistakes per Gemini call
+MISTAKE_EXERCISE_BATCH_SIZE = int(os.getenv("MISTAKE_EXERCISE_BATCH_SIZE", "10"))
+# Gemini calls in flight
+MISTAKE_EXERCISE_WORKERS = int(os.getenv("MISTAKE_EXERCISE_WORKERS", "2"))
+# Maximum Gemini calls per second (0 disables the limit)
+MISTAKE_EXERCISE_RATE = float(os.getenv("MISTAKE_EXERCISE_RATE", "1"))
+# Seconds between progress reports
+MISTAKE_EXERCISE_REPORT_SECONDS = int(os.getenv("MISTAKE_EXERCISE_REPORT_SECONDS", "30"))
+
+# Fields the prompt needs
+_MISTAKE_PROJECTION = {
+    "type": 1,
+    "original_text": 1,
+    "correction": 1,
+    "explanation": 1,
+    "context": 1,
+    "situation_context": 1
+}
+
+
+class PracticeExerciseGenerator:
+    """
+    Batch job generating and storing exercises for active mistakes.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = MISTAKE_EXERCISE_BATCH_SIZE,
+        workers: int = MISTAKE_EXERCISE_WORKERS,
+        rate: float = MISTAKE_EXERCISE_RATE,
+        report_seconds: int = MISTAKE_EXERCISE_REPORT_SECONDS
+    ):
+        self.batch_size = max(1, batch_size)
+        self.workers = max(1, workers)
+        self.rate_limiter = RateLimiter(rate)
+        self.report_seconds = report_seconds
+        self._stop = threading.Event()
+
+    def stop(self):
+        """Stop after the calls in flight."""
+        self._stop.set()
+
+    def _batches(self, user_id: Optional[str] = None, limit: Optional[int] = None):
+        """Yield batches of active mistakes without exercises, in _id order."""
+        query: Dict[str, Any] = {
+            "in_drill_queue": {"$ne": False},
+            "status": {"$ne": "MASTERED"},
+            "exercises": {"$exists": False}
+        }
+        if user_id:
+            query["user_id"] = ObjectId(user_id)
+
+        cursor = db.mistakes.find(query, _MISTAKE_PROJECTION).sort("_id", 1).batch_size(self.batch_size * self.workers)
+        if limit:
+            cursor = cursor.limit(limit)
+
+        batch: List[Dict[str, Any]] = []
+        for mistake in cursor:
+            batch.append(mistake)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def generate_batch(self, mistakes: List[Dict[str, Any]]) -> int:
+        """
+        Generate and store exercises for a batch of mistakes with one Gemini call.
+
+        Args:
+            mistakes: Mistake documents
+
+        Returns:
+            Number of mistakes that got exercises
+        """
+        response = generate_json_response(build_exercises_prompt(mistakes), BATCH_EXERCISES_RESPONSE_SCHEMA)
+        cleaned_text = response.strip()
+        if cleaned_text.startswith("```json"):
+            cleaned_text = cleaned_text[7:]
+        if cleaned_text.endswith("```"):
+            cleaned_text = cleaned_text[:-3]
+        parsed = json.loads(cleaned_text.strip())
+
+        exercises_by_id = {
+            str(entry.get("mistake_id", "")): parse_exercises(entry.get("exercises"))
+            for entry in parsed if isinstance(entry, dict)
+        }
+
+        now = datetime.utcnow()
+        operations = []
+        for mistake in mistakes:
+            exercises = exercises_by_id.get(str(mistake["_id"]))
+            if not exercises:
+                logger.warning(f"No valid exercises generated for mistake {mistake['_id']}")
+                continue
+            operations.append(UpdateOne(
+                {"_id": mistake["_id"], "exercises": {"$exists": False}},
+                {"$set": {"exercises": exercises, "exercises_generated_at": now}}
+            ))
+        if not operations:
+            return 0
+        return db.mistakes.bulk_write(operations, ordered=False).modified_count
+
+    def run(self, user_id: Optional[str] = None, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Generate exercises until every active mistake has them, or until stopped.
+
+        Args:
+            user_id: Only generate for this user's mistakes
+            limit: Maximum number of mistakes to process
+
+        Returns:
+            Summary with counts, elapsed time and throughput
+        """
+        started = time.monotonic()
+        last_report = started
+        totals = {"mistakes_processed": 0, "mistakes_updated": 0, "failed_batches": 0}
+        in_flight: Dict[Any, int] = {}
+
+        def record_finished(futures):
+            for future in futures:
+                count = in_flight.pop(future)
+                totals["mistakes_processed"] += count
+                try:
+                    totals["mistakes_updated"] += future.result()
+                except Exception as e:
+                    totals["failed_batches"] += 1
+                    logger.error(f"Error generating exercises for {count} mistakes: {str(e)}")
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="practice-exercises") as executor:
+            for batch in self._batches(user_id, limit):
+                if self._stop.is_set():
+                    break
+
+                self.rate_limiter.acquire(1)
+                in_flight[executor.submit(self.generate_batch, batch)] = len(batch)
+
+                while len(in_flight) >= self.workers:
+                    done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                    record_finished(done)
+
+                if time.monotonic() - last_report >= self.report_seconds:
+                    last_report = time.monotonic()
+                    self._report(totals, last_report - started)
+
+            done, _ = wait(list(in_flight))
+            record_finished(done)
+
+        return self._report(totals, time.monotonic() - started)
+
+    def _report(self, totals: Dict[str, int], elapsed: float) -> Dict[str, Any]:
+        """Log and return progress with throughput."""
+        summary = {
+            **totals,
+            "seconds": elapsed,
+            "mistakes_per_second": totals["mistakes_processed"] / elapsed if elapsed else 0.0
+        }
+        logger.info(
+            f"Practice exercises: {summary['mistakes_updated']} of {summary['mistakes_processed']} mistakes updated, "
+            f"{summary['failed_batches']} failed batches in {elapsed:.0f}s "
+            f"({summary['mistakes_per_second']:.1f} mistakes/s)"
+        )
+        return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate practice exercises for active mistakes.")
+    parser.add_argument("--batch-size", type=int, default=MISTAKE_EXERCISE_BATCH_SIZE, help="Mistakes per Gemini call")
+    parser.add_argument("--workers", type=int, default=MISTAKE_EXERCISE_WORKERS, help="Concurrent Gemini calls")
+    parser.add_argument("--rate", type=float, default=MISTAKE_EXERCISE_RATE, help="Max Gemini calls per second (0 = no limit)")
+    parser.add_argument("--report-seconds", type=int, default=MISTAKE_EXERCISE_REPORT_SECONDS)
+    parser.add_argument("--limit", type=int, help="Maximum number of mistakes to process")
+    parser.add_argument("--user-id", help="Only process this user's mistakes")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    generator = PracticeExerciseGenerator(args.batch_size, args.workers, args.rate, args.report_seconds)
+    try:
+        generator.run(user_id=args.user_id, limit=args.limit)
+    except KeyboardInterrupt:
+        generator.stop()
+        logger.info("Interrupted; mistakes without exercises are picked up by the next run")
+
+
+if __name__ == "__main__":
+    main()
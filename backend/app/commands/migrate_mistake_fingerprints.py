@@ -0,0 +1,187 @@
+"""
+Migrate mistakes stored before fingerprints and LSH band keys existed.
+
+Unmastered mistakes without a fingerprint get one, and mistakes without
+LSH band keys get them, so they are covered by the unique fingerprint
+index and by near-duplicate matching. A legacy mistake whose fingerprint
+already belongs to another mistake of the same user and type is merged
+into it (frequency added, latest occurrence kept) and deleted, and the
+statistics of the affected users are reconciled afterwards.
+
+Mistakes are read in _id order in batches and written with one bulk write
+per batch. Migrated mistakes no longer match the query, so the command can
+be stopped and rerun at any time.
+
+Usage (from the backend directory):
+    python -m app.commands.migrate_mistake_fingerprints [--batch-size 500]
+"""
+
+import argparse
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Set, Tuple
+
+from pymongo import DeleteOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.config.database import db
+from app.utils.mistake_service import DUPLICATE_KEY_ERROR, MistakeService, mistake_fingerprint
+from app.utils.mistake_similarity import lsh_bands
+
+logger = logging.getLogger(__name__)
+
+# Mistakes per bulk write
+MISTAKE_MIGRATION_BATCH_SIZE = int(os.getenv("MISTAKE_MIGRATION_BATCH_SIZE", "500"))
+
+LEGACY_QUERY = {
+    "status": {"$ne": "MASTERED"},
+    "$or": [{"fingerprint": {"$exists": False}}, {"lsh_bands": {"$exists": False}}]
+}
+
+
+def _merge_operations(duplicate: Dict[str, Any], target_id: Any) -> List[Any]:
+    """Fold a legacy mistake into the mistake holding its fingerprint."""
+    return [
+        UpdateOne(
+            {"_id": target_id},
+            {
+                "$inc": {"frequency": duplicate.get("frequency", 1)},
+                "$max": {"last_occurred": duplicate.get("last_occurred") or datetime.min}
+            }
+        ),
+        DeleteOne({"_id": duplicate["_id"]})
+    ]
+
+
+def migrate_batch(mistakes: List[Dict[str, Any]], affected_users: Set[str]) -> Tuple[int, int]:
+    """
+    Migrate one batch of legacy mistakes.
+
+    Args:
+        mistakes: Legacy mistake documents
+        affected_users: Collects the users whose mistakes were merged
+
+    Returns:
+        Tuple of (mistakes updated, mistakes merged)
+    """
+    pending = {}
+    for mistake in mistakes:
+        if not mistake.get("fingerprint"):
+            key = (mistake["user_id"], mistake["type"], mistake_fingerprint(mistake.get("original_text", "")))
+            pending.setdefault(key, []).append(mistake)
+
+    # Mistakes that already hold the fingerprints, found with one query
+    holders = {}
+    if pending:
+        for holder in db.mistakes.find(
+            {"$or": [
+                {"user_id": user_id, "type": mistake_type, "fingerprint": fingerprint}
+                for user_id, mistake_type, fingerprint in pending
+            ]},
+            {"user_id": 1, "type": 1, "fingerprint": 1}
+        ):
+            holders[(holder["user_id"], holder["type"], holder["fingerprint"])] = holder["_id"]
+
+    operations = []
+    # Index of the fingerprint update in operations -> the mistake, for duplicate key retries
+    fingerprint_updates = {}
+    merged = 0
+    for mistake in mistakes:
+        if mistake.get("fingerprint"):
+            bands = lsh_bands(mistake.get("original_text", ""))
+            operations.append(UpdateOne({"_id": mistake["_id"]}, {"$set": {"lsh_bands": bands}}))
+
+    for key, group in pending.items():
+        target_id = holders.get(key)
+        if target_id is None:
+            # The first legacy mistake takes the fingerprint, the rest are merged into it
+            first, group = group[0], group[1:]
+            target_id = first["_id"]
+            fingerprint_updates[len(operations)] = (first, key)
+            operations.append(UpdateOne(
+                {"_id": first["_id"]},
+                {"$set": {"fingerprint": key[2], "lsh_bands": lsh_bands(first.get("original_text", ""))}}
+            ))
+        for duplicate in group:
+            operations += _merge_operations(duplicate, target_id)
+            affected_users.add(str(duplicate["user_id"]))
+            merged += 1
+
+    if not operations:
+        return 0, 0
+
+    try:
+        db.mistakes.bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        # A live request stored the same fingerprint meanwhile: merge into that mistake
+        for error in e.details.get("writeErrors", []):
+            if error.get("code") != DUPLICATE_KEY_ERROR or error["index"] not in fingerprint_updates:
+                logger.error(f"Error migrating mistakes: {error.get('errmsg')}")
+                continue
+            mistake, (user_id, mistake_type, fingerprint) = fingerprint_updates[error["index"]]
+            holder = db.mistakes.find_one({"user_id": user_id, "type": mistake_type, "fingerprint": fingerprint}, {"_id": 1})
+            # Re-read it: other legacy mistakes of the batch may have been merged into it
+            current = db.mistakes.find_one({"_id": mistake["_id"]}, {"frequency": 1, "last_occurred": 1})
+            if holder and current:
+                db.mistakes.bulk_write(_merge_operations(current, holder["_id"]))
+                affected_users.add(str(user_id))
+                merged += 1
+
+    return len(mistakes) - merged, merged
+
+
+def migrate(batch_size: int = MISTAKE_MIGRATION_BATCH_SIZE) -> Dict[str, Any]:
+    """
+    Migrate every legacy mistake.
+
+    Args:
+        batch_size: Mistakes per batch
+
+    Returns:
+        Summary with counts and elapsed time
+    """
+    MistakeService().ensure_indexes()
+
+    started = time.monotonic()
+    updated = merged = 0
+    affected_users: Set[str] = set()
+    last_id = None
+    while True:
+        query = dict(LEGACY_QUERY)
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = list(db.mistakes.find(
+            query,
+            {"user_id": 1, "type": 1, "original_text": 1, "frequency": 1, "last_occurred": 1, "fingerprint": 1}
+        ).sort("_id", 1).limit(max(1, batch_size)))
+        if not batch:
+            break
+
+        last_id = batch[-1]["_id"]
+        batch_updated, batch_merged = migrate_batch(batch, affected_users)
+        updated += batch_updated
+        merged += batch_merged
+        logger.info(f"Migrated {updated} mistakes, merged {merged} duplicates (up to {last_id})")
+
+    service = MistakeService()
+    for user_id in affected_users:
+        service.reconcile_mistake_stats(user_id)
+
+    elapsed = time.monotonic() - started
+    logger.info(f"Mistake fingerprint migration done: {updated} updated, {merged} merged in {elapsed:.0f}s")
+    return {"updated": updated, "merged": merged, "users_reconciled": len(affected_users), "seconds": elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add fingerprints and LSH band keys to legacy mistakes.")
+    parser.add_argument("--batch-size", type=int, default=MISTAKE_MIGRATION_BATCH_SIZE, help="Mistakes per batch")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    migrate(args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,15 @@
 from fastapi import FastAPI, Depends
 from fastapi.staticfiles import StaticFiles
-from app.routes import user, conversation, image_description
+from app.routes import user, conversation, image_description, feedback, admin, mistake
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.models import SecurityScheme
 from fastapi.security import OAuth2PasswordBearer
 from typing import Dict
 from app.utils.event_handler import event_handler
+from app.utils.feedback_queue import feedback_job_queue, FEEDBACK_WORKERS_IN_PROCESS
+from app.utils.load_smoothing import due_load_balancer
 from app.utils.audio_processor import loaded_model
+from app.utils.tts_client_service import tts_client
 import logging
 from pathlib import Path
 
@@ -44,6 +47,10 @@ app = FastAPI(
         {
             "name": "mistakes",
             "description": "Operations for tracking and drilling language mistakes."
+        },
+        {
+            "name": "admin",
+            "description": "Operational endpoints such as background task metrics. Requires the admin role."
         }
     ]
 )
@@ -82,6 +89,27 @@ app.include_router(
     responses={401: {"description": "Unauthorized"}}
 )
 
+app.include_router(
+    feedback.router,
+    prefix="/api",
+    tags=["feedback"],
+    responses={401: {"description": "Unauthorized"}}
+)
+
+app.include_router(
+    mistake.router,
+    prefix="/api",
+    tags=["mistakes"],
+    responses={401: {"description": "Unauthorized"}}
+)
+
+app.include_router(
+    admin.router,
+    prefix="/api",
+    tags=["admin"],
+    responses={401: {"description": "Unauthorized"}, 403: {"description": "Forbidden"}}
+)
+
 app.include_router(
     image_description.router,
     prefix="/api",
@@ -111,19 +139,37 @@ async def root():
 async def startup_event():
     """
     Function that runs on application startup.
-    Starts the background task processor.
+    Starts the background task processor, the feedback workers and the
+    shared TTS client.
     """
     # Start the event handler
     event_handler.start()
+    
+    # Open the pooled TTS client shared by all speech requests
+    tts_client.start()
+    
+    # Start feedback workers unless they run as a separate process
+    if FEEDBACK_WORKERS_IN_PROCESS:
+        feedback_job_queue.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """
     Function that runs on application shutdown.
-    Stops the background task processor.
+    Stops the background task processor, the feedback workers and the
+    shared TTS client.
     """
     # Stop the event handler
     event_handler.stop()
+    
+    # Stop feedback workers
+    feedback_job_queue.stop()
+    
+    # Write the global due load changes not written yet
+    due_load_balancer.flush()
+    
+    # Close the TTS client's pooled connections
+    await tts_client.close()
 
 
 
@@ -12,6 +12,7 @@ class Feedback:
         target_id: ID of the entity receiving feedback (message, audio, etc.)
         target_type: Type of entity receiving feedback ("message", "audio", etc.)
         user_feedback: User-friendly feedback in a free-form text
+        detailed_feedback: Structured grammar/vocabulary issues used for mistake extraction
         timestamp: Timestamp of when the feedback was created
         user_id: ID of the user providing feedback
         transcription: Transcription of the speech being analyzed
@@ -22,7 +23,8 @@ class Feedback:
         target_type: str,  # "message", "audio", etc.
         user_feedback: str,
         user_id: Optional[ObjectId] = None,
-        transcription: Optional[str] = None
+        transcription: Optional[str] = None,
+        detailed_feedback: Optional[Dict[str, Any]] = None
     ):
         self._id = ObjectId()
         self.target_id = target_id
@@ -30,6 +32,7 @@ class Feedback:
         self.user_feedback = user_feedback
         self.user_id = user_id
         self.transcription = transcription
+        self.detailed_feedback = detailed_feedback or {"grammar_issues": [], "vocabulary_issues": []}
         self.timestamp = datetime.utcnow()
 
     def to_dict(self) -> Dict[str, Any]:
@@ -41,6 +44,7 @@ class Feedback:
             "user_feedback": self.user_feedback,
             "user_id": self.user_id,
             "transcription": self.transcription,
+            "detailed_feedback": self.detailed_feedback,
             "timestamp": self.timestamp
         }
  
\ No newline at end of file
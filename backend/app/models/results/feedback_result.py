@@ -8,20 +8,36 @@ class FeedbackResult:
     
     Attributes:
         user_feedback: User-friendly text feedback
+        grammar_issues: Machine-readable grammar issues (issue, correction, explanation, severity)
+        vocabulary_issues: Machine-readable vocabulary issues (original, better_alternative, reason, example_usage)
         timestamp: Timestamp when feedback was generated
+        is_fallback: True for generic feedback produced when generation failed
     """
     def __init__(
         self,
         user_feedback: str,
-        timestamp: Optional[datetime] = None
+        grammar_issues: Optional[List[Dict[str, Any]]] = None,
+        vocabulary_issues: Optional[List[Dict[str, Any]]] = None,
+        timestamp: Optional[datetime] = None,
+        is_fallback: bool = False
     ):
         self.user_feedback = user_feedback
+        self.grammar_issues = grammar_issues or []
+        self.vocabulary_issues = vocabulary_issues or []
         self.timestamp = timestamp or datetime.utcnow()
+        self.is_fallback = is_fallback
    
+    def get_detailed_feedback(self) -> Dict[str, Any]:
+        """Return the structured issues in the shape the mistake pipeline expects"""
+        return {
+            "grammar_issues": self.grammar_issues,
+            "vocabulary_issues": self.vocabulary_issues
+        }
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for storage"""
         return {
             "user_feedback": self.user_feedback,
+            "detailed_feedback": self.get_detailed_feedback(),
             "timestamp": self.timestamp
         } 
\ No newline at end of file
@@ -0,0 +1,124 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import PlainTextResponse
+import logging
+
+from app.utils.auth import get_current_user
+from app.utils.task_metrics import task_metrics
+from app.utils.tts_client_service import tts_client
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+def require_admin(current_user: dict = Depends(get_current_user)) -> dict:
+    """
+    Dependency that only lets admin users through.
+
+    Args:
+        current_user (dict): The authenticated user's information
+
+    Returns:
+        dict: The authenticated admin user
+
+    Raises:
+        HTTPException 403: If the user is not an admin
+    """
+    if current_user.get("role") != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admin users can access this endpoint"
+        )
+    return current_user
+
+
+@router.get("/admin/tasks/metrics", response_model=dict)
+async def get_task_metrics(current_user: dict = Depends(require_admin)):
+    """
+    Get background task scheduler metrics. Only accessible by admin users.
+
+    Queue depth and oldest pending age cover all processes; completion
+    counters and histograms cover the process that served the request.
+
+    Args:
+        current_user (dict): The authenticated user's information (must be admin)
+
+    Returns:
+        dict: Task metrics
+            Sample output:
+            {
+                "depth": [
+                    {"status": "pending", "task_name": "process_feedback_for_mistakes", "count": 3},
+                    {"status": "completed", "task_name": "process_feedback_for_mistakes", "count": 1250}
+                ],
+                "oldest_pending_age_seconds": 1.8,
+                "tasks": {
+                    "process_feedback_for_mistakes": {
+                        "completed": 410,
+                        "failed": 2,
+                        "lag_seconds": {"buckets": [{"le": 0.1, "count": 380}, ...], "sum": 52.1, "count": 412},
+                        "duration_seconds": {"buckets": [{"le": 0.01, "count": 12}, ...], "sum": 98.4, "count": 412}
+                    }
+                }
+            }
+
+    Raises:
+        HTTPException 403: If the user is not an admin
+    """
+    return task_metrics.get_snapshot()
+
+
+@router.get("/admin/tasks/metrics/prometheus", response_class=PlainTextResponse)
+async def get_task_metrics_prometheus(current_user: dict = Depends(require_admin)):
+    """
+    Get background task scheduler metrics in the Prometheus text format.
+    Only accessible by admin users.
+
+    Args:
+        current_user (dict): The authenticated user's information (must be admin)
+
+    Returns:
+        PlainTextResponse: Prometheus exposition text (version 0.0.4)
+
+    Raises:
+        HTTPException 403: If the user is not an admin
+    """
+    return PlainTextResponse(
+        task_metrics.render_prometheus(),
+        media_type="text/plain; version=0.0.4"
+    )
+
+
+@router.get("/admin/tts/metrics", response_model=dict)
+async def get_tts_metrics(current_user: dict = Depends(require_admin)):
+    """
+    Get connection pool metrics of the shared TTS client. Only accessible by admin users.
+
+    Metrics cover the process that served the request.
+
+    Args:
+        current_user (dict): The authenticated user's information (must be admin)
+
+    Returns:
+        dict: TTS client metrics
+            Sample output:
+            {
+                "base_url": "http://tts_kokoro:8880",
+                "started": true,
+                "max_connections": 20,
+                "max_keepalive_connections": 10,
+                "in_flight": 3,
+                "peak_in_flight": 12,
+                "pool_utilization": 0.15,
+                "requests": 5400,
+                "connections_opened": 31,
+                "connection_reuse_ratio": 0.994,
+                "pool_timeouts": 0,
+                "errors": 2,
+                "response_seconds": {"buckets": [{"le": 0.05, "count": 120}, ...], "sum": 1520.3, "count": 5398}
+            }
+
+    Raises:
+        HTTPException 403: If the user is not an admin
+    """
+    return tts_client.get_snapshot()
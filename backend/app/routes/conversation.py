@@ -9,11 +9,13 @@ from app.utils.gemini import generate_response
 from app.utils.transcription_error_message import TranscriptionErrorMessages
 import json
 import asyncio
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Body, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Body, Query
 from fastapi.responses import JSONResponse
 from bson import ObjectId
 from typing import List, Optional
 from app.utils.feedback_service import FeedbackService
+from app.utils.feedback_queue import feedback_job_queue
+from app.utils.feedback_notifier import feedback_notifier, FEEDBACK_LONG_POLL_MAX_SECONDS
 import os
 import time
 from app.utils.tts_client_service import get_speech_from_tts_service,pick_suitable_voice_name
@@ -331,8 +333,7 @@ async def turn_to_text(
 async def add_message_and_get_response (
     conversation_id: str,  
     audio_id: str ,  
-    current_user: dict = Depends(get_current_user),
-    background_tasks: BackgroundTasks = BackgroundTasks()
+    current_user: dict = Depends(get_current_user)
 ):
     """
     Process speech audio and return an AI response.
@@ -341,7 +342,7 @@ async def add_message_and_get_response (
     1. Retrieves the transcribed audio using the provided audio_id
     2. Adds the user's message to the conversation
     3. Generates an AI response based on conversation context
-    4. Handles feedback generation in the background
+    4. Queues feedback generation as a durable background job
     
     Args:
         conversation_id (str): ID of the conversation
@@ -353,8 +354,6 @@ async def add_message_and_get_response (
             - _id: User's ObjectId
             - email: User's email
             - role: User's role
-        background_tasks (BackgroundTasks): FastAPI background tasks manager
-            Used to process feedback generation asynchronously
         
     Returns:
         dict: Dictionary containing both the user's message and the AI's response
@@ -405,14 +404,14 @@ async def add_message_and_get_response (
                 )
                 
                 db.messages.insert_one(user_message.to_dict())
-                background_tasks.add_task(
-                    feedback_service.process_speech_feedback,
-                    transcription=audio_data["transcription"],
+                # Feedback is generated by the job queue workers, off the event loop
+                feedback_job_queue.enqueue(
+                    user_message_id=str(user_message._id),
                     user_id=user_id,
                     conversation_id=conversation_id,
+                    transcription=audio_data["transcription"],
                     audio_id=audio_data["_id"],
-                    file_path=audio_data["file_path"],
-                    user_message_id=str(user_message._id)
+                    file_path=audio_data["file_path"]
                 )
                 # Fetch conversation history
                 messages = list(db.messages.find({"conversation_id": ObjectId(conversation_id)}).sort("timestamp", 1))
@@ -471,17 +470,21 @@ async def add_message_and_get_response (
 @router.get("/messages/{message_id}/feedback",response_model=dict)
 async def get_message_feedback(
     message_id: str,
+    wait: int = Query(0, ge=0, le=FEEDBACK_LONG_POLL_MAX_SECONDS, description="Seconds to wait for feedback that is still being generated"),
     current_user: dict = Depends(get_current_user)
 ):
     """
     Get user-friendly feedback for a specific message.
     
     This endpoint retrieves the stored feedback for a message when the user
-    clicks the feedback button in the UI.
+    clicks the feedback button in the UI. With `wait` > 0 it acts as a
+    long-poll: the request is parked until the feedback is stored or the wait
+    expires, instead of the client polling repeatedly.
     
     Args:
         message_id (str): ID of the message to get feedback for
             Path parameter that identifies which message's feedback to retrieve
+        wait (int): Optional long-poll timeout in seconds (0 returns immediately)
         current_user (dict): Authenticated user information
             Fields:
             - _id: User's ObjectId
@@ -513,6 +516,16 @@ async def get_message_feedback(
         
         # Check if message has associated feedback
         feedback_id = message.get("feedback_id")
+        if not feedback_id and wait > 0:
+            # Park until the feedback worker publishes the result
+            def feedback_ready() -> bool:
+                nonlocal feedback_id
+                refreshed = db.messages.find_one({"_id": ObjectId(message_id)}, {"feedback_id": 1})
+                feedback_id = refreshed.get("feedback_id") if refreshed else None
+                return bool(feedback_id)
+            
+            await feedback_notifier.wait_for_feedback(message_id, wait, feedback_ready)
+            
         if not feedback_id:
             logger.info(f"No feedback_id found for message: {message_id}, feedback may still be processing")
             # Feedback might still be processing
@@ -540,7 +553,7 @@ async def get_message_feedback(
             feedback_dict = {
                 "id": str(feedback.get("_id", "")),
                 "user_feedback": feedback.get("user_feedback", "Feedback content unavailable"),
-                "created_at": feedback.get("created_at", datetime.now().isoformat())
+                "created_at": feedback.get("created_at", feedback.get("timestamp", datetime.now().isoformat()))
             }
             
             # Add detailed feedback if available
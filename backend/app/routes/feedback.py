@@ -0,0 +1,165 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+import asyncio
+import json
+import logging
+import math
+import os
+from datetime import datetime, timedelta
+
+from app.utils.auth import get_current_user
+from app.utils.feedback_notifier import FEEDBACK_STREAM_RECHECK_SECONDS, feedback_notifier
+from app.utils.feedback_cache import feedback_cache
+from app.utils.feedback_queue import FEEDBACK_WORKERS_IN_PROCESS
+
+logger = logging.getLogger(__name__)
+
+# Interval between keep-alive comments on idle streams, so proxies do not close them
+FEEDBACK_STREAM_KEEPALIVE_SECONDS = float(os.getenv("FEEDBACK_STREAM_KEEPALIVE_SECONDS", "15"))
+# Whether open streams also read the database, for feedback stored by another process.
+# Off by default when feedback workers run in this process; enable it when several
+# API processes share the job queue.
+FEEDBACK_STREAM_DB_RECHECK = os.getenv(
+    "FEEDBACK_STREAM_DB_RECHECK", str(not FEEDBACK_WORKERS_IN_PROCESS)
+).lower() == "true"
+
+router = APIRouter()
+
+
+@router.get(
+    "/feedback/stream",
+    summary="Stream feedback-ready events",
+    description="Server-Sent Events stream that pushes a `feedback_ready` event as soon as feedback for one of the user's messages is stored."
+)
+async def stream_feedback_events(
+    request: Request,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Open a Server-Sent Events stream of feedback-ready events for the current user.
+
+    This replaces polling `GET /messages/{message_id}/feedback`: the client keeps
+    one stream open and receives the feedback payload when it is ready.
+
+    Feedback stored in this process is pushed immediately. If
+    FEEDBACK_STREAM_DB_RECHECK is on (by default when feedback workers run
+    in a separate process), feedback stored by another process is picked up
+    from the database every FEEDBACK_STREAM_RECHECK_SECONDS. Each feedback
+    is sent once.
+
+    Args:
+        request (Request): The incoming request, used to detect client disconnects
+        current_user (dict): The authenticated user's information
+
+    Returns:
+        StreamingResponse: `text/event-stream` response. Each event looks like:
+            event: feedback_ready
+            data: {
+                "message_id": "507f1f77bcf86cd799439013",
+                "feedback": {
+                    "id": "507f1f77bcf86cd799439014",
+                    "user_feedback": "...",
+                    "created_at": "2024-04-04T12:00:00"
+                }
+            }
+    """
+    user_id = str(current_user["_id"])
+
+    async def event_generator():
+        loop = asyncio.get_running_loop()
+        # Feedback already sent, by ID, with the time it was sent (only needed to skip database duplicates)
+        delivered = {}
+        checked_at = datetime.utcnow()
+        next_recheck = loop.time() + FEEDBACK_STREAM_RECHECK_SECONDS if FEEDBACK_STREAM_DB_RECHECK else math.inf
+        next_keepalive = loop.time() + FEEDBACK_STREAM_KEEPALIVE_SECONDS
+        queue = None
+        try:
+            # Subscribed here, so a response that is never iterated leaves no subscriber behind
+            queue = feedback_notifier.subscribe(user_id)
+            # Tell the client the stream is live
+            yield "event: connected\ndata: {}\n\n"
+
+            while True:
+                if await request.is_disconnected():
+                    break
+
+                events = []
+                try:
+                    timeout = max(0.0, min(next_recheck, next_keepalive) - loop.time())
+                    events.append(await asyncio.wait_for(queue.get(), timeout=timeout))
+                except asyncio.TimeoutError:
+                    pass
+
+                if loop.time() >= next_recheck:
+                    # Look back one interval, for inserts in flight and clock skew between processes
+                    since = checked_at - timedelta(seconds=FEEDBACK_STREAM_RECHECK_SECONDS)
+                    checked_at = datetime.utcnow()
+                    next_recheck = loop.time() + FEEDBACK_STREAM_RECHECK_SECONDS
+                    try:
+                        events += await asyncio.to_thread(feedback_notifier.stored_events, user_id, since)
+                    except Exception as e:
+                        logger.error(f"Error reading stored feedback for stream: {str(e)}")
+                    # Older IDs are outside every future lookback
+                    horizon = loop.time() - 3 * FEEDBACK_STREAM_RECHECK_SECONDS
+                    delivered = {feedback_id: at for feedback_id, at in delivered.items() if at >= horizon}
+
+                for event in events:
+                    feedback_id = event["feedback"]["id"]
+                    if feedback_id in delivered:
+                        continue
+                    if FEEDBACK_STREAM_DB_RECHECK:
+                        delivered[feedback_id] = loop.time()
+                    next_keepalive = loop.time() + FEEDBACK_STREAM_KEEPALIVE_SECONDS
+                    yield f"event: feedback_ready\ndata: {json.dumps(event, default=str)}\n\n"
+
+                if loop.time() >= next_keepalive:
+                    next_keepalive = loop.time() + FEEDBACK_STREAM_KEEPALIVE_SECONDS
+                    yield ": keep-alive\n\n"
+        finally:
+            if queue is not None:
+                feedback_notifier.unsubscribe(user_id, queue)
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
+@router.get("/feedback/cache/stats", response_model=dict)
+async def get_feedback_cache_stats(current_user: dict = Depends(get_current_user)):
+    """
+    Get feedback cache statistics. Only accessible by admin users.
+
+    Args:
+        current_user (dict): The authenticated user's information (must be admin)
+
+    Returns:
+        dict: Cache statistics
+            Sample output:
+            {
+                "enabled": true,
+                "hits": 120,
+                "misses": 880,
+                "hit_rate": 0.12,
+                "size": 640,
+                "max_entries": 5000,
+                "ttl_seconds": 86400,
+                "max_words": 12,
+                "evictions": 0,
+                "expirations": 15
+            }
+
+    Raises:
+        HTTPException 403: If the user is not an admin
+    """
+    if current_user.get("role") != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admin users can access this endpoint"
+        )
+
+    return feedback_cache.get_stats()
@@ -0,0 +1,375 @@
+from fastapi import APIRouter, Depends, Query
+from bson import ObjectId
+from typing import Optional
+import logging
+
+from app.schemas.mistake import (
+    DueMistakesResponse,
+    MistakeListItem,
+    MistakeListResponse,
+    MistakeStatistics,
+    MistakeStatus,
+    MistakeType,
+    PracticeItemResponse,
+    PracticeSessionStartRequest,
+    PracticeSessionStartResponse,
+    PracticeResultRequest,
+    PracticeResultResponse,
+    PracticeResultBatchRequest,
+    PracticeResultBatchResponse
+)
+from app.utils.auth import get_current_user
+from app.utils.mistake_service import MistakeService
+from app.utils.error_handler import (
+    get_not_found_exception,
+    get_validation_exception,
+    handle_general_exception
+)
+
+logger = logging.getLogger(__name__)
+
+mistake_service = MistakeService()
+
+router = APIRouter()
+
+
+def _to_result_response(mistake_id: str, result: dict) -> PracticeResultResponse:
+    """Convert a service practice result (mastery 0-100) to the API response (mastery 0-10)."""
+    return PracticeResultResponse(
+        mistake_id=mistake_id,
+        mastery_level=round(result.get("mastery_level", 0) / 10),
+        next_practice_date=result["next_practice_date"],
+        status=result.get("status", "NEW"),
+        feedback=result.get("feedback", "")
+    )
+
+
+def _to_practice_item(item: dict) -> PracticeItemResponse:
+    """Convert a service practice item to the API response."""
+    exercise = item.get("exercise") or {}
+    return PracticeItemResponse(
+        mistake_id=str(item["_id"]),
+        type=item["type"],
+        practice_prompt=item["practice_prompt"],
+        original_text=item.get("original_text", ""),
+        context=item.get("context") or "",
+        correction=item.get("correction", ""),
+        explanation=item.get("explanation", ""),
+        example_usage=item.get("example_usage"),
+        exercise_type=exercise.get("type"),
+        options=exercise.get("options"),
+        expected_answer=exercise.get("answer")
+    )
+
+
+@router.get("/mistakes", response_model=MistakeListResponse)
+async def list_mistakes(
+    status: Optional[MistakeStatus] = Query(None, description="Only return mistakes with this status"),
+    type: Optional[MistakeType] = Query(None, description="Only return mistakes of this type"),
+    skip: int = Query(0, ge=0, description="Number of mistakes to skip"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of mistakes to return"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    List the user's mistakes, most recently made first.
+
+    Args:
+        status (MistakeStatus, optional): Only return mistakes with this status
+        type (MistakeType, optional): Only return mistakes of this type
+        skip (int): Number of mistakes to skip
+        limit (int): Maximum number of mistakes to return (1-100)
+        current_user (dict): The authenticated user's information
+
+    Returns:
+        MistakeListResponse: One page of mistakes and the total count
+            Sample output:
+            {
+                "items": [
+                    {
+                        "id": "507f1f77bcf86cd799439015",
+                        "type": "GRAMMAR",
+                        "original_text": "I goed to school",
+                        "correction": "I went to school",
+                        "explanation": "'Go' has an irregular past tense.",
+                        "status": "LEARNING",
+                        "mastery_level": 6,
+                        "frequency": 3,
+                        "practice_count": 5,
+                        "last_occurred": "2024-04-04T12:00:00",
+                        "next_practice_date": "2024-04-06T12:00:00"
+                    }
+                ],
+                "total": 42,
+                "skip": 0,
+                "limit": 20
+            }
+    """
+    try:
+        mistakes, total = mistake_service.list_mistakes(
+            user_id=str(current_user["_id"]),
+            status=status.value if status else None,
+            # Mistakes are stored with upper-case types ("GRAMMAR", "VOCABULARY")
+            mistake_type=type.value.upper() if type else None,
+            skip=skip,
+            limit=limit
+        )
+    except Exception as e:
+        logger.error(f"Error listing mistakes: {str(e)}")
+        raise handle_general_exception(e, "mistakes")
+
+    return MistakeListResponse(
+        items=[
+            MistakeListItem(
+                id=str(mistake["_id"]),
+                type=mistake["type"],
+                original_text=mistake.get("original_text", ""),
+                correction=mistake.get("correction", ""),
+                explanation=mistake.get("explanation", ""),
+                status=mistake.get("status", "NEW"),
+                mastery_level=round(mistake.get("mastery_level", 0) / 10),
+                frequency=mistake.get("frequency", 1),
+                practice_count=mistake.get("practice_count", 0),
+                last_occurred=mistake.get("last_occurred"),
+                next_practice_date=mistake.get("next_practice_date")
+            )
+            for mistake in mistakes
+        ],
+        total=total,
+        skip=skip,
+        limit=limit
+    )
+
+
+@router.get("/mistakes/due", response_model=DueMistakesResponse)
+async def get_due_mistakes(
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of mistakes to return"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Get the mistakes that are due for practice, earliest first.
+
+    Served from the user's precomputed due queue, so the cost does not
+    grow with the number of mistakes the user has.
+
+    Args:
+        limit (int): Maximum number of mistakes to return (1-50)
+        current_user (dict): The authenticated user's information
+
+    Returns:
+        DueMistakesResponse: Practice items for the due mistakes
+            Sample output:
+            {
+                "items": [
+                    {
+                        "mistake_id": "507f1f77bcf86cd799439015",
+                        "type": "GRAMMAR",
+                        "practice_prompt": "Correct the grammar in this sentence: \"I goed to school\"",
+                        "original_text": "I goed to school",
+                        "context": "Yesterday I goed to school by bus.",
+                        "correction": "I went to school",
+                        "explanation": "'Go' has an irregular past tense.",
+                        "example_usage": null,
+                        "exercise_type": null,
+                        "options": null,
+                        "expected_answer": null
+                    }
+                ]
+            }
+    """
+    try:
+        items = mistake_service.get_mistakes_for_practice(str(current_user["_id"]), limit)
+    except Exception as e:
+        logger.error(f"Error fetching due mistakes: {str(e)}")
+        raise handle_general_exception(e, "mistakes")
+
+    return DueMistakesResponse(items=[_to_practice_item(item) for item in items])
+
+
+@router.post("/mistakes/practice/sessions", response_model=PracticeSessionStartResponse)
+async def start_practice_session(
+    request: PracticeSessionStartRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Start a practice session with the user's due mistakes.
+
+    Submit the answers with `POST /mistakes/practice/results`, passing the
+    returned session ID.
+
+    Args:
+        request (PracticeSessionStartRequest): Maximum number of mistakes in the session
+        current_user (dict): The authenticated user's information
+
+    Returns:
+        PracticeSessionStartResponse: The session and the mistakes to practice
+            Sample output:
+            {
+                "session_id": "507f1f77bcf86cd799439016",
+                "started_at": "2024-04-04T12:00:00",
+                "items": [...]
+            }
+    """
+    user_id = str(current_user["_id"])
+    try:
+        items = mistake_service.get_mistakes_for_practice(user_id, request.limit)
+        session = mistake_service.create_practice_session(user_id, items)
+    except Exception as e:
+        logger.error(f"Error starting practice session: {str(e)}")
+        raise handle_general_exception(e, "practice session")
+
+    return PracticeSessionStartResponse(
+        session_id=session["_id"],
+        started_at=session["started_at"],
+        items=[_to_practice_item(item) for item in items]
+    )
+
+
+@router.get("/mistakes/stats", response_model=MistakeStatistics)
+async def get_mistake_stats(current_user: dict = Depends(get_current_user)):
+    """
+    Get statistics about the user's mistakes.
+
+    Args:
+        current_user (dict): The authenticated user's information
+
+    Returns:
+        MistakeStatistics: Counts by status and type, due count and mastery percentage
+            Sample output:
+            {
+                "total_count": 42,
+                "mastered_count": 10,
+                "learning_count": 20,
+                "new_count": 12,
+                "grammar_count": 30,
+                "vocabulary_count": 12,
+                "due_for_practice": 5,
+                "mastery_percentage": 23.8
+            }
+    """
+    try:
+        stats = mistake_service.get_mistake_statistics(str(current_user["_id"]))
+    except Exception as e:
+        logger.error(f"Error fetching mistake statistics: {str(e)}")
+        raise handle_general_exception(e, "mistake statistics")
+
+    return MistakeStatistics(
+        total_count=stats.total_count,
+        mastered_count=stats.mastered_count,
+        learning_count=stats.learning_count,
+        new_count=stats.new_count,
+        grammar_count=stats.type_distribution.get("GRAMMAR", 0),
+        vocabulary_count=stats.type_distribution.get("VOCABULARY", 0),
+        due_for_practice=stats.due_for_practice,
+        mastery_percentage=stats.mastery_percentage
+    )
+
+
+@router.post("/mistakes/practice/{mistake_id}/result", response_model=PracticeResultResponse)
+async def submit_practice_result(
+    mistake_id: str,
+    result: PracticeResultRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Record the result of practicing one mistake.
+
+    Args:
+        mistake_id (str): ID of the practiced mistake
+        result (PracticeResultRequest): Whether the answer was correct, and the answer itself
+        current_user (dict): The authenticated user's information
+
+    Returns:
+        PracticeResultResponse: Updated mastery level (0-10), status and next practice date
+            Sample output:
+            {
+                "mistake_id": "507f1f77bcf86cd799439015",
+                "mastery_level": 7,
+                "next_practice_date": "2024-04-08T12:00:00",
+                "status": "LEARNING",
+                "feedback": "Great job! You've correctly used 'went' instead of 'goed'."
+            }
+
+    Raises:
+        HTTPException 400: If the mistake ID is invalid
+        HTTPException 404: If the mistake does not exist or belongs to another user
+    """
+    if not ObjectId.is_valid(mistake_id):
+        raise get_validation_exception({"mistake_id": "Invalid mistake ID"})
+
+    try:
+        updated = mistake_service.update_after_practice(
+            mistake_id,
+            {
+                "user_id": str(current_user["_id"]),
+                "was_successful": result.was_successful,
+                "user_answer": result.user_answer
+            }
+        )
+    except Exception as e:
+        logger.error(f"Error recording practice result: {str(e)}")
+        raise handle_general_exception(e, "mistake")
+
+    if "error" in updated:
+        raise get_not_found_exception("mistake", mistake_id)
+
+    return _to_result_response(mistake_id, updated)
+
+
+@router.post("/mistakes/practice/results", response_model=PracticeResultBatchResponse)
+async def submit_practice_results(
+    request: PracticeResultBatchRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Record all results of a practice session in one request.
+
+    The updates are applied with a single bulk write, so a client finishing
+    a drill sends one request instead of one per item.
+
+    Args:
+        request (PracticeResultBatchRequest): Optional session ID and up to 50 results
+        current_user (dict): The authenticated user's information
+
+    Returns:
+        PracticeResultBatchResponse: Updated state of each mistake, plus IDs that were not found
+            Sample output:
+            {
+                "results": [
+                    {
+                        "mistake_id": "507f1f77bcf86cd799439015",
+                        "mastery_level": 7,
+                        "next_practice_date": "2024-04-08T12:00:00",
+                        "status": "LEARNING",
+                        "feedback": "Great job! ..."
+                    }
+                ],
+                "not_found": []
+            }
+
+    Raises:
+        HTTPException 400: If a mistake or session ID is invalid
+    """
+    invalid = {
+        f"results[{index}].mistake_id": "Invalid mistake ID"
+        for index, item in enumerate(request.results)
+        if not ObjectId.is_valid(item.mistake_id)
+    }
+    if request.session_id and not ObjectId.is_valid(request.session_id):
+        invalid["session_id"] = "Invalid session ID"
+    if invalid:
+        raise get_validation_exception(invalid)
+
+    try:
+        results = mistake_service.record_practice_results(
+            user_id=str(current_user["_id"]),
+            results=[item.model_dump() for item in request.results],
+            session_id=request.session_id
+        )
+    except Exception as e:
+        logger.error(f"Error recording practice results: {str(e)}")
+        raise handle_general_exception(e, "mistakes")
+
+    return PracticeResultBatchResponse(
+        results=[_to_result_response(item["mistake_id"], item) for item in results if "error" not in item],
+        not_found=[item["mistake_id"] for item in results if "error" in item]
+    )
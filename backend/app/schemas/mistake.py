@@ -103,6 +103,9 @@ class PracticeItemResponse(BaseModel):
     correction: str = Field(..., description="Correct version")
     explanation: str = Field(..., description="Explanation of the mistake")
     example_usage: Optional[str] = Field(None, description="Example usage (for vocabulary)")
+    exercise_type: Optional[str] = Field(None, description="Exercise type (FILL_IN_THE_BLANK, REWRITE or CHOOSE_CORRECT) if pre-generated")
+    options: Optional[List[str]] = Field(None, description="Options to choose from (for CHOOSE_CORRECT)")
+    expected_answer: Optional[str] = Field(None, description="Expected answer to the exercise")
 
 class PracticeResultRequest(BaseModel):
     """Schema for submitting practice result"""
@@ -127,3 +130,52 @@ class MistakeStatistics(BaseModel):
     vocabulary_count: int = Field(..., description="Number of vocabulary mistakes")
     due_for_practice: int = Field(..., description="Number of mistakes due for practice")
     mastery_percentage: float = Field(..., description="Percentage of mastered mistakes")
+
+class PracticeResultBatchItem(PracticeResultRequest):
+    """Schema for one result in a batch submission"""
+    mistake_id: str = Field(..., description="ID of the practiced mistake")
+
+class PracticeResultBatchRequest(BaseModel):
+    """Schema for submitting all results of a practice session at once"""
+    session_id: Optional[str] = Field(None, description="Practice session the results belong to")
+    results: List[PracticeResultBatchItem] = Field(..., min_length=1, max_length=50, description="Practice results")
+
+class PracticeResultBatchResponse(BaseModel):
+    """Schema for batch practice result response"""
+    results: List[PracticeResultResponse] = Field(..., description="Updated state of each practiced mistake")
+    not_found: List[str] = Field(default_factory=list, description="IDs of mistakes that were not found")
+
+class MistakeListItem(BaseModel):
+    """Schema for a mistake in the mistake list"""
+    id: str = Field(..., description="Unique identifier for the mistake")
+    type: str = Field(..., description="Type of mistake (GRAMMAR or VOCABULARY)")
+    original_text: str = Field(..., description="Original text with the mistake")
+    correction: str = Field(..., description="Correct version")
+    explanation: str = Field("", description="Explanation of the mistake")
+    status: str = Field(..., description="Current status (NEW, LEARNING, or MASTERED)")
+    mastery_level: int = Field(0, ge=0, le=10, description="Current mastery level (0-10)")
+    frequency: int = Field(1, description="Number of times this mistake has been made")
+    practice_count: int = Field(0, description="Number of times this mistake has been practiced")
+    last_occurred: Optional[datetime] = Field(None, description="When this mistake was last made")
+    next_practice_date: Optional[datetime] = Field(None, description="When this mistake should be practiced next")
+
+class MistakeListResponse(BaseModel):
+    """Schema for a page of mistakes"""
+    items: List[MistakeListItem] = Field(..., description="Mistakes on this page")
+    total: int = Field(..., description="Total number of mistakes matching the filters")
+    skip: int = Field(..., description="Number of mistakes skipped")
+    limit: int = Field(..., description="Maximum number of mistakes per page")
+
+class DueMistakesResponse(BaseModel):
+    """Schema for the mistakes due for practice"""
+    items: List[PracticeItemResponse] = Field(..., description="Due mistakes, earliest first")
+
+class PracticeSessionStartRequest(BaseModel):
+    """Schema for starting a practice session"""
+    limit: int = Field(5, ge=1, le=20, description="Maximum number of mistakes in the session")
+
+class PracticeSessionStartResponse(BaseModel):
+    """Schema for a started practice session"""
+    session_id: str = Field(..., description="Unique identifier for the session")
+    started_at: datetime = Field(..., description="When this session was started")
+    items: List[PracticeItemResponse] = Field(..., description="Mistakes to practice in this session")
@@ -1,18 +1,86 @@
+import json
 import logging
+import os
+import socket
 import time
-from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, List, Callable
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Optional, Callable
 from bson import ObjectId
 import threading
-import queue
+
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
 
 from app.config.database import db
 from app.utils.mistake_service import MistakeService
+from app.utils.schedulers import get_scheduler
+from app.utils.task_metrics import task_metrics
+from app.utils.timing_wheel import TimingWheel
 
 logger = logging.getLogger(__name__)
 
-# Task queue for background processing
-task_queue = queue.Queue()
+# Persisted tasks due within this window are loaded into the in-memory timing wheel
+TASK_LOOKAHEAD_SECONDS = int(os.getenv("TASK_LOOKAHEAD_SECONDS", "300"))
+# Resolution of the timing wheel; tasks fire at most one tick late
+TASK_WHEEL_TICK_SECONDS = float(os.getenv("TASK_WHEEL_TICK_SECONDS", "0.5"))
+# Maximum number of persisted tasks loaded per query
+TASK_LOAD_PAGE_SIZE = int(os.getenv("TASK_LOAD_PAGE_SIZE", "500"))
+# Minimum time between two queries for persisted tasks, so overdue pages cannot cause a query loop
+TASK_MIN_REFRESH_SECONDS = float(os.getenv("TASK_MIN_REFRESH_SECONDS", "1"))
+# Fallback rescan for tasks inserted by other processes when change streams
+# are unavailable (standalone MongoDB). 0 disables the rescan.
+TASK_RESCAN_INTERVAL_SECONDS = int(os.getenv("TASK_RESCAN_INTERVAL_SECONDS", "60"))
+# A claimed task is owned for this long unless its lease is renewed by a heartbeat
+TASK_LEASE_SECONDS = int(os.getenv("TASK_LEASE_SECONDS", "60"))
+TASK_HEARTBEAT_SECONDS = int(os.getenv("TASK_HEARTBEAT_SECONDS", "20"))
+# Tasks whose lease expired this many times (e.g. they crash the process) are failed
+TASK_MAX_ATTEMPTS = int(os.getenv("TASK_MAX_ATTEMPTS", "3"))
+# Size of the thread pool that executes tasks
+EVENT_HANDLER_WORKERS = int(os.getenv("EVENT_HANDLER_WORKERS", "4"))
+# Per task type defaults: concurrently running tasks, and due tasks waiting in memory
+TASK_DEFAULT_MAX_CONCURRENCY = int(os.getenv("TASK_DEFAULT_MAX_CONCURRENCY", str(EVENT_HANDLER_WORKERS)))
+TASK_DEFAULT_MAX_QUEUE = int(os.getenv("TASK_DEFAULT_MAX_QUEUE", "100"))
+# Feedback events for the same user arriving within this window are processed as one task
+MISTAKE_BATCH_WINDOW_SECONDS = int(os.getenv("MISTAKE_BATCH_WINDOW_SECONDS", "10"))
+# Retention of finished tasks per status (0 keeps them forever)
+TASK_RETENTION_SECONDS = {
+    "completed": int(os.getenv("TASK_RETENTION_COMPLETED_SECONDS", str(7 * 24 * 3600))),
+    "failed": int(os.getenv("TASK_RETENTION_FAILED_SECONDS", str(30 * 24 * 3600)))
+}
+# Failed tasks are exported here (one JSONL file per day) before they expire. The directory is
+# local to the node that runs the maintenance task; point it at shared storage when several run
+TASK_ARCHIVE_DIR = os.getenv("TASK_ARCHIVE_DIR", "app/logs/failed_tasks")
+TASK_MAINTENANCE_INTERVAL_SECONDS = int(os.getenv("TASK_MAINTENANCE_INTERVAL_SECONDS", str(24 * 3600)))
+# How often the materialized mistake statistics are recomputed to correct drift
+MISTAKE_STATS_RECONCILE_INTERVAL_SECONDS = int(os.getenv("MISTAKE_STATS_RECONCILE_INTERVAL_SECONDS", str(24 * 3600)))
+# When a task type's queue is full, due tasks stay in the database and are reloaded after this delay
+TASK_DEFER_SECONDS = int(os.getenv("TASK_DEFER_SECONDS", "5"))
+
+
+class TaskType:
+    """
+    A registered task handler and its execution limits.
+    
+    Attributes:
+        name: Task name stored in scheduled_tasks
+        handler: Callable receiving the task data
+        max_concurrency: Maximum number of tasks of this type running at once
+        max_queue: Maximum number of due tasks of this type waiting for a slot
+        running: Number of tasks currently running
+        waiting: IDs of due tasks waiting for a slot (not yet claimed, still
+            in the handler's loaded IDs so refreshes do not load them again)
+    """
+    def __init__(self, name: str, handler: Callable[[Dict[str, Any]], Any], max_concurrency: int, max_queue: int):
+        self.name = name
+        self.handler = handler
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.running = 0
+        self.waiting = deque()
+
 
 class EventHandler:
     """
@@ -22,12 +90,83 @@ class EventHandler:
     1. Process events asynchronously
     2. Schedule tasks for future execution
     3. Manage a task queue for efficient processing
+    
+    Every task is persisted in `db.scheduled_tasks`. Tasks due within
+    TASK_LOOKAHEAD_SECONDS are also kept in an in-memory hierarchical timing
+    wheel (O(1) insert); the worker thread sleeps on a condition variable
+    until the wheel's next slot is due, a new task is scheduled, or the next
+    persisted task enters the lookahead window. Tasks further out stay only
+    in MongoDB and are paged in by scheduled_time shortly before they are due. Tasks inserted by other processes are picked
+    up through a MongoDB change stream when available, so an idle server
+    issues no database queries.
+    
+    Tasks are claimed with a lease (owner + lease_expires_at) through
+    find_one_and_update, so any number of processes on any number of nodes can
+    run the handler and each task runs once. Leases of running tasks are
+    renewed by a heartbeat; tasks whose owner died are returned to pending when
+    their lease expires.
+    
+    Due tasks are executed on a thread pool of EVENT_HANDLER_WORKERS threads.
+    Each task name maps to a handler registered with `register_task_handler`,
+    with its own concurrency cap and queue limit, so a slow task type cannot
+    occupy every worker.
     """
     
     def __init__(self):
         self.mistake_service = MistakeService()
         self.running = False
         self.worker_thread = None
+        self.watch_thread = None
+        
+        # Timing wheel of (task_id, task_name) for loaded tasks, keyed by POSIX time
+        self._wheel = TimingWheel(tick_seconds=TASK_WHEEL_TICK_SECONDS, start=time.time())
+        self._loaded_ids = set()
+        self._cond = threading.Condition()
+        
+        # When the persisted tasks must be queried again (None = not needed)
+        self._next_refresh: Optional[datetime] = None
+        self._change_stream = None
+        self._change_stream_active = False
+        
+        # Lease ownership
+        self.owner_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._held_leases = set()
+        self._lease_cond = threading.Condition()
+        self.heartbeat_thread = None
+        
+        # Task execution
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._task_types: Dict[str, TaskType] = {}
+        self.register_task_handler("process_feedback_for_mistakes", self._handle_process_feedback_for_mistakes)
+        self.register_task_handler("calculate_next_practice_dates", self._handle_calculate_next_practice_dates)
+        self.register_task_handler("scheduled_tasks_maintenance", self._handle_scheduled_tasks_maintenance, max_concurrency=1)
+        self.register_task_handler("reconcile_mistake_stats", self._handle_reconcile_mistake_stats, max_concurrency=1)
+    
+    def register_task_handler(
+        self,
+        task_name: str,
+        handler: Callable[[Dict[str, Any]], Any],
+        max_concurrency: Optional[int] = None,
+        max_queue: Optional[int] = None
+    ):
+        """
+        Register the handler for a task name.
+        
+        Args:
+            task_name: Name used when scheduling the task
+            handler: Callable receiving the task data; raising marks the task failed
+            max_concurrency: Maximum concurrently running tasks of this type
+                (defaults to TASK_DEFAULT_MAX_CONCURRENCY)
+            max_queue: Maximum due tasks of this type waiting in memory
+                (defaults to TASK_DEFAULT_MAX_QUEUE)
+        """
+        with self._cond:
+            self._task_types[task_name] = TaskType(
+                name=task_name,
+                handler=handler,
+                max_concurrency=max_concurrency if max_concurrency is not None else TASK_DEFAULT_MAX_CONCURRENCY,
+                max_queue=max_queue if max_queue is not None else TASK_DEFAULT_MAX_QUEUE
+            )
     
     def start(self):
         """Start the background event processing thread."""
@@ -35,15 +174,52 @@ class EventHandler:
             return
             
         self.running = True
+        self._ensure_indexes()
+        self.schedule_periodic_task("scheduled_tasks_maintenance", TASK_MAINTENANCE_INTERVAL_SECONDS)
+        self.schedule_periodic_task("reconcile_mistake_stats", MISTAKE_STATS_RECONCILE_INTERVAL_SECONDS)
+        self._schedule_rescheduling_if_switched()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, EVENT_HANDLER_WORKERS), thread_name_prefix="event-task")
+        
+        self.watch_thread = threading.Thread(target=self._watch_new_tasks, daemon=True)
+        self.watch_thread.start()
+        
+        self.heartbeat_thread = threading.Thread(target=self._heartbeat_leases, daemon=True)
+        self.heartbeat_thread.start()
+        
         self.worker_thread = threading.Thread(target=self._process_queue, daemon=True)
         self.worker_thread.start()
-        logger.info("Background event handler started")
+        logger.info(f"Background event handler started as {self.owner_id}")
     
     def stop(self):
-        """Stop the background event processing thread."""
-        self.running = False
+        """Stop the background threads, letting running tasks finish."""
+        with self._cond:
+            self.running = False
+            for task_type in self._task_types.values():
+                # Unclaimed, so they stay pending in the database
+                self._loaded_ids.difference_update(task_type.waiting)
+                task_type.waiting.clear()
+            self._cond.notify_all()
+        
+        if self._change_stream is not None:
+            try:
+                self._change_stream.close()
+            except Exception:
+                pass
+        
         if self.worker_thread:
             self.worker_thread.join(timeout=5)
+        if self.watch_thread:
+            self.watch_thread.join(timeout=5)
+        if self._executor:
+            # The heartbeat keeps renewing leases until running tasks are done
+            self._executor.shutdown(wait=True)
+            with self._cond:
+                self._executor = None
+        
+        with self._lease_cond:
+            self._lease_cond.notify_all()
+        if self.heartbeat_thread:
+            self.heartbeat_thread.join(timeout=5)
         logger.info("Background event handler stopped")
     
     def on_new_feedback(self, feedback_id: str, user_id: Optional[str] = None, transcription: Optional[str] = None):
@@ -58,22 +234,23 @@ class EventHandler:
         logger.info(f"Received new feedback event for feedback_id: {feedback_id}")
         
         try:
-            # Schedule task to process this feedback for mistakes
-            task_data = {
+            item = {
                 "feedback_id": feedback_id
             }
             
             # Add additional data if provided
             if user_id:
-                task_data["user_id"] = user_id
+                item["user_id"] = user_id
             
             if transcription:
-                task_data["transcription"] = transcription
+                item["transcription"] = transcription
             
-            self.schedule_task(
+            # Coalesce with the user's other feedback from the same window
+            self.schedule_batched_task(
                 task_name="process_feedback_for_mistakes",
-                data=task_data,
-                delay_in_seconds=0  # Process immediately
+                group_key=user_id or feedback_id,
+                item=item,
+                delay_in_seconds=MISTAKE_BATCH_WINDOW_SECONDS
             )
         except Exception as e:
             logger.error(f"Error scheduling feedback processing: {str(e)}")
@@ -113,9 +290,11 @@ class EventHandler:
             # Store in database
             db.scheduled_tasks.insert_one(task)
             
-            # Add to in-memory queue if delay is small
-            if delay_in_seconds < 300:  # Less than 5 minutes
-                task_queue.put((execution_time, task_id, task_name, data))
+            # Keep near-term tasks in memory and wake the worker
+            if delay_in_seconds < TASK_LOOKAHEAD_SECONDS:
+                self._push_task(execution_time, task_id, task_name)
+            else:
+                self._note_future_task(execution_time)
                 
             return task_id
                 
@@ -123,108 +302,569 @@ class EventHandler:
             logger.error(f"Error scheduling task: {str(e)}")
             raise Exception(f"Failed to schedule task: {str(e)}")
     
+    def schedule_batched_task(
+        self,
+        task_name: str,
+        group_key: str,
+        item: Dict[str, Any],
+        delay_in_seconds: int = 0
+    ) -> str:
+        """
+        Add an item to the pending batch task for a group, creating it if needed.
+        
+        Items scheduled for the same task name and group key while a task is
+        still pending are appended to that task's `data.items`; the first item
+        fixes the execution time. Once the task is claimed, new items start a
+        new batch. A unique partial index allows one pending batch per group;
+        an upsert that loses a race against another process is retried and
+        then appends to the batch the other process created.
+        
+        Args:
+            task_name: Name of the task to execute
+            group_key: Key identifying the batch (e.g. a user ID)
+            item: Item to add to the batch
+            delay_in_seconds: Delay before executing a newly created batch
+            
+        Returns:
+            ID of the batch task
+            
+        Raises:
+            SchedulingError: If task scheduling fails
+        """
+        try:
+            now = datetime.utcnow()
+            execution_time = now + timedelta(seconds=delay_in_seconds)
+            new_id = ObjectId()
+            
+            for attempt in range(2):
+                try:
+                    task = db.scheduled_tasks.find_one_and_update(
+                        {"task_name": task_name, "status": "pending", "data.group_key": group_key},
+                        {
+                            "$push": {"data.items": item},
+                            "$setOnInsert": {"_id": new_id, "scheduled_time": execution_time, "created_at": now}
+                        },
+                        projection={"scheduled_time": 1},
+                        upsert=True,
+                        return_document=ReturnDocument.AFTER
+                    )
+                    break
+                except DuplicateKeyError:
+                    if attempt:
+                        raise
+            task_id = str(task["_id"])
+            
+            if task["_id"] == new_id:
+                # A new batch: keep it in memory and wake the worker
+                if delay_in_seconds < TASK_LOOKAHEAD_SECONDS:
+                    self._push_task(task["scheduled_time"], task_id, task_name)
+                else:
+                    self._note_future_task(task["scheduled_time"])
+            
+            return task_id
+            
+        except Exception as e:
+            logger.error(f"Error scheduling batched task: {str(e)}")
+            raise Exception(f"Failed to schedule task: {str(e)}")
+    
+    def schedule_periodic_task(self, task_name: str, interval_seconds: int) -> Optional[str]:
+        """
+        Make sure a recurring task has a pending run.
+        
+        At most one pending run exists per task name, no matter how many
+        processes call this; after each run the next one is scheduled
+        `interval_seconds` later.
+        
+        Args:
+            task_name: Name of the task to execute
+            interval_seconds: Time between runs (0 disables the task)
+            
+        Returns:
+            ID of the pending run, or None if disabled
+        """
+        if interval_seconds <= 0:
+            return None
+        
+        try:
+            now = datetime.utcnow()
+            execution_time = now + timedelta(seconds=interval_seconds)
+            new_id = ObjectId()
+            
+            task = db.scheduled_tasks.find_one_and_update(
+                {"task_name": task_name, "status": "pending", "data.group_key": "periodic"},
+                {
+                    "$setOnInsert": {
+                        "_id": new_id,
+                        "data.interval_seconds": interval_seconds,
+                        "scheduled_time": execution_time,
+                        "created_at": now
+                    }
+                },
+                projection={"scheduled_time": 1},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            task_id = str(task["_id"])
+            
+            if task["_id"] == new_id:
+                if interval_seconds < TASK_LOOKAHEAD_SECONDS:
+                    self._push_task(execution_time, task_id, task_name)
+                else:
+                    self._note_future_task(execution_time)
+            
+            return task_id
+            
+        except Exception as e:
+            logger.error(f"Error scheduling periodic task {task_name}: {str(e)}")
+            return None
+    
     def process_queued_tasks(self):
-        """Process all queued tasks that are due for execution."""
+        """Run every persisted task that is already due, synchronously."""
         try:
             now = datetime.utcnow()
             
             # Find tasks due for execution
-            due_tasks = db.scheduled_tasks.find({
-                "scheduled_time": {"$lte": now},
-                "status": "pending"
-            })
+            due_tasks = db.scheduled_tasks.find(
+                {"status": "pending", "scheduled_time": {"$lte": now}},
+                {"_id": 1}
+            ).sort("scheduled_time", ASCENDING)
             
-            # Process each task
             for task in due_tasks:
-                try:
-                    # Mark as processing
-                    db.scheduled_tasks.update_one(
-                        {"_id": task["_id"]},
-                        {"$set": {"status": "processing", "started_at": now}}
-                    )
-                    
-                    # Process task based on task name
-                    self._execute_task(task["task_name"], task["data"])
-                    
-                    # Mark as completed
-                    db.scheduled_tasks.update_one(
-                        {"_id": task["_id"]},
-                        {"$set": {"status": "completed", "completed_at": datetime.utcnow()}}
-                    )
-                    
-                except Exception as e:
-                    logger.error(f"Error processing task {task['_id']}: {str(e)}")
-                    
-                    # Mark as failed
-                    db.scheduled_tasks.update_one(
-                        {"_id": task["_id"]},
-                        {
-                            "$set": {
-                                "status": "failed",
-                                "error": str(e),
-                                "failed_at": datetime.utcnow()
-                            }
-                        }
-                    )
+                self._run_task(str(task["_id"]))
                     
         except Exception as e:
             logger.error(f"Error processing queued tasks: {str(e)}")
     
+    def _ensure_indexes(self):
+        """
+        Create the indexes that serve the next-due and lease recovery queries.
+        
+        The scheduler indexes are partial, so they only hold pending (or
+        processing) tasks and stay small however many finished tasks are kept.
+        Finished tasks are removed by a TTL index on `expire_at`, and failed
+        tasks waiting to be archived have their own partial index. Pending
+        batch tasks are unique per (task_name, data.group_key).
+        """
+        try:
+            db.scheduled_tasks.create_index(
+                [("scheduled_time", ASCENDING)],
+                name="pending_scheduled_time",
+                partialFilterExpression={"status": "pending"}
+            )
+            db.scheduled_tasks.create_index(
+                [("lease_expires_at", ASCENDING)],
+                name="processing_lease_expires_at",
+                partialFilterExpression={"status": "processing"}
+            )
+            db.scheduled_tasks.create_index([("expire_at", ASCENDING)], expireAfterSeconds=0)
+            db.scheduled_tasks.create_index(
+                [("_id", ASCENDING)],
+                name="failed_unarchived",
+                partialFilterExpression={"status": "failed", "archived": False}
+            )
+            db.scheduled_tasks.create_index(
+                [("task_name", ASCENDING), ("data.group_key", ASCENDING)],
+                name="pending_batch_group",
+                unique=True,
+                partialFilterExpression={"status": "pending", "data.group_key": {"$exists": True}}
+            )
+        except PyMongoError as e:
+            logger.error(f"Error creating scheduled_tasks index: {str(e)}")
+    
+    def _push_task(self, scheduled_time: datetime, task_id: str, task_name: str):
+        """Add a task to the timing wheel and wake the worker."""
+        with self._cond:
+            if task_id in self._loaded_ids:
+                return
+            self._loaded_ids.add(task_id)
+            deadline = self._wheel.next_deadline()
+            due = scheduled_time.replace(tzinfo=timezone.utc).timestamp()
+            self._wheel.add(due, (task_id, task_name))
+            if deadline is None or due < deadline:
+                # The worker sleeps until the old deadline; wake it to recompute
+                self._cond.notify()
+    
+    def _note_future_task(self, scheduled_time: datetime):
+        """Make sure the worker refreshes when a task beyond the window enters it."""
+        wake_at = scheduled_time - timedelta(seconds=TASK_LOOKAHEAD_SECONDS)
+        with self._cond:
+            if self._next_refresh is None or wake_at < self._next_refresh:
+                self._next_refresh = wake_at
+                self._cond.notify()
+    
+    def _refresh_from_db(self):
+        """
+        Load persisted tasks that are due within the lookahead window.
+        
+        Also computes when the next refresh is needed: when the earliest task
+        beyond the window enters it, when the page that was just loaded has
+        been worked through, or when the earliest lease held by any process
+        may expire. The next refresh is never sooner than
+        TASK_MIN_REFRESH_SECONDS, since a page of overdue tasks would
+        otherwise ask for an immediate refresh every time.
+        """
+        now = datetime.utcnow()
+        horizon = now + timedelta(seconds=TASK_LOOKAHEAD_SECONDS)
+        
+        # Return tasks of dead owners to pending before loading
+        next_lease_expiry = self._recover_expired_leases(now)
+        
+        upcoming = list(db.scheduled_tasks.find(
+            {"status": "pending", "scheduled_time": {"$lte": horizon}},
+            {"scheduled_time": 1, "task_name": 1}
+        ).sort("scheduled_time", ASCENDING).limit(TASK_LOAD_PAGE_SIZE))
+        
+        for task in upcoming:
+            self._push_task(task["scheduled_time"], str(task["_id"]), task["task_name"])
+        
+        if len(upcoming) >= TASK_LOAD_PAGE_SIZE:
+            # More due tasks than fit in one page: come back after this page
+            next_refresh = upcoming[-1]["scheduled_time"]
+        else:
+            next_task = db.scheduled_tasks.find_one(
+                {"status": "pending", "scheduled_time": {"$gt": horizon}},
+                {"scheduled_time": 1},
+                sort=[("scheduled_time", ASCENDING)]
+            )
+            next_refresh = None
+            if next_task:
+                next_refresh = next_task["scheduled_time"] - timedelta(seconds=TASK_LOOKAHEAD_SECONDS)
+        
+        if next_lease_expiry and (next_refresh is None or next_lease_expiry < next_refresh):
+            next_refresh = next_lease_expiry
+        
+        # Without change streams, rescan periodically for other processes' tasks
+        if not self._change_stream_active and TASK_RESCAN_INTERVAL_SECONDS > 0:
+            rescan_at = now + timedelta(seconds=TASK_RESCAN_INTERVAL_SECONDS)
+            if next_refresh is None or rescan_at < next_refresh:
+                next_refresh = rescan_at
+        
+        if next_refresh is not None:
+            next_refresh = max(next_refresh, now + timedelta(seconds=TASK_MIN_REFRESH_SECONDS))
+        
+        with self._cond:
+            self._next_refresh = next_refresh
+    
     def _process_queue(self):
-        """Worker thread function to process the task queue."""
+        """Dispatcher thread function: sleep until the next task is due, then hand it to the pool."""
+        refresh_needed = True
+        
         while self.running:
             try:
-                # Process database tasks
-                self.process_queued_tasks()
+                if refresh_needed:
+                    self._refresh_from_db()
+                    refresh_needed = False
                 
-                # Process in-memory queue
-                now = datetime.utcnow()
-                
-                # Check if there are tasks to process
-                if not task_queue.empty():
-                    # Get the next task but don't remove it yet
-                    execution_time, task_id, task_name, data = task_queue.queue[0]
-                    
-                    # If it's time to execute
-                    if execution_time <= now:
-                        # Remove from queue
-                        task_queue.get()
+                with self._cond:
+                    while self.running:
+                        # Dispatch what is due first, so a refresh never starves the wheel
+                        self._dispatch_due_tasks()
                         
-                        try:
-                            # Execute the task
-                            self._execute_task(task_name, data)
-                            
-                            # Update task status in database
-                            db.scheduled_tasks.update_one(
-                                {"_id": ObjectId(task_id)},
-                                {"$set": {"status": "completed", "completed_at": datetime.utcnow()}}
-                            )
-                            
-                        except Exception as e:
-                            logger.error(f"Error executing task {task_id}: {str(e)}")
-                            
-                            # Update task status in database
-                            db.scheduled_tasks.update_one(
-                                {"_id": ObjectId(task_id)},
-                                {
-                                    "$set": {
-                                        "status": "failed",
-                                        "error": str(e),
-                                        "failed_at": datetime.utcnow()
-                                    }
-                                }
-                            )
-                
-                # Sleep to avoid high CPU usage
-                time.sleep(1)
+                        now = datetime.utcnow()
+                        if self._next_refresh is not None and self._next_refresh <= now:
+                            refresh_needed = True
+                            break
+                        
+                        # Sleep until the next wheel slot or the next refresh, whichever is first
+                        timeouts = []
+                        deadline = self._wheel.next_deadline()
+                        if deadline is not None:
+                            timeouts.append(deadline - time.time())
+                        if self._next_refresh is not None:
+                            timeouts.append((self._next_refresh - now).total_seconds())
+                        self._cond.wait(timeout=max(0.0, min(timeouts)) if timeouts else None)
                 
             except Exception as e:
                 logger.error(f"Error in task processing thread: {str(e)}")
-                time.sleep(5)  # Sleep longer on error
+                with self._cond:
+                    self._cond.wait(timeout=5)  # Back off on error
+                refresh_needed = True
+    
+    def _dispatch_due_tasks(self):
+        """Hand every task that is due in the timing wheel to _dispatch_task. Caller must hold the lock."""
+        for task_id, task_name in self._wheel.advance(time.time()):
+            self._dispatch_task(task_id, task_name)
+    
+    def _dispatch_task(self, task_id: str, task_name: str):
+        """
+        Start a due task, park it until its type has a free slot, or defer it.
+        
+        Parked tasks are not claimed yet, so other processes can still run
+        them; they stay in the loaded IDs until they are submitted, so a
+        refresh does not park them a second time. When the type's queue is
+        full the task is left pending in the database and reloaded after
+        TASK_DEFER_SECONDS. Caller must hold the lock.
+        
+        Args:
+            task_id: ID of the due task
+            task_name: Name of the task
+        """
+        task_type = self._task_types.get(task_name)
+        if task_type is None:
+            # Let _run_task claim it and record the unknown name as a failure
+            self._submit_task(task_id, None)
+            return
+        
+        if task_type.running < task_type.max_concurrency:
+            self._submit_task(task_id, task_type)
+        elif len(task_type.waiting) < task_type.max_queue:
+            task_type.waiting.append(task_id)
+        else:
+            logger.warning(f"Task queue for {task_name} is full, deferring task {task_id}")
+            self._loaded_ids.discard(task_id)
+            defer_until = datetime.utcnow() + timedelta(seconds=TASK_DEFER_SECONDS)
+            if self._next_refresh is None or defer_until < self._next_refresh:
+                self._next_refresh = defer_until
+    
+    def _submit_task(self, task_id: str, task_type: Optional[TaskType]):
+        """Run a task on the pool, counting it against its type. Caller must hold the lock."""
+        self._loaded_ids.discard(task_id)
+        if not self.running or self._executor is None:
+            # Stopping (the dispatcher may outlive stop's join timeout); the task is unclaimed and stays pending
+            return
+        if task_type is not None:
+            task_type.running += 1
+        future = self._executor.submit(self._run_task, task_id)
+        future.add_done_callback(lambda _: self._on_task_done(task_type))
+    
+    def _on_task_done(self, task_type: Optional[TaskType]):
+        """Release a slot and start the next parked task of the same type."""
+        if task_type is None:
+            return
+        with self._cond:
+            task_type.running -= 1
+            if self.running and task_type.waiting and task_type.running < task_type.max_concurrency:
+                self._submit_task(task_type.waiting.popleft(), task_type)
+    
+    def _watch_new_tasks(self):
+        """
+        Follow inserts into scheduled_tasks made by any process via a change stream.
+        
+        Requires a replica set. On a standalone server the watch fails and the
+        worker falls back to rescanning every TASK_RESCAN_INTERVAL_SECONDS.
+        """
+        pipeline = [{"$match": {"operationType": "insert", "fullDocument.status": "pending"}}]
+        try:
+            with db.scheduled_tasks.watch(pipeline) as stream:
+                self._change_stream = stream
+                self._change_stream_active = True
+                for change in stream:
+                    if not self.running:
+                        break
+                    task = change["fullDocument"]
+                    horizon = datetime.utcnow() + timedelta(seconds=TASK_LOOKAHEAD_SECONDS)
+                    if task["scheduled_time"] <= horizon:
+                        self._push_task(task["scheduled_time"], str(task["_id"]), task["task_name"])
+                    else:
+                        self._note_future_task(task["scheduled_time"])
+        except PyMongoError as e:
+            if self.running:
+                logger.info(f"Change streams unavailable for scheduled_tasks, falling back to periodic rescans: {str(e)}")
+        finally:
+            self._change_stream_active = False
+            self._change_stream = None
+            # Let the worker schedule its fallback rescan
+            with self._cond:
+                if self.running and TASK_RESCAN_INTERVAL_SECONDS > 0:
+                    self._next_refresh = datetime.utcnow()
+                    self._cond.notify()
+    
+    def _recover_expired_leases(self, now: datetime) -> Optional[datetime]:
+        """
+        Return processing tasks with an expired lease to pending.
+        
+        Tasks that already used TASK_MAX_ATTEMPTS claims are marked failed
+        instead, so a task that kills its worker cannot loop forever.
+        
+        Args:
+            now: Current time
+            
+        Returns:
+            The earliest lease expiry still in the future, if any
+        """
+        expired = {"status": "processing", "lease_expires_at": {"$lte": now}}
+        
+        db.scheduled_tasks.update_many(
+            {**expired, "attempts": {"$gte": TASK_MAX_ATTEMPTS}},
+            {
+                "$set": {
+                    "status": "failed",
+                    "error": f"Lease expired after {TASK_MAX_ATTEMPTS} attempts",
+                    "failed_at": now,
+                    "archived": False,
+                    **self._retention_fields("failed", now)
+                },
+                "$unset": {"owner": "", "lease_expires_at": ""}
+            }
+        )
+        result = db.scheduled_tasks.update_many(
+            expired,
+            {
+                "$set": {"status": "pending"},
+                "$unset": {"owner": "", "lease_expires_at": ""}
+            }
+        )
+        if result.modified_count:
+            logger.warning(f"Recovered {result.modified_count} tasks with expired leases")
+        
+        next_lease = db.scheduled_tasks.find_one(
+            {"status": "processing", "lease_expires_at": {"$gt": now}},
+            {"lease_expires_at": 1},
+            sort=[("lease_expires_at", ASCENDING)]
+        )
+        return next_lease["lease_expires_at"] if next_lease else None
+    
+    def _claim_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Atomically take a lease on a task.
+        
+        A task can be claimed if it is pending, or if it is processing but its
+        lease has expired (its owner is presumed dead) and it has attempts
+        left; otherwise _recover_expired_leases marks it failed.
+        
+        Args:
+            task_id: ID of the task to claim
+            
+        Returns:
+            The claimed task document, or None if another owner has it
+        """
+        now = datetime.utcnow()
+        return db.scheduled_tasks.find_one_and_update(
+            {
+                "_id": ObjectId(task_id),
+                "$or": [
+                    {"status": "pending"},
+                    {
+                        "status": "processing",
+                        "lease_expires_at": {"$lte": now},
+                        "attempts": {"$not": {"$gte": TASK_MAX_ATTEMPTS}}
+                    }
+                ]
+            },
+            {
+                "$set": {
+                    "status": "processing",
+                    "owner": self.owner_id,
+                    "started_at": now,
+                    "lease_expires_at": now + timedelta(seconds=TASK_LEASE_SECONDS)
+                },
+                "$inc": {"attempts": 1}
+            },
+            return_document=ReturnDocument.AFTER
+        )
+    
+    def _heartbeat_leases(self):
+        """
+        Renew the leases of tasks this process is running.
+        
+        All held leases are extended with one update every
+        TASK_HEARTBEAT_SECONDS; nothing is sent while no task is running.
+        """
+        while self.running or self._held_leases:
+            with self._lease_cond:
+                while self.running and not self._held_leases:
+                    self._lease_cond.wait()
+                if not self._held_leases:
+                    return
+                self._lease_cond.wait(timeout=TASK_HEARTBEAT_SECONDS)
+                held = list(self._held_leases)
+            
+            if not held:
+                continue
+            
+            try:
+                db.scheduled_tasks.update_many(
+                    {"_id": {"$in": held}, "owner": self.owner_id, "status": "processing"},
+                    {"$set": {"lease_expires_at": datetime.utcnow() + timedelta(seconds=TASK_LEASE_SECONDS)}}
+                )
+            except PyMongoError as e:
+                logger.error(f"Error renewing task leases: {str(e)}")
+    
+    def _run_task(self, task_id: str):
+        """
+        Claim a persisted task and execute it.
+        
+        The claim only succeeds if the task is pending or its lease expired,
+        so a task already running elsewhere (or cancelled) is skipped. Status
+        updates are conditional on still owning the task.
+        
+        Args:
+            task_id: ID of the task to run
+        """
+        task = self._claim_task(task_id)
+        if not task:
+            return
+        
+        with self._lease_cond:
+            if not self._held_leases:
+                # Wake the heartbeat thread; it is already ticking otherwise
+                self._lease_cond.notify()
+            self._held_leases.add(task["_id"])
+        
+        task_metrics.observe_start(task["task_name"], task.get("scheduled_time"), task["started_at"])
+        started = time.monotonic()
+        
+        try:
+            # Process task based on task name
+            self._execute_task(task["task_name"], task["data"])
+            task_metrics.observe_finish(task["task_name"], time.monotonic() - started, succeeded=True)
+            
+            # Mark as completed
+            now = datetime.utcnow()
+            db.scheduled_tasks.update_one(
+                {"_id": task["_id"], "owner": self.owner_id},
+                {
+                    "$set": {"status": "completed", "completed_at": now, **self._retention_fields("completed", now)},
+                    "$unset": {"lease_expires_at": ""}
+                }
+            )
+            
+        except Exception as e:
+            logger.error(f"Error processing task {task['_id']}: {str(e)}")
+            task_metrics.observe_finish(task["task_name"], time.monotonic() - started, succeeded=False)
+            
+            # Mark as failed
+            now = datetime.utcnow()
+            db.scheduled_tasks.update_one(
+                {"_id": task["_id"], "owner": self.owner_id},
+                {
+                    "$set": {
+                        "status": "failed",
+                        "error": str(e),
+                        "failed_at": now,
+                        "archived": False,
+                        **self._retention_fields("failed", now)
+                    },
+                    "$unset": {"lease_expires_at": ""}
+                }
+            )
+        finally:
+            with self._lease_cond:
+                self._held_leases.discard(task["_id"])
+            
+            interval_seconds = task["data"].get("interval_seconds")
+            if interval_seconds and self.running:
+                self.schedule_periodic_task(task["task_name"], interval_seconds)
+    
+    def _retention_fields(self, status: str, now: datetime) -> Dict[str, Any]:
+        """
+        Get the TTL field for a task that reached a final status.
+        
+        Args:
+            status: Final status ("completed" or "failed")
+            now: Time the status was reached
+            
+        Returns:
+            {"expire_at": ...}, or an empty dict if the status is kept forever
+        """
+        retention = TASK_RETENTION_SECONDS.get(status, 0)
+        if retention <= 0:
+            return {}
+        return {"expire_at": now + timedelta(seconds=retention)}
     
     def _execute_task(self, task_name: str, data: Dict[str, Any]):
         """
-        Execute a task based on its name.
+        Execute a task with its registered handler.
         
         Args:
             task_name: Name of the task to execute
@@ -233,94 +873,145 @@ class EventHandler:
         Raises:
             ValueError: If task name is unknown
         """
-        if task_name == "process_feedback_for_mistakes":
-            # Get feedback record
-            feedback_id = data.get("feedback_id")
-            if not feedback_id:
-                raise ValueError("Missing feedback_id in task data")
-            
-            feedback = db.feedback.find_one({"_id": ObjectId(feedback_id)})
-            
-            if not feedback:
-                raise ValueError(f"Feedback with ID {feedback_id} not found")
+        task_type = self._task_types.get(task_name)
+        if task_type is None:
+            raise ValueError(f"Unknown task name: {task_name}")
+        
+        task_type.handler(data)
+    
+    def _handle_process_feedback_for_mistakes(self, data: Dict[str, Any]):
+        """
+        Extract mistakes from a batch of feedback records and store them.
+        
+        Args:
+            data: Task data with `items` (feedback_id and optionally user_id and
+                transcription each), or a single item's fields for tasks
+                scheduled before batching
             
-            # Check if user_id and transcription are already in the task data
-            user_id = data.get("user_id")
-            transcription = data.get("transcription")
+        Raises:
+            ValueError: If no feedback ID is given
+        """
+        items = data.get("items") or [data]
+        if not any(item.get("feedback_id") for item in items):
+            raise ValueError("Missing feedback_id in task data")
+        
+        processed = self.mistake_service.process_feedback_batch(items)
+        logger.info(f"Processed {processed} mistakes from {len(items)} feedback records")
+    
+    def _handle_scheduled_tasks_maintenance(self, data: Dict[str, Any]):
+        """
+        Archive failed tasks and apply retention to tasks finished before it existed.
+        
+        Failed tasks not archived yet (found through the failed_unarchived
+        partial index) are appended to a JSONL file per day in TASK_ARCHIVE_DIR,
+        so they can be inspected after the TTL index removes them. The files
+        are written on the node that runs this task.
+        
+        Args:
+            data: Task data (unused apart from the schedule)
+        """
+        os.makedirs(TASK_ARCHIVE_DIR, exist_ok=True)
+        archive_path = os.path.join(TASK_ARCHIVE_DIR, f"failed_tasks-{datetime.utcnow():%Y%m%d}.jsonl")
+        
+        archived = 0
+        while True:
+            failed_tasks = list(db.scheduled_tasks.find(
+                {"status": "failed", "archived": False}
+            ).sort("_id", ASCENDING).limit(TASK_LOAD_PAGE_SIZE))
+            if not failed_tasks:
+                break
             
-            # If not in task data, try to get from feedback record
-            if not user_id:
-                user_id = str(feedback.get("user_id", "")) if feedback.get("user_id") else None
+            with open(archive_path, "a", encoding="utf-8") as archive:
+                for task in failed_tasks:
+                    archive.write(json.dumps(task, default=str) + "\n")
             
-            if not transcription:
-                transcription = feedback.get("transcription")
+            db.scheduled_tasks.update_many(
+                {"_id": {"$in": [task["_id"] for task in failed_tasks]}},
+                {"$set": {"archived": True, "archived_at": datetime.utcnow()}}
+            )
+            archived += len(failed_tasks)
+        
+        # Tasks finished before retention was introduced have no expire_at yet
+        now = datetime.utcnow()
+        for status, retention in TASK_RETENTION_SECONDS.items():
+            if retention > 0:
+                db.scheduled_tasks.update_many(
+                    {"status": status, "expire_at": {"$exists": False}},
+                    {"$set": {"expire_at": now + timedelta(seconds=retention)}}
+                )
+        
+        if archived:
+            logger.info(f"Archived {archived} failed tasks to {archive_path}")
+    
+    def _handle_reconcile_mistake_stats(self, data: Dict[str, Any]):
+        """
+        Recompute every user's materialized mistake statistics.
+        
+        Args:
+            data: Task data (unused apart from the schedule)
+        """
+        reconciled = self.mistake_service.reconcile_all_mistake_stats()
+        logger.info(f"Reconciled mistake statistics for {reconciled} users")
+    
+    def _handle_calculate_next_practice_dates(self, data: Dict[str, Any]):
+        """
+        Recalculate next practice dates with the active scheduler.
+        
+        Reschedules one user's mistakes if the task has a user ID, otherwise
+        every user's, and then records the active scheduler as applied.
+        
+        Args:
+            data: Task data, optionally with user_id
+        """
+        user_id = data.get("user_id")
+        
+        if user_id:
+            updated = self.mistake_service.update_next_practice_dates(user_id)
+            logger.info(f"Rescheduled {updated} mistakes for user {user_id}")
+            return
+        
+        scheduler = get_scheduler()
+        updated = self.mistake_service.reschedule_all_mistakes()
+        db.app_settings.update_one(
+            {"_id": "mistake_scheduler"},
+            {"$set": {"name": scheduler.name, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+        logger.info(f"Rescheduled {updated} mistakes with the {scheduler.name} scheduler")
+    
+    def _schedule_rescheduling_if_switched(self):
+        """
+        Schedule rescheduling of all mistakes if the active scheduler changed.
+        
+        The scheduler last applied to the stored mistakes is kept in
+        db.app_settings, so the rescheduling runs once per switch rather than
+        on every practice request. Mistakes without scheduler state follow
+        the original exponential schedule, so no rescheduling is needed when
+        that is the first scheduler recorded.
+        """
+        try:
+            scheduler = get_scheduler()
+            setting = db.app_settings.find_one({"_id": "mistake_scheduler"})
+            applied = setting.get("name") if setting else None
             
-            # Get associated target (e.g., message, audio) if still missing information
-            if not user_id or not transcription:
-                target_id = feedback.get("target_id")
-                target_type = feedback.get("target_type")
-                context = {}
-                
-                if target_type == "message":
-                    message = db.messages.find_one({"_id": target_id})
-                    if message:
-                        if not user_id:
-                            user_id = str(message.get("user_id", ""))
-                        if not transcription:
-                            transcription = message.get("content")
-                        
-                        # Get conversation context
-                        conversation = db.conversations.find_one({"_id": message.get("conversation_id")})
-                        if conversation:
-                            context = {
-                                "user_role": conversation.get("user_role"),
-                                "ai_role": conversation.get("ai_role"),
-                                "situation": conversation.get("situation")
-                            }
-                
-                elif target_type == "audio":
-                    audio = db.audio.find_one({"_id": target_id})
-                    if audio:
-                        if not user_id:
-                            user_id = str(audio.get("user_id", ""))
-                        if not transcription:
-                            transcription = audio.get("transcription")
-            
-            # Log warnings if still missing critical data
-            if not user_id:
-                logger.warning(f"Missing user_id for feedback {feedback_id}")
-                user_id = "unknown_user"  # Use fallback
-            
-            if not transcription:
-                logger.warning(f"Missing transcription for feedback {feedback_id}")
-                transcription = ""  # Use empty string as fallback
-            
-            # If both user_id and transcription are empty, can't process
-            if user_id == "unknown_user" and not transcription:
-                logger.error(f"Missing user_id or transcription for feedback {feedback_id}")
+            if applied == scheduler.name:
                 return
-            
-            # Process the feedback for mistakes
-            try:
-                self.mistake_service.extract_and_store_mistakes(
-                    user_id=user_id,
-                    transcription=transcription,
-                    feedback=feedback
+            if applied is None and scheduler.name == "exponential":
+                db.app_settings.update_one(
+                    {"_id": "mistake_scheduler"},
+                    {"$setOnInsert": {"name": scheduler.name, "updated_at": datetime.utcnow()}},
+                    upsert=True
                 )
-            except Exception as e:
-                logger.error(f"Error extracting mistakes: {str(e)}")
-        elif task_name == "calculate_next_practice_dates":
-            # Get user ID
-            user_id = data.get("user_id")
-            
-            if not user_id:
-                raise ValueError("User ID is required")
-                
-            # Calculate next practice dates for all user's mistakes
-            self.mistake_service.update_next_practice_dates(user_id)
+                return
             
-        else:
-            raise ValueError(f"Unknown task name: {task_name}")
+            self.schedule_batched_task(
+                task_name="calculate_next_practice_dates",
+                group_key="reschedule_all",
+                item={"scheduler": scheduler.name}
+            )
+            logger.info(f"Scheduled rescheduling of all mistakes: {applied} -> {scheduler.name}")
+        except Exception as e:
+            logger.error(f"Error checking the mistake scheduler: {str(e)}")
 
 # Create a singleton instance
 event_handler = EventHandler() 
\ No newline at end of file
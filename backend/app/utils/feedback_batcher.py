@@ -0,0 +1,138 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class PendingFeedback:
+    """
+    A feedback request waiting to be sent to the LLM as part of a batch.
+
+    Attributes:
+        message_id: ID of the user message the feedback belongs to
+        transcription: Transcribed text of the user's speech
+        context: Conversation context used to build the prompt
+        future: Future resolved with the FeedbackResult for this item
+        enqueued_at: Monotonic time when the item was submitted
+    """
+    def __init__(self, message_id: str, transcription: str, context: Optional[Dict[str, Any]]):
+        self.message_id = message_id
+        self.transcription = transcription
+        self.context = context or {}
+        self.future: Future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class FeedbackBatcher:
+    """
+    Groups concurrent feedback requests into a single LLM call.
+
+    Items are collected until either `max_batch_size` items are pending or the
+    oldest pending item has waited `max_wait_seconds`. The batch is then handed
+    to `batch_handler`, which must return a dict mapping message_id to result
+    (or to an exception, which is raised from that item's future).
+    Callers get a Future per item, so the batcher works both from worker
+    threads (`future.result()`) and from the event loop
+    (`await asyncio.wrap_future(future)`).
+    """
+
+    def __init__(
+        self,
+        batch_handler: Callable[[List[PendingFeedback]], Dict[str, Any]],
+        max_batch_size: int = 5,
+        max_wait_seconds: float = 2.0,
+        max_concurrent_batches: int = 2
+    ):
+        self.batch_handler = batch_handler
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_seconds = max(0.0, max_wait_seconds)
+        self._pending: List[PendingFeedback] = []
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, max_concurrent_batches),
+            thread_name_prefix="feedback-batch"
+        )
+        self._collector = None
+        self._running = False
+
+    def submit(self, message_id: str, transcription: str, context: Optional[Dict[str, Any]] = None) -> Future:
+        """
+        Queue a feedback request for the next batch.
+
+        Args:
+            message_id: ID of the user message
+            transcription: Transcribed text to analyze
+            context: Optional conversation context
+
+        Returns:
+            Future that resolves to the FeedbackResult for this message
+        """
+        item = PendingFeedback(message_id, transcription, context)
+        with self._cond:
+            self._ensure_started()
+            self._pending.append(item)
+            self._cond.notify()
+        return item.future
+
+    def stop(self):
+        """Stop the collector thread and flush whatever is still pending."""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._collector:
+            self._collector.join(timeout=5)
+        self._executor.shutdown(wait=True)
+
+    def _ensure_started(self):
+        """Start the collector thread on first use. Caller must hold the lock."""
+        if self._running:
+            return
+        self._running = True
+        self._collector = threading.Thread(target=self._collect, name="feedback-batcher", daemon=True)
+        self._collector.start()
+
+    def _collect(self):
+        """Collector loop: cut batches by size or by the oldest item's deadline."""
+        while True:
+            with self._cond:
+                while self._running and not self._pending:
+                    self._cond.wait()
+
+                if not self._pending:
+                    return
+
+                # Wait for the batch to fill up, bounded by the oldest item's deadline
+                deadline = self._pending[0].enqueued_at + self.max_wait_seconds
+                while self._running and len(self._pending) < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(timeout=remaining)
+
+                batch = self._pending[:self.max_batch_size]
+                del self._pending[:self.max_batch_size]
+
+            self._executor.submit(self._flush, batch)
+
+    def _flush(self, batch: List[PendingFeedback]):
+        """Run the batch handler and resolve every item's future."""
+        logger.info(f"Generating feedback for a batch of {len(batch)} messages")
+        try:
+            results = self.batch_handler(batch)
+        except Exception as e:
+            logger.error(f"Error generating batched feedback: {str(e)}", exc_info=True)
+            for item in batch:
+                item.future.set_exception(e)
+            return
+
+        for item in batch:
+            result = results.get(item.message_id)
+            if isinstance(result, BaseException):
+                item.future.set_exception(result)
+            elif item.message_id in results:
+                item.future.set_result(result)
+            else:
+                item.future.set_exception(KeyError(f"No feedback returned for message {item.message_id}"))
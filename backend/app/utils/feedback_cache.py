@@ -0,0 +1,216 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+from app.models.results.feedback_result import FeedbackResult
+
+logger = logging.getLogger(__name__)
+
+# Cache configuration
+FEEDBACK_CACHE_ENABLED = os.getenv("FEEDBACK_CACHE_ENABLED", "true").lower() == "true"
+FEEDBACK_CACHE_TTL_SECONDS = int(os.getenv("FEEDBACK_CACHE_TTL_SECONDS", "86400"))
+FEEDBACK_CACHE_MAX_ENTRIES = int(os.getenv("FEEDBACK_CACHE_MAX_ENTRIES", "5000"))
+# Only short answers repeat often enough to be worth caching
+FEEDBACK_CACHE_MAX_WORDS = int(os.getenv("FEEDBACK_CACHE_MAX_WORDS", "12"))
+# Log the hit rate every N lookups
+FEEDBACK_CACHE_LOG_EVERY = int(os.getenv("FEEDBACK_CACHE_LOG_EVERY", "100"))
+
+# Hesitation sounds that the transcriber sometimes keeps
+FILLER_WORDS = {"um", "umm", "uh", "uhh", "er", "erm", "hmm", "ah", "eh"}
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s']")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_transcription(transcription: str) -> str:
+    """
+    Normalize a transcription for cache lookups.
+
+    Lowercases, strips punctuation and filler words and collapses whitespace,
+    so "Yes, I like it." and "yes i like it" map to the same key.
+
+    Args:
+        transcription: Raw transcribed text
+
+    Returns:
+        Normalized text
+    """
+    text = unicodedata.normalize("NFKC", transcription or "").lower()
+    text = _PUNCTUATION_RE.sub(" ", text)
+    words = [word for word in _WHITESPACE_RE.split(text) if word and word not in FILLER_WORDS]
+    return " ".join(words)
+
+
+def context_fingerprint(context: Optional[Dict[str, Any]]) -> str:
+    """
+    Build a coarse fingerprint of the conversation context.
+
+    Only the scenario (roles and situation) and the last AI turn are used:
+    the same short answer to the same question in the same scenario gets the
+    same feedback, regardless of older history.
+
+    Args:
+        context: Conversation context from FeedbackService.build_feedback_context
+
+    Returns:
+        Hex digest identifying the context
+    """
+    context = context or {}
+    scenario = "|".join([
+        str(context.get("user_role", "")),
+        str(context.get("ai_role", "")),
+        str(context.get("situation", ""))
+    ]).lower()
+    last_ai_turn = normalize_transcription(context.get("last_ai_turn", ""))
+    last_turn_hash = hashlib.sha1(last_ai_turn.encode("utf-8")).hexdigest()
+    return hashlib.sha1(f"{scenario}#{last_turn_hash}".encode("utf-8")).hexdigest()
+
+
+class FeedbackCache:
+    """
+    In-process LRU cache of feedback results with a TTL.
+
+    Keys combine the normalized transcription with a context fingerprint.
+    Hit/miss counters are kept so the normalization can be tuned.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = FEEDBACK_CACHE_MAX_ENTRIES,
+        ttl_seconds: int = FEEDBACK_CACHE_TTL_SECONDS,
+        max_words: int = FEEDBACK_CACHE_MAX_WORDS,
+        enabled: bool = FEEDBACK_CACHE_ENABLED
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_words = max_words
+        self.enabled = enabled
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def make_key(self, transcription: str, context: Optional[Dict[str, Any]]) -> Optional[str]:
+        """
+        Build the cache key for an utterance.
+
+        Args:
+            transcription: Raw transcribed text
+            context: Conversation context
+
+        Returns:
+            Cache key, or None if the utterance is not cacheable
+        """
+        if not self.enabled:
+            return None
+
+        normalized = normalize_transcription(transcription)
+        if not normalized or len(normalized.split()) > self.max_words:
+            return None
+
+        return f"{context_fingerprint(context)}:{normalized}"
+
+    def get(self, key: Optional[str]) -> Optional[FeedbackResult]:
+        """
+        Look up a cached feedback result.
+
+        Args:
+            key: Cache key from make_key (None is always a miss and not counted)
+
+        Returns:
+            A fresh FeedbackResult copy, or None on miss
+        """
+        if key is None:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                self._maybe_log_stats()
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self._maybe_log_stats()
+            cached = entry[1]
+
+        return FeedbackResult(
+            user_feedback=cached["user_feedback"],
+            grammar_issues=[dict(issue) for issue in cached["grammar_issues"]],
+            vocabulary_issues=[dict(issue) for issue in cached["vocabulary_issues"]]
+        )
+
+    def put(self, key: Optional[str], feedback_result: FeedbackResult):
+        """
+        Store a feedback result.
+
+        Args:
+            key: Cache key from make_key (None is ignored)
+            feedback_result: Generated feedback to cache
+        """
+        if key is None:
+            return
+
+        value = {
+            "user_feedback": feedback_result.user_feedback,
+            "grammar_issues": [dict(issue) for issue in feedback_result.grammar_issues],
+            "vocabulary_issues": [dict(issue) for issue in feedback_result.vocabulary_issues]
+        }
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop all entries (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with hits, misses, hit_rate, size and eviction counters
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "max_words": self.max_words,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+    def _maybe_log_stats(self):
+        """Periodically log the hit rate. Caller must hold the lock."""
+        lookups = self.hits + self.misses
+        if FEEDBACK_CACHE_LOG_EVERY and lookups % FEEDBACK_CACHE_LOG_EVERY == 0:
+            logger.info(f"Feedback cache: {self.hits}/{lookups} hits ({self.hits / lookups:.1%}), {len(self._entries)} entries")
+
+
+# Create a singleton instance
+feedback_cache = FeedbackCache()
@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Set, Callable
+
+from bson import ObjectId
+from pymongo import ASCENDING
+from pymongo.errors import PyMongoError
+
+from app.config.database import db
+
+logger = logging.getLogger(__name__)
+
+# Long-poll configuration
+FEEDBACK_LONG_POLL_MAX_SECONDS = int(os.getenv("FEEDBACK_LONG_POLL_MAX_SECONDS", "30"))
+# How often a parked long-poll re-reads the database, for feedback stored by another process
+FEEDBACK_LONG_POLL_RECHECK_SECONDS = float(os.getenv("FEEDBACK_LONG_POLL_RECHECK_SECONDS", "5"))
+# Maximum number of undelivered events kept per stream subscriber
+FEEDBACK_STREAM_QUEUE_SIZE = int(os.getenv("FEEDBACK_STREAM_QUEUE_SIZE", "100"))
+# How often an open stream reads the database, for feedback stored by another process
+FEEDBACK_STREAM_RECHECK_SECONDS = float(os.getenv("FEEDBACK_STREAM_RECHECK_SECONDS", "5"))
+
+
+class FeedbackNotifier:
+    """
+    In-process fan-out of "feedback ready" events.
+
+    Feedback is stored by worker threads, while listeners (SSE streams and
+    parked long-poll requests) live on the event loop. `publish` may be called
+    from any thread and hands the event to the loop with call_soon_threadsafe.
+
+    Listeners:
+    - per-user subscriber queues, used by the SSE stream
+    - per-message waiters, used by the long-poll feedback endpoint
+
+    Events only reach listeners in the process that stored the feedback.
+    When feedback workers run in a separate process, or several API
+    processes serve streams, listeners also read the database periodically:
+    long-polls through `is_ready`, and streams through `stored_events` (if
+    FEEDBACK_STREAM_DB_RECHECK is on, see app.routes.feedback).
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self._waiters: Dict[str, Set[asyncio.Future]] = defaultdict(set)
+        self._lock = threading.Lock()
+        self._indexes_ready = False
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        """
+        Register a stream subscriber for a user. Must be called on the event loop.
+
+        Args:
+            user_id: ID of the user whose feedback events should be delivered
+
+        Returns:
+            Queue that receives event payloads
+        """
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=FEEDBACK_STREAM_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers[user_id].add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue):
+        """Remove a stream subscriber."""
+        with self._lock:
+            queues = self._subscribers.get(user_id)
+            if queues:
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[user_id]
+
+    async def wait_for_feedback(
+        self,
+        message_id: str,
+        timeout: float,
+        is_ready: Callable[[], bool]
+    ) -> bool:
+        """
+        Park until feedback for a message is ready or the timeout expires.
+
+        `is_ready` is checked once after registering (so an event published in
+        between is not missed), again when an event is pushed, and every
+        FEEDBACK_LONG_POLL_RECHECK_SECONDS, which covers feedback stored by
+        workers running in another process.
+
+        Args:
+            message_id: ID of the user message
+            timeout: Maximum time to wait in seconds
+            is_ready: Callable that checks the database for the feedback
+
+        Returns:
+            True if feedback is ready, False on timeout
+        """
+        self._loop = asyncio.get_running_loop()
+        future = self._loop.create_future()
+        with self._lock:
+            self._waiters[message_id].add(future)
+
+        try:
+            deadline = self._loop.time() + timeout
+            while True:
+                if is_ready():
+                    return True
+
+                remaining = deadline - self._loop.time()
+                if remaining <= 0:
+                    return False
+
+                try:
+                    await asyncio.wait_for(
+                        asyncio.shield(future),
+                        timeout=min(remaining, FEEDBACK_LONG_POLL_RECHECK_SECONDS)
+                    )
+                except asyncio.TimeoutError:
+                    continue
+
+                # Pushed: the message is linked before publishing, so one final check suffices
+                return is_ready()
+        finally:
+            with self._lock:
+                futures = self._waiters.get(message_id)
+                if futures:
+                    futures.discard(future)
+                    if not futures:
+                        del self._waiters[message_id]
+
+    def stored_events(self, user_id: str, since: datetime) -> List[Dict[str, Any]]:
+        """
+        Read the feedback events of a user's messages stored since a time (blocking).
+
+        Used by streams to pick up feedback stored by other processes.
+        Events have the same shape as published ones.
+
+        Args:
+            user_id: ID of the user
+            since: Only feedback created at or after this time (UTC)
+
+        Returns:
+            Events in creation order
+        """
+        if not self._indexes_ready:
+            try:
+                db.feedback.create_index([("user_id", ASCENDING), ("_id", ASCENDING)])
+                self._indexes_ready = True
+            except PyMongoError as e:
+                logger.error(f"Error creating feedback index: {str(e)}")
+
+        feedback_docs = db.feedback.find(
+            {"user_id": ObjectId(user_id), "target_type": "message", "_id": {"$gte": ObjectId.from_datetime(since)}},
+            {"target_id": 1, "user_feedback": 1, "timestamp": 1}
+        ).sort("_id", ASCENDING)
+        return [
+            {
+                "message_id": str(feedback["target_id"]),
+                "feedback": {
+                    "id": str(feedback["_id"]),
+                    "user_feedback": feedback.get("user_feedback", ""),
+                    "created_at": feedback["timestamp"].isoformat() if feedback.get("timestamp") else None
+                }
+            }
+            for feedback in feedback_docs
+        ]
+
+    def publish(self, user_id: str, message_id: str, feedback: Dict[str, Any]):
+        """
+        Announce that feedback for a message is ready. Safe to call from any thread.
+
+        Args:
+            user_id: ID of the user who owns the message
+            message_id: ID of the user message
+            feedback: Feedback payload (id, user_feedback, created_at)
+        """
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            # Nobody has subscribed or waited in this process yet
+            return
+
+        event = {"message_id": message_id, "feedback": feedback}
+        try:
+            loop.call_soon_threadsafe(self._dispatch, user_id, message_id, event)
+        except RuntimeError:
+            # Event loop shut down between the check and the call
+            pass
+
+    def _dispatch(self, user_id: str, message_id: str, event: Dict[str, Any]):
+        """Deliver an event to listeners. Runs on the event loop."""
+        with self._lock:
+            queues = list(self._subscribers.get(user_id, ()))
+            futures = list(self._waiters.get(message_id, ()))
+
+        for queue in queues:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                logger.warning(f"Feedback stream queue full for user {user_id}, dropping event")
+
+        for future in futures:
+            if not future.done():
+                future.set_result(event)
+
+
+# Create a singleton instance
+feedback_notifier = FeedbackNotifier()
@@ -0,0 +1,374 @@
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, List
+
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.config.database import db
+from app.utils.feedback_service import FeedbackService
+from app.utils.load_smoothing import due_load_balancer
+
+logger = logging.getLogger(__name__)
+
+# Worker pool and retry configuration
+FEEDBACK_WORKER_COUNT = int(os.getenv("FEEDBACK_WORKER_COUNT", "5"))
+FEEDBACK_WORKERS_IN_PROCESS = os.getenv("FEEDBACK_WORKERS_IN_PROCESS", "true").lower() == "true"
+FEEDBACK_JOB_MAX_ATTEMPTS = int(os.getenv("FEEDBACK_JOB_MAX_ATTEMPTS", "5"))
+FEEDBACK_JOB_BACKOFF_SECONDS = float(os.getenv("FEEDBACK_JOB_BACKOFF_SECONDS", "10"))
+FEEDBACK_JOB_BACKOFF_MAX_SECONDS = float(os.getenv("FEEDBACK_JOB_BACKOFF_MAX_SECONDS", "600"))
+FEEDBACK_JOB_LEASE_SECONDS = int(os.getenv("FEEDBACK_JOB_LEASE_SECONDS", "300"))
+FEEDBACK_QUEUE_POLL_SECONDS = float(os.getenv("FEEDBACK_QUEUE_POLL_SECONDS", "2"))
+# How often the leases of running jobs are extended
+FEEDBACK_JOB_LEASE_RENEW_SECONDS = float(os.getenv("FEEDBACK_JOB_LEASE_RENEW_SECONDS", str(FEEDBACK_JOB_LEASE_SECONDS / 3)))
+
+
+class FeedbackJobQueue:
+    """
+    Durable, Mongo-backed queue for speech feedback generation.
+
+    Jobs live in `db.feedback_jobs`, one per user message (unique on
+    user_message_id, so enqueueing twice is a no-op). A single poller thread
+    per process claims jobs atomically with find_one_and_update, only while a
+    worker thread is idle, and hands them to the workers, so an idle process
+    issues one claim query per poll interval however many workers it runs.
+    The poller also renews the leases of the jobs running in this process, so
+    a long Gemini call is not picked up again by another worker; a job whose
+    lease expires (e.g. the process died) is claimed again by any process. Failed
+    jobs are retried with exponential backoff, and after FEEDBACK_JOB_MAX_ATTEMPTS
+    they are copied to `db.feedback_jobs_dead` and marked "dead".
+
+    Job status flow: pending -> processing -> completed
+                                           -> pending (retry) -> ... -> dead
+    """
+
+    def __init__(self, feedback_service: Optional[FeedbackService] = None, worker_count: int = FEEDBACK_WORKER_COUNT):
+        self.feedback_service = feedback_service or FeedbackService()
+        self.worker_count = max(1, worker_count)
+        self.collection = db.feedback_jobs
+        self.dead_letter_collection = db.feedback_jobs_dead
+        self.running = False
+        self.workers: List[threading.Thread] = []
+        self.poller: Optional[threading.Thread] = None
+        self._wakeup = threading.Event()
+        self._owner_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        # Claimed jobs waiting for a worker; None tells a worker to exit
+        self._jobs: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        # Released by a worker when it finishes a job; the poller claims only with a free slot
+        self._idle_workers = threading.Semaphore(self.worker_count)
+        # Owners of the jobs running in this process, whose leases the poller renews
+        self._running_owners: set = set()
+        self._running_lock = threading.Lock()
+        self._indexes_ready = False
+
+    def ensure_indexes(self):
+        """Create the indexes used for idempotency and claiming."""
+        if self._indexes_ready:
+            return
+        self.collection.create_index([("user_message_id", ASCENDING)], unique=True)
+        self.collection.create_index([("status", ASCENDING), ("run_at", ASCENDING)])
+        self.collection.create_index([("status", ASCENDING), ("lease_expires_at", ASCENDING)])
+        self._indexes_ready = True
+
+    def enqueue(
+        self,
+        user_message_id: str,
+        user_id: str,
+        conversation_id: str,
+        transcription: str,
+        audio_id: Optional[str] = None,
+        file_path: Optional[str] = None
+    ) -> bool:
+        """
+        Add a feedback job for a user message.
+
+        Args:
+            user_message_id: ID of the user's message (idempotency key)
+            user_id: ID of the user who sent the message
+            conversation_id: ID of the conversation
+            transcription: Transcribed text to analyze
+            audio_id: Optional ID of the stored audio record
+            file_path: Optional path to the saved audio file
+
+        Returns:
+            True if a new job was created, False if one already existed
+        """
+        self.ensure_indexes()
+        now = datetime.utcnow()
+
+        try:
+            result = self.collection.update_one(
+                {"user_message_id": user_message_id},
+                {
+                    "$setOnInsert": {
+                        "user_message_id": user_message_id,
+                        "user_id": user_id,
+                        "conversation_id": conversation_id,
+                        "transcription": transcription,
+                        "audio_id": str(audio_id) if audio_id else None,
+                        "file_path": file_path,
+                        "status": "pending",
+                        "attempts": 0,
+                        "run_at": now,
+                        "created_at": now
+                    }
+                },
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # Lost an upsert race with another request for the same message
+            return False
+
+        created = result.upserted_id is not None
+        if created:
+            self._wakeup.set()
+        return created
+
+    def claim(self, owner: str) -> Optional[Dict[str, Any]]:
+        """
+        Atomically claim the next runnable job.
+
+        A job is runnable if it is pending and due, or if it is processing but
+        its lease has expired.
+
+        Args:
+            owner: Identifier of the claiming worker
+
+        Returns:
+            The claimed job document, or None if nothing is runnable
+        """
+        now = datetime.utcnow()
+        return self.collection.find_one_and_update(
+            {
+                "$or": [
+                    {"status": "pending", "run_at": {"$lte": now}},
+                    {"status": "processing", "lease_expires_at": {"$lte": now}}
+                ]
+            },
+            {
+                "$set": {
+                    "status": "processing",
+                    "owner": owner,
+                    "started_at": now,
+                    "lease_expires_at": now + timedelta(seconds=FEEDBACK_JOB_LEASE_SECONDS)
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("run_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def renew_leases(self) -> int:
+        """
+        Extend the leases of the jobs running in this process.
+
+        Returns:
+            Number of leases renewed
+        """
+        with self._running_lock:
+            owners = list(self._running_owners)
+        if not owners:
+            return 0
+        result = self.collection.update_many(
+            {"owner": {"$in": owners}, "status": "processing"},
+            {"$set": {"lease_expires_at": datetime.utcnow() + timedelta(seconds=FEEDBACK_JOB_LEASE_SECONDS)}}
+        )
+        return result.modified_count
+
+    def complete(self, job: Dict[str, Any], feedback_id: Optional[str]):
+        """Mark a claimed job as completed."""
+        self.collection.update_one(
+            {"_id": job["_id"], "owner": job["owner"]},
+            {
+                "$set": {
+                    "status": "completed",
+                    "feedback_id": feedback_id,
+                    "completed_at": datetime.utcnow()
+                },
+                "$unset": {"lease_expires_at": ""}
+            }
+        )
+
+    def fail(self, job: Dict[str, Any], error: str):
+        """
+        Record a failed attempt and schedule a retry or dead-letter the job.
+
+        Args:
+            job: The claimed job document
+            error: Error message from the failed attempt
+        """
+        now = datetime.utcnow()
+        attempts = job.get("attempts", 1)
+
+        if attempts >= FEEDBACK_JOB_MAX_ATTEMPTS:
+            logger.error(f"Feedback job for message {job['user_message_id']} failed {attempts} times, moving to dead-letter")
+            dead_job = dict(job)
+            dead_job.update({"status": "dead", "last_error": error, "dead_at": now})
+            self.dead_letter_collection.replace_one({"_id": job["_id"]}, dead_job, upsert=True)
+            self.collection.update_one(
+                {"_id": job["_id"], "owner": job["owner"]},
+                {
+                    "$set": {"status": "dead", "last_error": error, "dead_at": now},
+                    "$unset": {"lease_expires_at": ""}
+                }
+            )
+            return
+
+        # Exponential backoff: base, 2*base, 4*base, ... capped
+        delay = min(FEEDBACK_JOB_BACKOFF_SECONDS * (2 ** (attempts - 1)), FEEDBACK_JOB_BACKOFF_MAX_SECONDS)
+        logger.warning(f"Feedback job for message {job['user_message_id']} failed (attempt {attempts}), retrying in {delay:.0f}s")
+        self.collection.update_one(
+            {"_id": job["_id"], "owner": job["owner"]},
+            {
+                "$set": {
+                    "status": "pending",
+                    "run_at": now + timedelta(seconds=delay),
+                    "last_error": error
+                },
+                "$unset": {"lease_expires_at": "", "owner": ""}
+            }
+        )
+
+    def retry_dead_job(self, user_message_id: str) -> bool:
+        """
+        Put a dead-lettered job back on the queue.
+
+        Args:
+            user_message_id: ID of the message whose job should be retried
+
+        Returns:
+            True if a dead job was found and requeued
+        """
+        result = self.collection.update_one(
+            {"user_message_id": user_message_id, "status": "dead"},
+            {"$set": {"status": "pending", "attempts": 0, "run_at": datetime.utcnow()}}
+        )
+        if result.modified_count:
+            self.dead_letter_collection.delete_one({"user_message_id": user_message_id})
+            self._wakeup.set()
+            return True
+        return False
+
+    def process_job(self, job: Dict[str, Any]):
+        """
+        Run a claimed job and record the outcome.
+
+        Args:
+            job: The claimed job document
+        """
+        # Only the final attempt may store generic fallback feedback
+        is_final_attempt = job.get("attempts", 1) >= FEEDBACK_JOB_MAX_ATTEMPTS
+        try:
+            feedback_id = self.feedback_service.generate_and_store_feedback(
+                transcription=job["transcription"],
+                user_id=job["user_id"],
+                conversation_id=job["conversation_id"],
+                user_message_id=job["user_message_id"],
+                allow_fallback=is_final_attempt
+            )
+            self.complete(job, feedback_id)
+        except Exception as e:
+            logger.error(f"Error processing feedback job {job['_id']}: {str(e)}", exc_info=True)
+            self.fail(job, str(e))
+
+    def start(self):
+        """Start the poller and worker threads."""
+        if self.running:
+            return
+
+        self.ensure_indexes()
+        self.running = True
+        for i in range(self.worker_count):
+            worker = threading.Thread(target=self._worker_loop, name=f"feedback-worker-{i}", daemon=True)
+            worker.start()
+            self.workers.append(worker)
+        self.poller = threading.Thread(target=self._poll_loop, name="feedback-poller", daemon=True)
+        self.poller.start()
+        logger.info(f"Feedback job queue started with {self.worker_count} workers")
+
+    def stop(self):
+        """Stop the poller and worker threads, letting in-flight jobs finish."""
+        self.running = False
+        self._wakeup.set()
+        if self.poller:
+            self.poller.join(timeout=5)
+            self.poller = None
+        for _ in self.workers:
+            self._jobs.put(None)
+        for worker in self.workers:
+            worker.join(timeout=5)
+        self.workers = []
+        logger.info("Feedback job queue stopped")
+
+    def _poll_loop(self):
+        """Claim jobs for idle workers and renew running leases until stopped."""
+        next_renewal = time.monotonic() + FEEDBACK_JOB_LEASE_RENEW_SECONDS
+        while self.running:
+            try:
+                if time.monotonic() >= next_renewal:
+                    self.renew_leases()
+                    next_renewal = time.monotonic() + FEEDBACK_JOB_LEASE_RENEW_SECONDS
+                timeout = max(0.0, min(FEEDBACK_QUEUE_POLL_SECONDS, next_renewal - time.monotonic()))
+
+                # All workers busy: nothing to claim, but keep renewing their leases
+                if not self._idle_workers.acquire(timeout=timeout):
+                    continue
+
+                try:
+                    # A fresh owner per claim, so a worker whose lease was lost cannot complete the new attempt
+                    job = self.claim(f"{self._owner_prefix}:{uuid.uuid4().hex[:12]}")
+                except Exception:
+                    self._idle_workers.release()
+                    raise
+
+                if job is None:
+                    self._idle_workers.release()
+                    # Woken early by enqueue() in this process; other processes are seen on the next poll
+                    self._wakeup.wait(timeout=timeout)
+                    self._wakeup.clear()
+                    continue
+
+                with self._running_lock:
+                    self._running_owners.add(job["owner"])
+                self._jobs.put(job)
+
+            except Exception as e:
+                logger.error(f"Error in feedback poller: {str(e)}")
+                time.sleep(5)  # Sleep longer on error
+
+    def _worker_loop(self):
+        """Process the jobs handed over by the poller until stopped."""
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            try:
+                self.process_job(job)
+            except Exception as e:
+                logger.error(f"Error in feedback worker: {str(e)}")
+            finally:
+                with self._running_lock:
+                    self._running_owners.discard(job["owner"])
+                self._idle_workers.release()
+
+
+# Create a singleton instance
+feedback_job_queue = FeedbackJobQueue()
+
+
+if __name__ == "__main__":
+    # Standalone worker process: run with FEEDBACK_WORKERS_IN_PROCESS=false on the API servers
+    logging.basicConfig(level=logging.INFO)
+    feedback_job_queue.start()
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        feedback_job_queue.stop()
+        due_load_balancer.flush()
@@ -6,14 +6,19 @@ from bson import ObjectId
 import logging
 from logging.handlers import RotatingFileHandler
 import os
+import threading
 from pathlib import Path
 import shutil
 from fastapi import UploadFile, File
 # Import Gemini client
-from app.utils.gemini import generate_response
+from app.utils.gemini import generate_json_response
 from app.config.database import db
 from app.models.feedback import Feedback
 from app.models.results.feedback_result import FeedbackResult
+from app.schemas.feedback import GrammarIssue, VocabularyIssue
+from app.utils.feedback_batcher import FeedbackBatcher, PendingFeedback
+from app.utils.feedback_notifier import feedback_notifier
+from app.utils.feedback_cache import feedback_cache
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +27,75 @@ UPLOAD_DIR = Path("app/uploads")
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 VALID_AUDIO_EXTENSIONS = ['.mp3', '.wav', '.m4a', '.aac', '.ogg', '.flac']
 
+# Batching mode: group concurrent feedback requests into a single Gemini call
+FEEDBACK_BATCHING_ENABLED = os.getenv("FEEDBACK_BATCHING_ENABLED", "false").lower() == "true"
+FEEDBACK_BATCH_MAX_SIZE = int(os.getenv("FEEDBACK_BATCH_MAX_SIZE", "5"))
+FEEDBACK_BATCH_MAX_WAIT_SECONDS = float(os.getenv("FEEDBACK_BATCH_MAX_WAIT_SECONDS", "2.0"))
+FEEDBACK_BATCH_CONCURRENCY = int(os.getenv("FEEDBACK_BATCH_CONCURRENCY", "2"))
+
+# Instruction text shared by the single and batched prompts
+FEEDBACK_INSTRUCTIONS = """you are an expert English teacher providing feedback on a student's speech. this feedback will be showned when user click feedback button, dont greet the user or say anything else.
+        Note: because user speech is transcribed from audio, it may not contain punctuation. you do not need comment on this. 
+        Generate  feedback in string format:
+        Hãy đưa ra nhận xét và hướng dẫn như một người bản xứ nói tiếng Anh có thể sử dụng tiếng Việt để giải thích:
+                -Phân tích câu trả lời của người học và chỉ ra các lỗi về ngữ pháp và từ vựng.
+                -Cung cấp gợi ý hoặc ví dụ về cách dùng từ/cụm từ tốt hơn để diễn đạt tự nhiên hơn
+                -Đưa ra 2-3 phiên bản câu hoàn chỉnh hơn, sát với câu gốc nhưng đúng hơn, phù hợp với trình độ người học.
+                -Phân tích cấu trúc ngữ pháp (mental model) của câu ví dụ bạn đưa ra: chỉ ra chủ ngữ, động từ, bổ ngữ, cách dùng mệnh đề phụ (nếu có), và chức năng giao tiếp của từng phần trong câu. ( nhớ so sánh  với câu gốc của người học)
+                -Nếu câu trả lời của người học ngắn, chưa rõ ý, hoặc sai lệch hoàn toàn, hãy đưa ra một câu trả lời mẫu đơn giản hơn để họ có thể hình dung cách diễn đạt đúng, nhưng không nâng cấp quá xa so với trình độ hiện tại của họ.
+            """
+
+# Instructions for the machine-readable part of the response, consumed by the mistake pipeline
+STRUCTURED_ISSUES_INSTRUCTIONS = """In the same response, also list the student's mistakes in machine-readable form (in English):
+        - grammar_issues: each with "issue" (the exact problematic text from the student's speech), "correction", "explanation" and "severity" (1 = minor, 5 = severe)
+        - vocabulary_issues: each with "original" (the exact word or phrase used), "better_alternative", "reason" and "example_usage"
+        Use empty lists when there are no issues. Do not report missing punctuation.
+        """
+
+# Gemini response schema for a single utterance
+_GRAMMAR_ISSUE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "issue": {"type": "STRING"},
+        "correction": {"type": "STRING"},
+        "explanation": {"type": "STRING"},
+        "severity": {"type": "INTEGER"}
+    },
+    "required": ["issue", "correction", "explanation", "severity"]
+}
+_VOCABULARY_ISSUE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "original": {"type": "STRING"},
+        "better_alternative": {"type": "STRING"},
+        "reason": {"type": "STRING"},
+        "example_usage": {"type": "STRING"}
+    },
+    "required": ["original", "better_alternative", "reason", "example_usage"]
+}
+FEEDBACK_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "user_feedback": {"type": "STRING"},
+        "grammar_issues": {"type": "ARRAY", "items": _GRAMMAR_ISSUE_SCHEMA},
+        "vocabulary_issues": {"type": "ARRAY", "items": _VOCABULARY_ISSUE_SCHEMA}
+    },
+    "required": ["user_feedback", "grammar_issues", "vocabulary_issues"]
+}
+
+# Gemini response schema for a batch: the single-utterance object keyed by message id
+BATCH_FEEDBACK_RESPONSE_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "message_id": {"type": "STRING"},
+            **FEEDBACK_RESPONSE_SCHEMA["properties"]
+        },
+        "required": ["message_id"] + FEEDBACK_RESPONSE_SCHEMA["required"]
+    }
+}
+
 # Only configure if not already configured
 if not logger.handlers:
     # Create formatter
@@ -64,102 +138,167 @@ class FeedbackService:
     3. Parse and validate the response from Gemini
     4. Store feedback in the database
     """
+
+    def __init__(self):
+        self._batcher: Optional[FeedbackBatcher] = None
+        self._batcher_lock = threading.Lock()
+
+    def _get_batcher(self) -> FeedbackBatcher:
+        """
+        Lazily create the batcher so it is only started when batching is used.
+        
+        Queue worker threads call this concurrently, so creation is locked to
+        make sure they all share one batcher.
+        """
+        if self._batcher is None:
+            with self._batcher_lock:
+                if self._batcher is None:
+                    self._batcher = FeedbackBatcher(
+                        batch_handler=self.generate_batch_feedback,
+                        max_batch_size=FEEDBACK_BATCH_MAX_SIZE,
+                        max_wait_seconds=FEEDBACK_BATCH_MAX_WAIT_SECONDS,
+                        max_concurrent_batches=FEEDBACK_BATCH_CONCURRENCY
+                    )
+        return self._batcher
         
-    async def process_speech_feedback(
+    def generate_and_store_feedback(
         self,
         transcription: str,
         user_id: str,
         conversation_id: str,
-        audio_id: str,
-        file_path: str,
-        user_message_id: str
-    ):
+        user_message_id: str,
+        allow_fallback: bool = True
+    ) -> Optional[str]:
         """
-        Process speech feedback in the background.
+        Generate, store and link feedback for a user message (blocking).
         
-        This function handles the feedback generation and storing part that
-        was separated from the main speech analysis to allow quick responses.
+        This is the unit of work run by the feedback job queue workers. It is
+        idempotent per message: if the message already has a feedback_id (for
+        example from an attempt that crashed before it was acknowledged), the
+        existing ID is returned without calling Gemini again.
         
         Args:
-            transcription (str): The transcribed text from the audio
-                The text content that will be analyzed for feedback
-            user_id (str): ID of the user who submitted the audio
-                Used to associate feedback with the user
-            conversation_id (str): ID of the conversation
-                Used to fetch conversation context for better feedback
-            audio_id (str): ID of the stored audio record
-                References the audio file in the database
-            file_path (str): Path to the saved audio file
-                Location of the audio file on disk
-            user_message_id (str): ID of the user's message
-                Used to link the generated feedback to the message
+            transcription: The transcribed text from the audio
+            user_id: ID of the user who submitted the audio
+            conversation_id: ID of the conversation, used for context
+            user_message_id: ID of the user's message to attach feedback to
+            allow_fallback: Store generic fallback feedback when generation fails
+                instead of raising. Workers disable this on non-final attempts
+                so the job is retried.
         
         Returns:
-            None: This is a background task that doesn't return a value directly
+            ID of the feedback linked to the message
             
-        Side Effects:
-            - Creates a feedback record in the database
-            - Updates the user's message with the feedback_id
-            - Triggers mistake extraction for learning purposes
+        Raises:
+            Exception: If generation fails and allow_fallback is False, or storing fails
         """
-        try:
-            # Initialize services
-            from app.utils.feedback_service import FeedbackService
-            from app.utils.event_handler import event_handler
-            from app.models.results.feedback_result import FeedbackResult
-            
-            
-            # Fetch conversation context
-            context = {}
-            conversation = db.conversations.find_one({"_id": ObjectId(conversation_id)})
-            if conversation:
-                # Fetch messages to build context
-                messages = list(db.messages.find({"conversation_id": ObjectId(conversation_id)})
-                            .sort("timestamp", 1)
-                            .limit(10))
-                
-                # Format previous exchanges
-                previous_exchanges = []
-                for msg in messages:
-                    sender = "User" if msg.get("sender") == "user" else "AI"
-                    previous_exchanges.append(f"{sender}: {msg.get('content', '')}")
-                
-               
-                context = {
-                    "user_role": conversation.get("user_role", "Student"),
-                    "ai_role": conversation.get("ai_role", "Teacher"),
-                    "situation": conversation.get("situation", "General conversation"),
-                    "previous_exchanges": "\n".join(previous_exchanges)
-                }
-            # Generate feedback
+        from app.utils.event_handler import event_handler
+        
+        existing = db.messages.find_one(
+            {"_id": ObjectId(user_message_id)},
+            {"feedback_id": 1, "timestamp": 1}
+        )
+        if existing and existing.get("feedback_id"):
+            logger.info(f"Message {user_message_id} already has feedback {existing['feedback_id']}, skipping")
+            return existing["feedback_id"]
+        
+        # Fetch conversation context up to this message
+        context = self.build_feedback_context(
+            conversation_id,
+            before=existing.get("timestamp") if existing else None
+        )
+        
+        # Reuse feedback for a repeated short answer in the same context
+        cache_key = feedback_cache.make_key(transcription, context)
+        feedback_result = feedback_cache.get(cache_key)
+        
+        # Generate feedback
+        if feedback_result is None:
             try:
-                feedback_result = self.generate_dual_feedback(transcription, context)
+                if FEEDBACK_BATCHING_ENABLED:
+                    # Share one Gemini call with other pending utterances
+                    feedback_result = self._get_batcher().submit(user_message_id, transcription, context).result()
+                else:
+                    feedback_result = self.request_feedback(transcription, context)
             except Exception as e:
+                if not allow_fallback:
+                    raise
                 logger.error(f"Error generating feedback: {str(e)}", exc_info=True)
-                # Create a fallback feedback result
-                feedback_result = FeedbackResult(
-                    user_feedback="Unable to generate detailed feedback at this time."
-                )
+                feedback_result = self._generate_fallback_feedback(transcription)
             
-            # Store feedback
-            feedback_id = self.store_feedback(
-                user_id, 
-                feedback_result, 
-                user_message_id,
-                transcription=transcription
+            if not feedback_result.is_fallback:
+                feedback_cache.put(cache_key, feedback_result)
+        
+        # Store feedback
+        feedback_id = self.store_feedback(
+            user_id, 
+            feedback_result, 
+            user_message_id,
+            transcription=transcription
+        )
+        
+        # Link feedback to message
+        if feedback_id:
+            db.messages.update_one(
+                {"_id": ObjectId(user_message_id)},
+                {"$set": {"feedback_id": feedback_id}}
             )
             
-            # Link feedback to message
-            if feedback_id:
-                db.messages.update_one(
-                    {"_id": ObjectId(user_message_id)},
-                    {"$set": {"feedback_id": feedback_id}}
-                )
-                
+            # Push the result to any open feedback stream or parked long-poll
+            feedback_notifier.publish(user_id, user_message_id, {
+                "id": feedback_id,
+                "user_feedback": feedback_result.user_feedback,
+                "created_at": feedback_result.timestamp.isoformat()
+            })
             
-                
-        except Exception as e:
-            logger.error(f"Error processing speech feedback in background: {str(e)}", exc_info=True)
+            # Mistakes come from the same response, so no second LLM call is needed
+            if feedback_result.grammar_issues or feedback_result.vocabulary_issues:
+                event_handler.on_new_feedback(feedback_id, user_id=user_id, transcription=transcription)
+        
+        return feedback_id
+
+    def build_feedback_context(self, conversation_id: str, before: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Build the conversation context used in feedback prompts.
+        
+        Args:
+            conversation_id: ID of the conversation
+            before: Optional timestamp of the message being analyzed; only
+                messages up to it are included
+            
+        Returns:
+            Dictionary with roles, situation, formatted previous exchanges and
+            the last AI turn, or an empty dict if the conversation does not exist
+        """
+        context = {}
+        conversation = db.conversations.find_one({"_id": ObjectId(conversation_id)})
+        if conversation:
+            # Fetch the most recent messages to build context
+            query = {"conversation_id": ObjectId(conversation_id)}
+            if before:
+                query["timestamp"] = {"$lte": before}
+            messages = list(db.messages.find(query)
+                        .sort("timestamp", -1)
+                        .limit(10))
+            messages.reverse()
+            
+            # Format previous exchanges
+            previous_exchanges = []
+            last_ai_turn = ""
+            for msg in messages:
+                sender = "User" if msg.get("sender") == "user" else "AI"
+                previous_exchanges.append(f"{sender}: {msg.get('content', '')}")
+                if sender == "AI":
+                    last_ai_turn = msg.get("content", "")
+            
+            context = {
+                "user_role": conversation.get("user_role", "Student"),
+                "ai_role": conversation.get("ai_role", "Teacher"),
+                "situation": conversation.get("situation", "General conversation"),
+                "previous_exchanges": "\n".join(previous_exchanges),
+                "last_ai_turn": last_ai_turn
+            }
+        return context
 
     async def save_audio_file(self,file: UploadFile, user_id: str) -> str:
         """
@@ -202,51 +341,121 @@ class FeedbackService:
         """
         Generate user-friendly feedback for speech using Gemini.
         
+        A single schema-constrained call returns both the learner-facing text
+        and the structured grammar/vocabulary issues used for mistake tracking.
+        Falls back to generic feedback if the call or parsing fails.
+        
         Args:
             transcription: Transcribed text from the user's speech
             context: Optional conversation context information
             
         Returns:
-            FeedbackResult containing user_feedback
+            FeedbackResult containing user_feedback, grammar_issues and vocabulary_issues
         """
         try:
+            return self.request_feedback(transcription, context)
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse Gemini response as JSON: {e}")
+            # Fall back to basic feedback
+            return self._generate_fallback_feedback(transcription)
+        except Exception as e:
+            logger.error(f"Error generating feedback: {str(e)}")
+            return self._generate_fallback_feedback(transcription)
+
+    def request_feedback(
+        self, 
+        transcription: str, 
+        context: Optional[Dict[str, Any]] = None
+    ) -> FeedbackResult:
+        """
+        Call Gemini for feedback without any fallback.
+        
+        Args:
+            transcription: Transcribed text from the user's speech
+            context: Optional conversation context information
             
-            # Build prompt for dual feedback
-            prompt = self._build_dual_feedback_prompt(transcription, context)
-
-
-            # Call Gemini API   
-            gemini_response = generate_response(prompt)
-                        # Clean the response text by removing markdown formatting
-            cleaned_text = gemini_response.strip()
-            if cleaned_text.startswith("```json"):
-                cleaned_text = cleaned_text[7:]  # Remove ```json prefix
-            if cleaned_text.endswith("```"):
-                cleaned_text = cleaned_text[:-3]  # Remove ``` suffix
-            cleaned_text = cleaned_text.strip()
-            # parse the json
+        Returns:
+            FeedbackResult parsed from the response
             
+        Raises:
+            json.JSONDecodeError: If the response is not valid JSON
+            ValueError: If the response has no user_feedback
+            Exception: If the Gemini call fails
+        """
+        # Build prompt for dual feedback
+        prompt = self._build_dual_feedback_prompt(transcription, context)
+
+        # Call Gemini API in JSON mode so feedback and issues come back together
+        gemini_response = generate_json_response(prompt, FEEDBACK_RESPONSE_SCHEMA)
+        # Clean the response text by removing markdown formatting
+        cleaned_text = self._strip_code_fences(gemini_response)
+
+        # Parse JSON response
+        feedback_result = self._parse_feedback_payload(json.loads(cleaned_text))
+        if not feedback_result:
+            logger.debug(f"Raw response: {cleaned_text}")
+            raise ValueError("Gemini response is missing user_feedback")
+        
+        return feedback_result
 
-            # Parse JSON response
+    def generate_batch_feedback(
+        self,
+        items: List[PendingFeedback]
+    ) -> Dict[str, Union[FeedbackResult, Exception]]:
+        """
+        Generate feedback for several utterances with a single Gemini call.
+        
+        The shared instructions are sent once and the model is asked to return
+        one feedback object (text plus structured issues) per message ID. Items
+        missing from the response are retried individually. An item whose
+        retry also fails gets the exception instead of generic feedback, so
+        the caller decides whether to fall back or retry the job later.
+        
+        Args:
+            items: Pending feedback requests (message_id, transcription, context)
             
-            try:
-               
-                
+        Returns:
+            Dictionary mapping message_id to its FeedbackResult, or to the
+            exception raised while generating it
+        """
+        results: Dict[str, Union[FeedbackResult, Exception]] = {}
+        
+        if len(items) == 1:
+            item = items[0]
+            results[item.message_id] = self._request_feedback_or_error(item)
+            return results
+        
+        try:
+            prompt = self._build_batch_feedback_prompt(items)
+            gemini_response = generate_json_response(prompt, BATCH_FEEDBACK_RESPONSE_SCHEMA)
+            parsed = json.loads(self._strip_code_fences(gemini_response))
             
-                # Create and return FeedbackResult
-                return FeedbackResult(
-                    user_feedback=cleaned_text
-                )
-                
-            except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse Gemini response as JSON: {e}")
-                logger.debug(f"Raw response: {cleaned_text}")
-                # Fall back to basic feedback
-                return self._generate_fallback_feedback(transcription)
-                
+            for entry in parsed:
+                message_id = str(entry.get("message_id", ""))
+                feedback_result = self._parse_feedback_payload(entry)
+                if message_id and feedback_result:
+                    results[message_id] = feedback_result
+                    
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse batched Gemini response as JSON: {e}")
         except Exception as e:
-            logger.error(f"Error generating feedback: {str(e)}")
-            return self._generate_fallback_feedback(transcription)
+            logger.error(f"Error generating batched feedback: {str(e)}")
+        
+        # Fall back to one call per item for anything the batch did not cover
+        for item in items:
+            if item.message_id not in results:
+                logger.warning(f"Batched feedback missing for message {item.message_id}, generating individually")
+                results[item.message_id] = self._request_feedback_or_error(item)
+        
+        return results
+
+    def _request_feedback_or_error(self, item: PendingFeedback) -> Union[FeedbackResult, Exception]:
+        """Generate feedback for one batched item, returning the exception instead of raising it."""
+        try:
+            return self.request_feedback(item.transcription, item.context)
+        except Exception as e:
+            logger.error(f"Error generating feedback for message {item.message_id}: {str(e)}")
+            return e
 
     def store_feedback(
         self, 
@@ -285,8 +494,10 @@ class FeedbackService:
             # Process feedback data based on type
             if isinstance(feedback_data, FeedbackResult):
                 user_feedback = feedback_data.user_feedback
+                detailed_feedback = feedback_data.get_detailed_feedback()
             else:
                 user_feedback = feedback_data.get("user_feedback", "")
+                detailed_feedback = feedback_data.get("detailed_feedback")
                 
             
             
@@ -297,6 +508,7 @@ class FeedbackService:
                 target_type="message" if user_message_id else "conversation",
                 transcription=transcription,
                 user_feedback=user_feedback,
+                detailed_feedback=detailed_feedback,
             )
             
             # Insert feedback into database
@@ -316,28 +528,72 @@ class FeedbackService:
             logger.error(f"Error storing feedback: {str(e)}")
             raise Exception(f"Failed to store feedback: {str(e)}")
 
-    def _build_dual_feedback_prompt(
+    def _strip_code_fences(self, text: str) -> str:
+        """Remove markdown code fences Gemini sometimes wraps around its output."""
+        cleaned_text = text.strip()
+        if cleaned_text.startswith("```json"):
+            cleaned_text = cleaned_text[7:]  # Remove ```json prefix
+        if cleaned_text.endswith("```"):
+            cleaned_text = cleaned_text[:-3]  # Remove ``` suffix
+        return cleaned_text.strip()
+
+    def _parse_feedback_payload(self, payload: Dict[str, Any]) -> Optional[FeedbackResult]:
+        """
+        Convert a parsed Gemini JSON object into a FeedbackResult.
+        
+        Issues that do not match the GrammarIssue / VocabularyIssue schemas are
+        dropped instead of failing the whole feedback.
+        
+        Args:
+            payload: Parsed JSON object with user_feedback and issue lists
+            
+        Returns:
+            FeedbackResult, or None if the payload has no user_feedback
+        """
+        if not isinstance(payload, dict) or not payload.get("user_feedback"):
+            return None
+        
+        grammar_issues = []
+        for issue in payload.get("grammar_issues") or []:
+            try:
+                grammar_issues.append(GrammarIssue(**issue).model_dump())
+            except Exception as e:
+                logger.warning(f"Dropping invalid grammar issue {issue}: {str(e)}")
+        
+        vocabulary_issues = []
+        for issue in payload.get("vocabulary_issues") or []:
+            try:
+                vocabulary_issues.append(VocabularyIssue(**issue).model_dump())
+            except Exception as e:
+                logger.warning(f"Dropping invalid vocabulary issue {issue}: {str(e)}")
+        
+        return FeedbackResult(
+            user_feedback=payload["user_feedback"],
+            grammar_issues=grammar_issues,
+            vocabulary_issues=vocabulary_issues
+        )
+
+    def _build_utterance_block(
         self, 
         transcription: str, 
         context: Optional[Dict[str, Any]] = None
     ) -> str:
         """
-        Build prompt for generating user feedback.
+        Build the per-utterance part of a feedback prompt.
         
         Args:
             transcription: Transcribed text from the user's speech
             context: Optional conversation context information
             
         Returns:
-            Formatted prompt string for Gemini
+            Prompt fragment with the conversation context and the student's speech
         """
-        prompt = ""
-        previous_exchanges =  f"""  \"\"\"{context.get('previous_exchanges', 'No previous exchanges')  }\"\"\"  """
-
+        block = ""
         
         # Add context if available
         if context:
-            prompt += f"""
+            previous_exchanges =  f"""  \"\"\"{context.get('previous_exchanges', 'No previous exchanges')  }\"\"\"  """
+            block += f"""
             Context:
             - User role: {context.get('user_role', 'Student')}
             - AI role: {context.get('ai_role', 'Teacher')}
@@ -347,21 +603,64 @@ class FeedbackService:
              {previous_exchanges}
             """
         
-        # Add user role and AI role        
         # Add transcription
-        prompt += f"""
+        block += f"""
         Current student's speech: "{transcription}"
-        you are an expert English teacher providing feedback on a student's speech. this feedback will be showned when user click feedback button, dont greet the user or say anything else.
-        Note: because user speech is transcribed from audio, it may not contain punctuation. you do not need comment on this. 
-        Generate  feedback in string format:
-        Hãy đưa ra nhận xét và hướng dẫn như một người bản xứ nói tiếng Anh có thể sử dụng tiếng Việt để giải thích:
-                -Phân tích câu trả lời của người học và chỉ ra các lỗi về ngữ pháp và từ vựng.
-                -Cung cấp gợi ý hoặc ví dụ về cách dùng từ/cụm từ tốt hơn để diễn đạt tự nhiên hơn
-                -Đưa ra 2-3 phiên bản câu hoàn chỉnh hơn, sát với câu gốc nhưng đúng hơn, phù hợp với trình độ người học.
-                -Phân tích cấu trúc ngữ pháp (mental model) của câu ví dụ bạn đưa ra: chỉ ra chủ ngữ, động từ, bổ ngữ, cách dùng mệnh đề phụ (nếu có), và chức năng giao tiếp của từng phần trong câu. ( nhớ so sánh  với câu gốc của người học)
-                -Nếu câu trả lời của người học ngắn, chưa rõ ý, hoặc sai lệch hoàn toàn, hãy đưa ra một câu trả lời mẫu đơn giản hơn để họ có thể hình dung cách diễn đạt đúng, nhưng không nâng cấp quá xa so với trình độ hiện tại của họ.
+        """
+        return block
+
+    def _build_batch_feedback_prompt(self, items: List[PendingFeedback]) -> str:
+        """
+        Build one prompt covering several utterances.
+        
+        Args:
+            items: Pending feedback requests to include in the prompt
+            
+        Returns:
+            Formatted prompt string for Gemini asking for per-message feedback
+        """
+        prompt = f"""
+        {FEEDBACK_INSTRUCTIONS}
+        Apply the instructions above separately to each of the following {len(items)} student messages.
+        Each message has its own context; do not mix them up.
+        """
+        
+        for item in items:
+            prompt += f"""
+        ===== Message ID: {item.message_id} =====
+        {self._build_utterance_block(item.transcription, item.context)}
+        """
+        
+        prompt += f"""
+        {STRUCTURED_ISSUES_INSTRUCTIONS}
+        Return only a JSON array with one object per message, in this format:
+        [
+            {{"message_id": "<message id>", "user_feedback": "<feedback string for that message>", "grammar_issues": [...], "vocabulary_issues": [...]}}
+        ]
+        """
+        logger.info(f"Generated batch prompt for {len(items)} messages")
+        return prompt
+
+    def _build_dual_feedback_prompt(
+        self, 
+        transcription: str, 
+        context: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Build prompt for generating user feedback.
+        
+        Args:
+            transcription: Transcribed text from the user's speech
+            context: Optional conversation context information
             
-        Return only the feedback string 
+        Returns:
+            Formatted prompt string for Gemini
+        """
+        prompt = self._build_utterance_block(transcription, context)
+        prompt += f"""
+        {FEEDBACK_INSTRUCTIONS}
+        {STRUCTURED_ISSUES_INSTRUCTIONS}
+        Return only a JSON object with "user_feedback" (the feedback string described above), "grammar_issues" and "vocabulary_issues".
         
         """
         # prompt += f"""
@@ -418,7 +717,7 @@ class FeedbackService:
         """
         return FeedbackResult(
             user_feedback="Thank you for your response. I had trouble analyzing it in detail, but please continue practicing.",
-          
+            is_fallback=True
         ) 
         
         
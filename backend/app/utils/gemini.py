@@ -1,5 +1,6 @@
 import google.generativeai as genai
 import os
+from typing import Any, Dict, Optional
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -44,3 +45,29 @@ def generate_response(prompt: str):
     response = model.generate_content(prompt)
     return response.text
 
+
+def generate_json_response(prompt: str, response_schema: Optional[Dict[str, Any]] = None):
+    """
+    Generate a JSON response from the Gemini AI model.
+    
+    The model is put in JSON mode and, when a schema is given, constrained to
+    that schema, so the returned text can be passed straight to json.loads.
+    
+    Args:
+        prompt (str): The input text prompt to generate a response for.
+        response_schema (Optional[Dict[str, Any]]): OpenAPI-style schema the
+            response must follow, e.g.
+            {"type": "OBJECT", "properties": {"answer": {"type": "STRING"}}}
+    
+    Returns:
+        str: The generated JSON text.
+        
+    Raises:
+        Exception: If there are any issues with the API call or response generation.
+    """
+    generation_config = genai.GenerationConfig(
+        response_mime_type="application/json",
+        response_schema=response_schema
+    )
+    response = model.generate_content(prompt, generation_config=generation_config)
+    return response.text
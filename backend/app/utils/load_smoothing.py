@@ -0,0 +1,254 @@
+"""
+Due-date load smoothing for practice scheduling.
+
+Intervals of two days or more get a bounded fuzz window, and the day in
+that window is picked at random, weighted towards days on which the user
+(and, to a lesser degree, all users) have fewer mistakes due. Windows are
+symmetric, so average intervals stay about the same while peaks flatten;
+near MAX_INTERVAL_DAYS they narrow so the cap still holds, and intervals
+at the cap are not fuzzed.
+
+The per-user load comes from the hourly due histogram in the user's
+materialized stats document (db.mistake_stats). The global load is kept
+in db.due_load, one document per day ({"_id": "YYYY-MM-DD", "count": n}),
+maintained from the same stats deltas. Deltas are summed in memory and
+written every MISTAKE_GLOBAL_LOAD_FLUSH_SECONDS, so stores and practice
+do not all queue up on the same document; the documents are reconciled
+periodically, which also drops past days.
+
+The choice for every possible interval is precomputed into an offset
+table, which the practice pipeline update looks up once the scheduler
+has computed the interval.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from app.config.database import db
+from app.utils.schedulers import MAX_INTERVAL_DAYS
+
+logger = logging.getLogger(__name__)
+
+# Set to 0 to schedule exact intervals
+MISTAKE_LOAD_BALANCING = os.getenv("MISTAKE_LOAD_BALANCING", "1") == "1"
+# Fuzz window: +/- this fraction of the interval, at least 1 and at most MISTAKE_FUZZ_MAX_DAYS days
+MISTAKE_FUZZ_FACTOR = float(os.getenv("MISTAKE_FUZZ_FACTOR", "0.1"))
+MISTAKE_FUZZ_MAX_DAYS = int(os.getenv("MISTAKE_FUZZ_MAX_DAYS", "3"))
+# Intervals shorter than this are not fuzzed
+MISTAKE_FUZZ_MIN_INTERVAL_DAYS = 2
+# Weight of the global load relative to the user's own (1.0 = an average global day counts as one due mistake)
+MISTAKE_GLOBAL_LOAD_WEIGHT = float(os.getenv("MISTAKE_GLOBAL_LOAD_WEIGHT", "1.0"))
+MISTAKE_GLOBAL_LOAD_CACHE_SECONDS = int(os.getenv("MISTAKE_GLOBAL_LOAD_CACHE_SECONDS", "60"))
+# How often the global load changes summed in memory are written
+MISTAKE_GLOBAL_LOAD_FLUSH_SECONDS = float(os.getenv("MISTAKE_GLOBAL_LOAD_FLUSH_SECONDS", "10"))
+# New mistakes are first due 2 hours after they are made, plus up to this many minutes
+MISTAKE_NEW_FUZZ_MINUTES = int(os.getenv("MISTAKE_NEW_FUZZ_MINUTES", "60"))
+
+DAY_FORMAT = "%Y-%m-%d"
+
+
+def fuzz_window(interval_days: int) -> Tuple[int, int]:
+    """
+    Get the range of days an interval may be moved to.
+
+    The window is centred on the interval. Near MAX_INTERVAL_DAYS both
+    sides are narrowed to the room left below the cap, so the window stays
+    centred and the average interval is unchanged.
+
+    Args:
+        interval_days: Interval rounded to whole days
+
+    Returns:
+        Tuple of (shortest, longest) interval in days
+    """
+    if interval_days < MISTAKE_FUZZ_MIN_INTERVAL_DAYS:
+        return interval_days, interval_days
+    fuzz = min(MISTAKE_FUZZ_MAX_DAYS, max(1, round(interval_days * MISTAKE_FUZZ_FACTOR)))
+    fuzz = max(0, min(fuzz, MAX_INTERVAL_DAYS - interval_days))
+    return max(1, interval_days - fuzz), interval_days + fuzz
+
+
+def daily_load(due_histogram: Dict[str, int]) -> Dict[str, int]:
+    """Sum an hourly due histogram (keys "%Y-%m-%dT%H") into days."""
+    days: Dict[str, int] = {}
+    for bucket, count in due_histogram.items():
+        if count > 0:
+            days[bucket[:10]] = days.get(bucket[:10], 0) + count
+    return days
+
+
+class DueLoadBalancer:
+    """
+    Picks load-balanced intervals and keeps the global daily due histogram.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._global_load: Dict[str, int] = {}
+        self._global_loaded_at = 0.0
+        # Global load changes not written yet, by day
+        self._pending: Dict[str, int] = {}
+        self._flushed_at = time.monotonic()
+
+    def global_load(self) -> Dict[str, int]:
+        """
+        Get the global daily due histogram from today to MAX_INTERVAL_DAYS ahead.
+
+        Cached for MISTAKE_GLOBAL_LOAD_CACHE_SECONDS.
+        """
+        with self._lock:
+            if time.monotonic() - self._global_loaded_at < MISTAKE_GLOBAL_LOAD_CACHE_SECONDS:
+                return self._global_load
+        now = datetime.utcnow()
+        try:
+            documents = db.due_load.find({"_id": {
+                "$gte": now.strftime(DAY_FORMAT),
+                "$lte": (now + timedelta(days=MAX_INTERVAL_DAYS + 1)).strftime(DAY_FORMAT)
+            }})
+            load = {document["_id"]: document["count"] for document in documents if document.get("count", 0) > 0}
+        except Exception as e:
+            logger.error(f"Error reading global due load: {str(e)}")
+            load = {}
+        with self._lock:
+            self._global_load = load
+            self._global_loaded_at = time.monotonic()
+        return load
+
+    def offset_table(
+        self,
+        user_load: Dict[str, int],
+        now: datetime,
+        rng: Optional[random.Random] = None
+    ) -> List[int]:
+        """
+        Choose the day shift for every whole-day interval from 0 to MAX_INTERVAL_DAYS.
+
+        Within an interval's fuzz window, day d is picked with probability
+        proportional to 1 / (1 + load(d)) ** 2, where load is the user's due
+        count that day plus the global count relative to the global daily
+        mean, weighted by MISTAKE_GLOBAL_LOAD_WEIGHT.
+
+        Args:
+            user_load: User's due mistakes per day ("%Y-%m-%d")
+            now: Time of the practice
+            rng: Random number generator (defaults to the random module)
+
+        Returns:
+            Shift in days, indexed by the interval rounded to whole days
+        """
+        if not MISTAKE_LOAD_BALANCING:
+            return [0] * (MAX_INTERVAL_DAYS + 1)
+
+        rng = rng or random
+        global_load = self.global_load() if MISTAKE_GLOBAL_LOAD_WEIGHT > 0 else {}
+        global_mean = sum(global_load.values()) / len(global_load) if global_load else 0
+
+        def load(days_ahead: int) -> float:
+            day = (now + timedelta(days=days_ahead)).strftime(DAY_FORMAT)
+            value = user_load.get(day, 0)
+            if global_mean:
+                value += MISTAKE_GLOBAL_LOAD_WEIGHT * global_load.get(day, 0) / global_mean
+            return value
+
+        loads: Dict[int, float] = {}
+        offsets = []
+        for interval in range(MAX_INTERVAL_DAYS + 1):
+            shortest, longest = fuzz_window(interval)
+            if shortest == longest:
+                offsets.append(shortest - interval)
+                continue
+            candidates = list(range(shortest, longest + 1))
+            for days_ahead in candidates:
+                if days_ahead not in loads:
+                    loads[days_ahead] = load(days_ahead)
+            weights = [1 / (1 + loads[days_ahead]) ** 2 for days_ahead in candidates]
+            offsets.append(rng.choices(candidates, weights=weights)[0] - interval)
+        return offsets
+
+    def apply_delta(self, day_delta: Dict[str, int]):
+        """
+        Apply changes to the global daily due histogram.
+
+        Changes are summed in memory and written at most every
+        MISTAKE_GLOBAL_LOAD_FLUSH_SECONDS. Past days are skipped, as
+        they are never looked up again.
+
+        Args:
+            day_delta: Increments keyed by day ("%Y-%m-%d")
+        """
+        today = datetime.utcnow().strftime(DAY_FORMAT)
+        with self._lock:
+            for day, value in day_delta.items():
+                if value and day >= today:
+                    self._pending[day] = self._pending.get(day, 0) + value
+            if time.monotonic() - self._flushed_at < MISTAKE_GLOBAL_LOAD_FLUSH_SECONDS:
+                return
+        self.flush()
+
+    def flush(self):
+        """Write the pending global load changes, with one upsert per day."""
+        with self._lock:
+            pending = {day: value for day, value in self._pending.items() if value}
+            self._pending = {}
+            self._flushed_at = time.monotonic()
+        if not pending:
+            return
+        now = datetime.utcnow()
+        try:
+            db.due_load.bulk_write([
+                UpdateOne({"_id": day}, {"$inc": {"count": value}, "$set": {"updated_at": now}}, upsert=True)
+                for day, value in sorted(pending.items())
+            ], ordered=False)
+        except Exception as e:
+            logger.error(f"Error updating global due load: {str(e)}")
+
+    def reconcile(self) -> Dict[str, int]:
+        """
+        Recompute the global daily due histogram from the mistakes.
+
+        Days in the past are dropped, as are changes not written yet,
+        which the recount already includes.
+
+        Returns:
+            The new histogram
+        """
+        with self._lock:
+            self._pending = {}
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        days = {
+            row["_id"]: row["count"]
+            for row in db.mistakes.aggregate([
+                {"$match": {"status": {"$ne": "MASTERED"}, "next_practice_date": {"$gte": today}}},
+                {"$group": {
+                    "_id": {"$dateToString": {"format": DAY_FORMAT, "date": "$next_practice_date"}},
+                    "count": {"$sum": 1}
+                }}
+            ], allowDiskUse=True)
+        }
+        now = datetime.utcnow()
+        if days:
+            db.due_load.bulk_write([
+                UpdateOne(
+                    {"_id": day},
+                    {"$set": {"count": count, "reconciled_at": now, "updated_at": now}},
+                    upsert=True
+                )
+                for day, count in sorted(days.items())
+            ], ordered=False)
+        # Past days, days with nothing due, and the former single "global" document
+        db.due_load.delete_many({"_id": {"$nin": list(days)}})
+        with self._lock:
+            self._global_load = days
+            self._global_loaded_at = time.monotonic()
+        return days
+
+
+# Create a singleton instance
+due_load_balancer = DueLoadBalancer()
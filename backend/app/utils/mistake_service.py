@@ -1,13 +1,57 @@
 import uuid
+import hashlib
 import logging
+import os
+import random
+import threading
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 from bson import ObjectId
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
 
 from app.config.database import db
+from app.utils.mistake_similarity import (
+    MISTAKE_SIMILARITY_THRESHOLD,
+    jaccard_similarity,
+    lsh_bands,
+    normalize_mistake_text
+)
+from app.utils.spaced_repetition import build_review_session, review_priority_pipeline
+from app.utils.schedulers import get_scheduler, interval_days, interval_expression
+from app.utils.load_smoothing import MISTAKE_NEW_FUZZ_MINUTES, daily_load, due_load_balancer
+from app.utils.practice_exercises import select_exercise
 
 logger = logging.getLogger(__name__)
 
+# Format of the hourly buckets in mistake_stats.due_histogram (same in Python and $dateToString)
+DUE_BUCKET_FORMAT = "%Y-%m-%dT%H"
+
+# MongoDB duplicate key error code
+DUPLICATE_KEY_ERROR = 11000
+
+# Maximum near-duplicate candidates loaded per batch of mistakes
+MISTAKE_SIMILARITY_MAX_CANDIDATES = int(os.getenv("MISTAKE_SIMILARITY_MAX_CANDIDATES", "200"))
+
+# Maximum entries kept in a user's materialized due queue (db.mistake_queues)
+MISTAKE_QUEUE_SIZE = int(os.getenv("MISTAKE_QUEUE_SIZE", "100"))
+
+# Updates per bulk write when rescheduling a user's mistakes
+MISTAKE_RESCHEDULE_BATCH_SIZE = int(os.getenv("MISTAKE_RESCHEDULE_BATCH_SIZE", "500"))
+
+
+def mistake_fingerprint(text: str) -> str:
+    """
+    Get the fingerprint that identifies a mistake for a user and type.
+    
+    Args:
+        text: Original mistake text
+        
+    Returns:
+        Hex digest of the normalized text
+    """
+    return hashlib.sha1(normalize_mistake_text(text).encode("utf-8")).hexdigest()
+
 class MistakeStatistics:
     """
     Container for mistake statistics as shown in the class diagram.
@@ -54,6 +98,10 @@ class MistakeService:
     5. Update mistake status after practice
     """
     
+    # The unique fingerprint index is prepared once per process
+    _indexes_ready = False
+    _indexes_lock = threading.Lock()
+    
     def process_feedback_for_mistakes(
         self,
         user_id: str,
@@ -74,54 +122,152 @@ class MistakeService:
             Number of mistakes processed
         """
         try:
-            # Handle different feedback structures
-            detailed_feedback = {}
-            if isinstance(feedback, dict):
-                if "detailed_feedback" in feedback:
-                    detailed_feedback = feedback.get("detailed_feedback", {})
-                else:
-                    # Directly using the object as detailed feedback
-                    detailed_feedback = feedback
-                    
-            # Extract grammar mistakes
-            grammar_mistakes = []
-            for issue in detailed_feedback.get("grammar_issues", []):
-                # Only process significant issues (severity > 2)
-                if issue.get("severity", 3) > 2:
-                    mistake = {
-                        "user_id": ObjectId(user_id),
-                        "type": "GRAMMAR",
-                        "original_text": issue.get("issue", ""),
-                        "correction": issue.get("correction", ""),
-                        "explanation": issue.get("explanation", ""),
-                        "severity": issue.get("severity", 3),
-                        "context": self._extract_context(transcription, issue.get("issue", "")),
-                        "situation_context": self._extract_situation_context(context),
-                        "created_at": datetime.utcnow(),
-                        "last_occurred": datetime.utcnow(),
-                        "frequency": 1,
-                        "last_practiced": None,
-                        "practice_count": 0,
-                        "success_count": 0,
-                        "next_practice_date": self._calculate_next_practice(0, False),
-                        "in_drill_queue": True,
-                        "is_learned": False,
-                        "mastery_level": 0,
-                        "status": "NEW"
-                    }
-                    grammar_mistakes.append(mistake)
-            
-            # Extract vocabulary mistakes
-            vocab_mistakes = []
-            for issue in detailed_feedback.get("vocabulary_issues", []):
+            all_mistakes = self._build_mistakes(user_id, transcription, feedback, context)
+            
+            # Store non-duplicate mistakes
+            return self._store_unique_mistakes(user_id, all_mistakes)
+            
+        except Exception as e:
+            logger.error(f"Error processing mistakes: {str(e)}")
+            raise
+    
+    def process_feedback_batch(self, items: List[Dict[str, Any]]) -> int:
+        """
+        Extract and store mistakes for several feedback records at once.
+        
+        Feedback, messages, audio records and conversations are each loaded
+        with a single $in query, and each user's mistakes are written with one
+        bulk operation.
+        
+        Args:
+            items: Dictionaries with feedback_id and optionally user_id and transcription
+            
+        Returns:
+            Number of mistakes processed
+        """
+        feedback_ids = [ObjectId(item["feedback_id"]) for item in items if item.get("feedback_id")]
+        if not feedback_ids:
+            return 0
+        
+        feedback_by_id = {
+            str(feedback["_id"]): feedback
+            for feedback in db.feedback.find({"_id": {"$in": feedback_ids}})
+        }
+        
+        # Load targets only for items that still miss the user or the transcription
+        message_ids, audio_ids = [], []
+        for item in items:
+            feedback = feedback_by_id.get(item.get("feedback_id"))
+            if not feedback:
+                continue
+            if (item.get("user_id") or feedback.get("user_id")) and (item.get("transcription") or feedback.get("transcription")):
+                continue
+            if feedback.get("target_type") == "message":
+                message_ids.append(feedback.get("target_id"))
+            elif feedback.get("target_type") == "audio":
+                audio_ids.append(feedback.get("target_id"))
+        
+        messages = {}
+        conversations = {}
+        if message_ids:
+            messages = {message["_id"]: message for message in db.messages.find({"_id": {"$in": message_ids}})}
+            conversation_ids = list({message.get("conversation_id") for message in messages.values()})
+            conversations = {
+                conversation["_id"]: conversation
+                for conversation in db.conversations.find(
+                    {"_id": {"$in": conversation_ids}},
+                    {"user_role": 1, "ai_role": 1, "situation": 1}
+                )
+            }
+        audio_records = {}
+        if audio_ids:
+            audio_records = {audio["_id"]: audio for audio in db.audio.find({"_id": {"$in": audio_ids}})}
+        
+        mistakes_by_user: Dict[str, List[Dict[str, Any]]] = {}
+        for item in items:
+            feedback_id = item.get("feedback_id")
+            feedback = feedback_by_id.get(feedback_id)
+            if not feedback:
+                logger.warning(f"Feedback with ID {feedback_id} not found")
+                continue
+            
+            user_id = item.get("user_id") or (str(feedback["user_id"]) if feedback.get("user_id") else None)
+            transcription = item.get("transcription") or feedback.get("transcription")
+            context = None
+            
+            if not user_id or not transcription:
+                if feedback.get("target_type") == "message":
+                    message = messages.get(feedback.get("target_id"))
+                    if message:
+                        user_id = user_id or str(message.get("user_id", ""))
+                        transcription = transcription or message.get("content")
+                        context = conversations.get(message.get("conversation_id"))
+                elif feedback.get("target_type") == "audio":
+                    audio = audio_records.get(feedback.get("target_id"))
+                    if audio:
+                        user_id = user_id or str(audio.get("user_id", ""))
+                        transcription = transcription or audio.get("transcription")
+            
+            if not user_id:
+                logger.error(f"Missing user_id for feedback {feedback_id}")
+                continue
+            
+            mistakes_by_user.setdefault(user_id, []).extend(
+                self._build_mistakes(user_id, transcription or "", feedback, context)
+            )
+        
+        processed = 0
+        for user_id, mistakes in mistakes_by_user.items():
+            processed += self._store_unique_mistakes(user_id, mistakes)
+        
+        # Lets the historical backfill skip feedback that was already processed
+        db.feedback.update_many(
+            {"_id": {"$in": [ObjectId(feedback_id) for feedback_id in feedback_by_id]}},
+            {"$set": {"mistakes_extracted_at": datetime.utcnow()}}
+        )
+        return processed
+    
+    def _build_mistakes(
+        self,
+        user_id: str,
+        transcription: str,
+        feedback: Dict[str, Any],
+        context: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Build mistake documents from the issues in a feedback record.
+        
+        Args:
+            user_id: ID of the user
+            transcription: Original transcription text
+            feedback: Feedback data (either raw object or from database)
+            context: Optional conversation context
+            
+        Returns:
+            List of mistake documents (not yet stored)
+        """
+        # Handle different feedback structures
+        detailed_feedback = {}
+        if isinstance(feedback, dict):
+            if "detailed_feedback" in feedback:
+                detailed_feedback = feedback.get("detailed_feedback", {})
+            else:
+                # Directly using the object as detailed feedback
+                detailed_feedback = feedback
+                
+        # Extract grammar mistakes
+        grammar_mistakes = []
+        for issue in detailed_feedback.get("grammar_issues", []):
+            # Only process significant issues (severity > 2)
+            if issue.get("severity", 3) > 2:
                 mistake = {
                     "user_id": ObjectId(user_id),
-                    "type": "VOCABULARY",
-                    "original_text": issue.get("original", ""),
-                    "correction": issue.get("better_alternative", ""),
-                    "explanation": issue.get("reason", ""),
-                    "example_usage": issue.get("example_usage", ""),
-                    "context": self._extract_context(transcription, issue.get("original", "")),
+                    "type": "GRAMMAR",
+                    "original_text": issue.get("issue", ""),
+                    "correction": issue.get("correction", ""),
+                    "explanation": issue.get("explanation", ""),
+                    "severity": issue.get("severity", 3),
+                    "context": self._extract_context(transcription, issue.get("issue", "")),
                     "situation_context": self._extract_situation_context(context),
                     "created_at": datetime.utcnow(),
                     "last_occurred": datetime.utcnow(),
@@ -135,19 +281,36 @@ class MistakeService:
                     "mastery_level": 0,
                     "status": "NEW"
                 }
-                vocab_mistakes.append(mistake)
-            
-            # Combine all mistakes
-            all_mistakes = grammar_mistakes + vocab_mistakes
-            
-            # Store non-duplicate mistakes
-            stored_ids = self._store_unique_mistakes(user_id, all_mistakes)
-            
-            return len(stored_ids)
-            
-        except Exception as e:
-            logger.error(f"Error processing mistakes: {str(e)}")
-            raise
+                grammar_mistakes.append(mistake)
+        
+        # Extract vocabulary mistakes
+        vocab_mistakes = []
+        for issue in detailed_feedback.get("vocabulary_issues", []):
+            mistake = {
+                "user_id": ObjectId(user_id),
+                "type": "VOCABULARY",
+                "original_text": issue.get("original", ""),
+                "correction": issue.get("better_alternative", ""),
+                "explanation": issue.get("reason", ""),
+                "example_usage": issue.get("example_usage", ""),
+                "context": self._extract_context(transcription, issue.get("original", "")),
+                "situation_context": self._extract_situation_context(context),
+                "created_at": datetime.utcnow(),
+                "last_occurred": datetime.utcnow(),
+                "frequency": 1,
+                "last_practiced": None,
+                "practice_count": 0,
+                "success_count": 0,
+                "next_practice_date": self._calculate_next_practice(0, False),
+                "in_drill_queue": True,
+                "is_learned": False,
+                "mastery_level": 0,
+                "status": "NEW"
+            }
+            vocab_mistakes.append(mistake)
+        
+        # Combine all mistakes
+        return grammar_mistakes + vocab_mistakes
     
     def get_unmastered_mistakes(self, user_id: str) -> List[Dict[str, Any]]:
         """
@@ -193,17 +356,8 @@ class MistakeService:
         Returns:
             List of mistakes for practice
         """
-        now = datetime.utcnow()
-        
         try:
-            # Fetch practice-due mistakes
-            cursor = db.mistakes.find({
-                "user_id": ObjectId(user_id),
-                "in_drill_queue": True,
-                "next_practice_date": {"$lte": now}
-            }).sort("next_practice_date", 1).limit(limit)
-            
-            mistakes = list(cursor)
+            mistakes = self.get_due_mistakes(user_id, limit)
             
             # Transform into practice exercises
             return [self._transform_to_practice_item(mistake) for mistake in mistakes]
@@ -212,12 +366,228 @@ class MistakeService:
             logger.error(f"Error fetching practice items: {str(e)}")
             return []
     
+    def get_due_mistakes(self, user_id: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Get the user's due mistakes from their materialized due queue.
+        
+        The queue document (db.mistake_queues, keyed by user) holds the
+        MISTAKE_QUEUE_SIZE drill mistakes with the earliest next practice
+        dates, sorted by that date, and is updated whenever mistakes are
+        stored or practiced. Fetching the next drill is therefore one read
+        by _id plus one _id lookup of at most `limit` mistakes, however many
+        mistakes the user has. The queue is rebuilt with one indexed query
+        if it is missing, or if entries were dropped by the cap and it has
+        either run low or been outlived by its cutoff (the date of the last
+        kept entry), after which dropped mistakes may be due.
+        
+        Args:
+            user_id: ID of the user
+            limit: Maximum number of mistakes to return
+            
+        Returns:
+            Due mistakes, earliest first
+        """
+        now = datetime.utcnow()
+        queue = db.mistake_queues.find_one({"_id": ObjectId(user_id)})
+        # A queue rebuilt after its cutoff already holds the earliest mistakes
+        if not queue or (queue.get("truncated") and (
+            len(queue.get("items", [])) < max(limit, MISTAKE_QUEUE_SIZE // 2)
+            or not queue.get("cutoff")
+            or queue.get("rebuilt_at", now) < queue["cutoff"] < now
+        )):
+            queue = self.rebuild_due_queue(user_id)
+        
+        due_ids = list(dict.fromkeys(
+            item["mistake_id"] for item in queue.get("items", [])
+            if isinstance(item.get("next_practice_date"), datetime) and item["next_practice_date"] <= now
+        ))[:limit]
+        if not due_ids:
+            return []
+        
+        mistakes = {
+            mistake["_id"]: mistake
+            for mistake in db.mistakes.find({"_id": {"$in": due_ids}, "user_id": ObjectId(user_id)})
+        }
+        return [mistakes[mistake_id] for mistake_id in due_ids if mistake_id in mistakes]
+    
+    def rebuild_due_queue(self, user_id: str) -> Dict[str, Any]:
+        """
+        Rebuild a user's due queue from the mistakes.
+        
+        Reads the earliest drill mistakes with one query on the
+        (user_id, in_drill_queue, next_practice_date) index. Mistakes
+        without an in_drill_queue flag count as in the drill queue, as
+        in the review session pipeline.
+        
+        Args:
+            user_id: ID of the user
+            
+        Returns:
+            The new queue document
+        """
+        self.ensure_indexes()
+        
+        mistakes = list(db.mistakes.find(
+            {
+                "user_id": ObjectId(user_id),
+                "in_drill_queue": {"$ne": False},
+                "next_practice_date": {"$type": "date"}
+            },
+            {"next_practice_date": 1}
+        ).sort("next_practice_date", 1).limit(MISTAKE_QUEUE_SIZE + 1))
+        
+        items = [self._queue_entry(mistake) for mistake in mistakes[:MISTAKE_QUEUE_SIZE]]
+        truncated = len(mistakes) > MISTAKE_QUEUE_SIZE
+        queue = {
+            "_id": ObjectId(user_id),
+            "items": items,
+            "truncated": truncated,
+            "cutoff": items[-1]["next_practice_date"] if truncated else None,
+            "rebuilt_at": datetime.utcnow()
+        }
+        db.mistake_queues.replace_one({"_id": queue["_id"]}, queue, upsert=True)
+        return queue
+    
+    def _queue_entry(self, mistake: Dict[str, Any]) -> Dict[str, Any]:
+        """Get a mistake's entry in the due queue."""
+        return {"mistake_id": mistake["_id"], "next_practice_date": mistake["next_practice_date"]}
+    
+    def _update_due_queue(
+        self,
+        user_id: str,
+        mistakes: List[Dict[str, Any]],
+        replace: bool = False
+    ):
+        """
+        Add mistakes to a user's due queue, keeping it sorted and capped.
+        
+        Nothing is written if the queue does not exist yet; it is built
+        from scratch on the next read. When the queue reaches the cap it is
+        marked truncated, since later mistakes may have been dropped, and
+        its cutoff is set to the date of the last kept entry. Mistakes due
+        after the cutoff are not added, as dropped mistakes may be due
+        before them; the rebuild after the cutoff passes picks them up.
+        
+        Args:
+            user_id: ID of the user
+            mistakes: Mistakes with _id, next_practice_date and in_drill_queue
+            replace: Remove the mistakes' existing entries first (after practice)
+        """
+        entries = [
+            self._queue_entry(mistake) for mistake in mistakes
+            if mistake.get("in_drill_queue", True) and isinstance(mistake.get("next_practice_date"), datetime)
+        ]
+        try:
+            if replace and mistakes:
+                queue = db.mistake_queues.find_one_and_update(
+                    {"_id": ObjectId(user_id)},
+                    {"$pull": {"items": {"mistake_id": {"$in": [mistake["_id"] for mistake in mistakes]}}}},
+                    projection={"cutoff": 1}
+                )
+            else:
+                queue = db.mistake_queues.find_one({"_id": ObjectId(user_id)}, {"cutoff": 1})
+            if not queue:
+                return
+            
+            cutoff = queue.get("cutoff")
+            if cutoff:
+                entries = [entry for entry in entries if entry["next_practice_date"] <= cutoff]
+            if not entries:
+                return
+            
+            # Skipped if a rebuild changed the cutoff meanwhile; the rebuild read the new dates
+            queue = db.mistake_queues.find_one_and_update(
+                {"_id": ObjectId(user_id), "cutoff": cutoff},
+                {"$push": {"items": {
+                    "$each": entries,
+                    "$sort": {"next_practice_date": 1},
+                    "$slice": MISTAKE_QUEUE_SIZE
+                }}},
+                projection={
+                    "size": {"$size": "$items"},
+                    "last": {"$arrayElemAt": ["$items.next_practice_date", -1]}
+                },
+                return_document=ReturnDocument.AFTER
+            )
+            if queue and queue["size"] >= MISTAKE_QUEUE_SIZE:
+                db.mistake_queues.update_one(
+                    {"_id": ObjectId(user_id)},
+                    {"$set": {"truncated": True, "cutoff": queue["last"]}}
+                )
+        except Exception as e:
+            logger.error(f"Error updating due queue for user {user_id}: {str(e)}")
+    
+    def get_review_session(self, user_id: str, session_size: int = 5) -> Dict[str, Any]:
+        """
+        Create a review session from the user's highest-priority mistakes.
+        
+        The mistakes are ranked by review_priority_pipeline inside the
+        database, so only `session_size` documents are loaded.
+        
+        Args:
+            user_id: ID of the user
+            session_size: Maximum number of mistakes in the session
+            
+        Returns:
+            Dictionary with session information and mistakes to review
+        """
+        self.ensure_indexes()
+        
+        mistakes = list(db.mistakes.aggregate(
+            review_priority_pipeline(ObjectId(user_id), session_size)
+        ))
+        for mistake in mistakes:
+            mistake["_id"] = str(mistake["_id"])
+            mistake["user_id"] = str(mistake["user_id"])
+        
+        return build_review_session(user_id, mistakes)
+    
+    def list_mistakes(
+        self,
+        user_id: str,
+        status: Optional[str] = None,
+        mistake_type: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 20
+    ) -> tuple:
+        """
+        List a user's mistakes, most recently made first.
+        
+        Args:
+            user_id: ID of the user
+            status: Only return mistakes with this status
+            mistake_type: Only return mistakes of this type
+            skip: Number of mistakes to skip
+            limit: Maximum number of mistakes to return
+            
+        Returns:
+            Tuple of (mistakes, total number matching the filters)
+        """
+        query: Dict[str, Any] = {"user_id": ObjectId(user_id)}
+        if status:
+            query["status"] = status
+        if mistake_type:
+            query["type"] = mistake_type
+        
+        mistakes = list(
+            db.mistakes.find(query, {"lsh_bands": 0})
+            .sort([("last_occurred", -1), ("_id", -1)])
+            .skip(skip)
+            .limit(limit)
+        )
+        return mistakes, db.mistakes.count_documents(query)
+    
     def get_mistake_statistics(self, user_id: str) -> MistakeStatistics:
         """
         Get statistics about a user's mistakes.
         
         This method matches the class diagram's getMistakeStatistics method.
         
+        Reads the user's materialized stats document, which is kept up to date
+        incrementally; it is rebuilt with one aggregation if missing.
+        Due counts use hourly buckets, so `due_for_practice` includes mistakes
+        that become due before the end of the current hour.
+        
         Args:
             user_id: ID of the user
             
@@ -225,46 +595,165 @@ class MistakeService:
             MistakeStatistics object with statistics
         """
         try:
-            now = datetime.utcnow()
+            stats = db.mistake_stats.find_one({"_id": ObjectId(user_id)})
+            if not stats:
+                stats = self.reconcile_mistake_stats(user_id)
             
-            # Get counts by status
-            total_count = db.mistakes.count_documents({"user_id": ObjectId(user_id)})
-            mastered_count = db.mistakes.count_documents({"user_id": ObjectId(user_id), "status": "MASTERED"})
-            learning_count = db.mistakes.count_documents({"user_id": ObjectId(user_id), "status": "LEARNING"})
-            new_count = db.mistakes.count_documents({"user_id": ObjectId(user_id), "status": "NEW"})
+            return self._statistics_from_document(stats)
             
-            # Get type distribution
-            grammar_count = db.mistakes.count_documents({"user_id": ObjectId(user_id), "type": "GRAMMAR"})
-            vocab_count = db.mistakes.count_documents({"user_id": ObjectId(user_id), "type": "VOCABULARY"})
+        except Exception as e:
+            logger.error(f"Error getting mistake statistics: {str(e)}")
+            return MistakeStatistics()
+    
+    def reconcile_mistake_stats(self, user_id: str) -> Dict[str, Any]:
+        """
+        Recompute a user's materialized stats document from the mistakes.
+        
+        Uses a single $facet aggregation. Called when the document is missing
+        and periodically to correct drift from concurrent updates.
+        
+        Args:
+            user_id: ID of the user
             
-            # Get due for practice
-            due_count = db.mistakes.count_documents({
-                "user_id": ObjectId(user_id), 
-                "next_practice_date": {"$lte": now},
-                "status": {"$ne": "MASTERED"}
-            })
+        Returns:
+            The new stats document
+        """
+        result = next(db.mistakes.aggregate([
+            {"$match": {"user_id": ObjectId(user_id)}},
+            {"$facet": {
+                "total": [{"$count": "count"}],
+                "status": [{"$group": {"_id": "$status", "count": {"$sum": 1}}}],
+                "type": [{"$group": {"_id": "$type", "count": {"$sum": 1}}}],
+                "due_histogram": [
+                    {"$match": {"status": {"$ne": "MASTERED"}, "next_practice_date": {"$type": "date"}}},
+                    {"$group": {
+                        "_id": {"$dateToString": {"format": DUE_BUCKET_FORMAT, "date": "$next_practice_date"}},
+                        "count": {"$sum": 1}
+                    }}
+                ]
+            }}
+        ]), {})
+        
+        now = datetime.utcnow()
+        stats = {
+            "_id": ObjectId(user_id),
+            "total": result["total"][0]["count"] if result.get("total") else 0,
+            "status": {row["_id"]: row["count"] for row in result.get("status", []) if row["_id"]},
+            "type": {row["_id"]: row["count"] for row in result.get("type", []) if row["_id"]},
+            "due_histogram": {row["_id"]: row["count"] for row in result.get("due_histogram", [])},
+            "reconciled_at": now,
+            "updated_at": now
+        }
+        db.mistake_stats.replace_one({"_id": stats["_id"]}, stats, upsert=True)
+        return stats
+    
+    def reconcile_all_mistake_stats(self) -> int:
+        """
+        Recompute every materialized stats document, and the global due load.
+        
+        Returns:
+            Number of users reconciled
+        """
+        try:
+            due_load_balancer.reconcile()
+        except Exception as e:
+            logger.error(f"Error reconciling global due load: {str(e)}")
+        
+        reconciled = 0
+        for stats in db.mistake_stats.find({}, {"_id": 1}):
+            try:
+                self.reconcile_mistake_stats(str(stats["_id"]))
+                reconciled += 1
+            except Exception as e:
+                logger.error(f"Error reconciling mistake stats for user {stats['_id']}: {str(e)}")
+        return reconciled
+    
+    def _statistics_from_document(self, stats: Dict[str, Any]) -> MistakeStatistics:
+        """
+        Build MistakeStatistics from a materialized stats document.
+        
+        Args:
+            stats: Document from db.mistake_stats
             
-            # Calculate mastery percentage
-            mastery_percentage = 0
-            if total_count > 0:
-                mastery_percentage = (mastered_count / total_count) * 100
-            
-            return MistakeStatistics(
-                total_count=total_count,
-                mastered_count=mastered_count,
-                learning_count=learning_count,
-                new_count=new_count,
-                type_distribution={
-                    "GRAMMAR": grammar_count,
-                    "VOCABULARY": vocab_count
-                },
-                due_for_practice=due_count,
-                mastery_percentage=mastery_percentage
+        Returns:
+            MistakeStatistics object
+        """
+        total_count = max(0, stats.get("total", 0))
+        status_counts = stats.get("status", {})
+        type_counts = stats.get("type", {})
+        mastered_count = max(0, status_counts.get("MASTERED", 0))
+        
+        current_bucket = datetime.utcnow().strftime(DUE_BUCKET_FORMAT)
+        due_count = sum(
+            count for bucket, count in stats.get("due_histogram", {}).items()
+            if bucket <= current_bucket and count > 0
+        )
+        
+        # Calculate mastery percentage
+        mastery_percentage = 0
+        if total_count > 0:
+            mastery_percentage = (mastered_count / total_count) * 100
+        
+        return MistakeStatistics(
+            total_count=total_count,
+            mastered_count=mastered_count,
+            learning_count=max(0, status_counts.get("LEARNING", 0)),
+            new_count=max(0, status_counts.get("NEW", 0)),
+            type_distribution={
+                "GRAMMAR": max(0, type_counts.get("GRAMMAR", 0)),
+                "VOCABULARY": max(0, type_counts.get("VOCABULARY", 0))
+            },
+            due_for_practice=due_count,
+            mastery_percentage=mastery_percentage
+        )
+    
+    def _apply_stats_delta(self, user_id: str, delta: Dict[str, int]):
+        """
+        Apply counter changes to a user's materialized stats document.
+        
+        Nothing is written if the document does not exist yet; it is built
+        from scratch on the next read. Due histogram changes are also applied
+        to the global daily due load.
+        
+        Args:
+            user_id: ID of the user
+            delta: Increments keyed by field path (e.g. "status.NEW")
+        """
+        delta = {field: value for field, value in delta.items() if value}
+        if not delta:
+            return
+        
+        # The global daily due histogram counts every user, even without a stats document
+        day_delta: Dict[str, int] = {}
+        for field, value in delta.items():
+            if field.startswith("due_histogram."):
+                day = field[len("due_histogram."):][:10]
+                day_delta[day] = day_delta.get(day, 0) + value
+        due_load_balancer.apply_delta(day_delta)
+        
+        try:
+            db.mistake_stats.update_one(
+                {"_id": ObjectId(user_id)},
+                {"$inc": delta, "$set": {"updated_at": datetime.utcnow()}}
             )
-            
         except Exception as e:
-            logger.error(f"Error getting mistake statistics: {str(e)}")
-            return MistakeStatistics()
+            logger.error(f"Error updating mistake stats for user {user_id}: {str(e)}")
+    
+    def _mistake_stats_delta(self, mistake: Dict[str, Any], sign: int, delta: Dict[str, int]):
+        """
+        Add (sign=1) or remove (sign=-1) a mistake's contribution to a stats delta.
+        
+        Args:
+            mistake: Mistake fields (status and next_practice_date are used)
+            sign: 1 to count the mistake, -1 to uncount it
+            delta: Delta dictionary updated in place
+        """
+        status = mistake.get("status", "NEW")
+        delta[f"status.{status}"] = delta.get(f"status.{status}", 0) + sign
+        next_practice_date = mistake.get("next_practice_date")
+        if status != "MASTERED" and isinstance(next_practice_date, datetime):
+            bucket = f"due_histogram.{next_practice_date.strftime(DUE_BUCKET_FORMAT)}"
+            delta[bucket] = delta.get(bucket, 0) + sign
     
     def update_after_practice(
         self,
@@ -276,6 +765,10 @@ class MistakeService:
         
         This method matches the class diagram's updateAfterPractice method.
         
+        The new counters, mastery level, status and next practice date are
+        computed server-side by a pipeline update in one find_one_and_update,
+        so concurrent answers for the same mistake cannot overwrite each other.
+        
         Args:
             mistake_id: ID of the mistake
             result: Practice result data including user_id, was_successful, and user_answer
@@ -288,64 +781,20 @@ class MistakeService:
             was_successful = result.get("was_successful", False)
             user_answer = result.get("user_answer", "")
             
-            # Look up mistake
-            mistake = db.mistakes.find_one({
-                "_id": ObjectId(mistake_id),
-                "user_id": ObjectId(user_id)
-            })
-            
-            if not mistake:
-                return {"error": "Mistake not found"}
-            
-            # Update practice metrics
-            practice_count = mistake.get("practice_count", 0) + 1
-            success_count = mistake.get("success_count", 0)
-            
-            if was_successful:
-                success_count += 1
-            
-            # Calculate mastery level (0-100)
-            if practice_count > 0:
-                mastery_percentage = (success_count / practice_count) * 100
-            else:
-                mastery_percentage = 0
-            
-            # Determine status
-            status = mistake.get("status", "NEW")
-            is_learned = mistake.get("is_learned", False)
-            
-            if mastery_percentage >= 80 and practice_count >= 3:
-                status = "MASTERED"
-                is_learned = True
-            elif mastery_percentage >= 50:
-                status = "LEARNING"
-                is_learned = True
-                
-            # Calculate next practice date
-            next_practice_date = self._calculate_next_practice(practice_count, was_successful)
+            now = datetime.utcnow()
+            offsets = due_load_balancer.offset_table(self._user_daily_load(user_id), now)
             
-            # Update in database
-            db.mistakes.update_one(
-                {"_id": ObjectId(mistake_id)},
-                {
-                    "$set": {
-                        "practice_count": practice_count,
-                        "success_count": success_count,
-                        "last_practiced": datetime.utcnow(),
-                        "next_practice_date": next_practice_date,
-                        "mastery_level": mastery_percentage,
-                        "status": status,
-                        "is_learned": is_learned,
-                        "last_answer": user_answer
-                    }
-                }
+            updated_mistake = db.mistakes.find_one_and_update(
+                {"_id": ObjectId(mistake_id), "user_id": ObjectId(user_id)},
+                self._practice_update_pipeline(was_successful, user_answer, now, offsets),
+                return_document=ReturnDocument.AFTER
             )
             
-            # Get updated mistake
-            updated_mistake = db.mistakes.find_one({"_id": ObjectId(mistake_id)})
-            
             if not updated_mistake:
-                raise ValueError(f"Updated mistake not found: {mistake_id}")
+                return {"error": "Mistake not found"}
+            
+            self._apply_stats_delta(user_id, self._practice_stats_delta(updated_mistake))
+            self._update_due_queue(user_id, [updated_mistake], replace=True)
             
             # Convert ObjectId to string
             updated_mistake["_id"] = str(updated_mistake["_id"])
@@ -360,6 +809,191 @@ class MistakeService:
             logger.error(f"Error updating after practice: {str(e)}")
             raise
     
+    def record_practice_results(
+        self,
+        user_id: str,
+        results: List[Dict[str, Any]],
+        session_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Record the results of a whole practice session.
+        
+        All updates are sent in one bulk_write of pipeline updates; the
+        updated mistakes are then read back with one query to build the
+        response and the statistics deltas.
+        
+        Args:
+            user_id: ID of the user
+            results: Practice results, each with mistake_id, was_successful and user_answer
+            session_id: Optional practice session to attach the results to
+            
+        Returns:
+            One entry per result with the updated mistake, or an error for unknown mistakes
+        """
+        if not results:
+            return []
+        
+        now = datetime.utcnow()
+        user_load = self._user_daily_load(user_id)
+        # One offset table per result, so results with the same interval can land on different days
+        operations = [
+            UpdateOne(
+                {"_id": ObjectId(item["mistake_id"]), "user_id": ObjectId(user_id)},
+                self._practice_update_pipeline(
+                    item.get("was_successful", False),
+                    item.get("user_answer", ""),
+                    now,
+                    due_load_balancer.offset_table(user_load, now)
+                )
+            )
+            for item in results
+        ]
+        db.mistakes.bulk_write(operations, ordered=True)
+        
+        mistake_ids = list({ObjectId(item["mistake_id"]) for item in results})
+        updated = {
+            str(mistake["_id"]): mistake
+            for mistake in db.mistakes.find({"_id": {"$in": mistake_ids}, "user_id": ObjectId(user_id)})
+        }
+        
+        stats_delta: Dict[str, int] = {}
+        for mistake in updated.values():
+            for field, value in self._practice_stats_delta(mistake).items():
+                stats_delta[field] = stats_delta.get(field, 0) + value
+        self._apply_stats_delta(user_id, stats_delta)
+        self._update_due_queue(user_id, list(updated.values()), replace=True)
+        
+        responses = []
+        for item in results:
+            mistake = updated.get(item["mistake_id"])
+            if not mistake:
+                responses.append({"mistake_id": item["mistake_id"], "error": "Mistake not found"})
+                continue
+            responses.append({
+                "mistake_id": item["mistake_id"],
+                "mastery_level": mistake.get("mastery_level", 0),
+                "next_practice_date": mistake.get("next_practice_date"),
+                "status": mistake.get("status", "NEW"),
+                "feedback": self._generate_practice_feedback(mistake, item.get("was_successful", False))
+            })
+        
+        if session_id:
+            db.practice_sessions.update_one(
+                {"_id": ObjectId(session_id), "user_id": ObjectId(user_id)},
+                {
+                    "$push": {"mistakes_practiced": {"$each": [
+                        {
+                            "mistake_id": item["mistake_id"],
+                            "user_answer": item.get("user_answer", ""),
+                            "was_successful": item.get("was_successful", False),
+                            "timestamp": now
+                        }
+                        for item in results
+                    ]}},
+                    "$set": {"completed_at": now}
+                }
+            )
+        
+        return responses
+    
+    def _practice_update_pipeline(
+        self,
+        was_successful: bool,
+        user_answer: str,
+        now: Optional[datetime] = None,
+        offsets: Optional[List[int]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Build the pipeline update that records one practice attempt.
+        
+        Mirrors the rules of the original read-modify-write: mastery is the
+        success percentage; 80%+ after 3 attempts is MASTERED, 50%+ is
+        LEARNING, otherwise the status is kept. The scheduler state `srs`
+        and the next practice date come from the active scheduler (see
+        app.utils.schedulers), with the interval shifted by the load
+        smoothing offset table if given. The previous status and next
+        practice date are kept for the statistics deltas.
+        
+        Args:
+            was_successful: Whether the practice was successful
+            user_answer: User's answer during practice
+            now: Time of the attempt (defaults to now)
+            offsets: Day shift per whole-day interval (see DueLoadBalancer.offset_table)
+            
+        Returns:
+            Aggregation pipeline for update_one / find_one_and_update
+        """
+        now = now or datetime.utcnow()
+        return [
+            # Evaluated before the counters and last_practiced change
+            {"$set": {"srs": get_scheduler().review_expression(was_successful, now)}},
+            {"$set": {
+                "previous_status": "$status",
+                "previous_next_practice_date": "$next_practice_date",
+                "practice_count": {"$add": [{"$ifNull": ["$practice_count", 0]}, 1]},
+                "success_count": {"$add": [{"$ifNull": ["$success_count", 0]}, 1 if was_successful else 0]},
+                "last_practiced": now,
+                "last_answer": {"$literal": user_answer}
+            }},
+            {"$set": {
+                "mastery_level": {"$multiply": [{"$divide": ["$success_count", "$practice_count"]}, 100]}
+            }},
+            {"$set": {
+                "status": {"$switch": {
+                    "branches": [
+                        {
+                            "case": {"$and": [{"$gte": ["$mastery_level", 80]}, {"$gte": ["$practice_count", 3]}]},
+                            "then": "MASTERED"
+                        },
+                        {"case": {"$gte": ["$mastery_level", 50]}, "then": "LEARNING"}
+                    ],
+                    "default": {"$ifNull": ["$status", "NEW"]}
+                }},
+                "is_learned": {"$or": [{"$gte": ["$mastery_level", 50]}, {"$ifNull": ["$is_learned", False]}]},
+                "next_practice_date": {"$add": [now, interval_expression(offsets=offsets)]}
+            }},
+            # Release the fingerprint so a recurrence starts a new drill item
+            {"$set": {
+                "fingerprint": {"$cond": [{"$eq": ["$status", "MASTERED"]}, "$$REMOVE", "$fingerprint"]}
+            }}
+        ]
+    
+    def _user_daily_load(self, user_id: str) -> Dict[str, int]:
+        """
+        Get a user's due mistakes per day from their materialized stats.
+        
+        Args:
+            user_id: ID of the user
+            
+        Returns:
+            Due counts keyed by day ("%Y-%m-%d"), empty if there are no stats yet
+        """
+        try:
+            stats = db.mistake_stats.find_one({"_id": ObjectId(user_id)}, {"due_histogram": 1})
+        except Exception as e:
+            logger.error(f"Error reading due load for user {user_id}: {str(e)}")
+            stats = None
+        return daily_load(stats.get("due_histogram", {})) if stats else {}
+    
+    def _practice_stats_delta(self, mistake: Dict[str, Any]) -> Dict[str, int]:
+        """
+        Get the stats delta of a practice update from the mistake's previous and new values.
+        
+        Args:
+            mistake: Updated mistake document, including previous_status and previous_next_practice_date
+            
+        Returns:
+            Delta for _apply_stats_delta
+        """
+        delta: Dict[str, int] = {}
+        self._mistake_stats_delta(
+            {"status": mistake.get("previous_status", "NEW"), "next_practice_date": mistake.get("previous_next_practice_date")},
+            -1,
+            delta
+        )
+        self._mistake_stats_delta(mistake, 1, delta)
+        return delta
+    
     def create_practice_session(
         self, 
         user_id: str, 
@@ -463,9 +1097,9 @@ class MistakeService:
         """
         now = datetime.utcnow()
         
-        # New mistake - practice soon
+        # New mistake - practice soon, spread over MISTAKE_NEW_FUZZ_MINUTES
         if practice_count == 0:
-            return now + timedelta(hours=2)
+            return now + timedelta(hours=2, minutes=random.uniform(0, MISTAKE_NEW_FUZZ_MINUTES))
         
         # Failed practice - retry soon
         if not was_successful:
@@ -478,61 +1112,303 @@ class MistakeService:
     # Alias for backward compatibility
     _calculate_next_practice = _calculate_next_practice_date
     
-    def _store_unique_mistakes(self, user_id: str, mistakes: List[Dict[str, Any]]) -> List[str]:
+    def update_next_practice_dates(self, user_id: str) -> int:
+        """
+        Recompute the scheduler state and next practice date of a user's mistakes.
+        
+        Used after switching schedulers: the mistakes are streamed once and
+        updated with bulk writes of MISTAKE_RESCHEDULE_BATCH_SIZE. A mistake
+        already scheduled by the active scheduler keeps its state; others get
+        a state rebuilt from their practice counters. Mistakes that were
+        never practiced keep their date. An update is skipped if the mistake
+        was practiced meanwhile. The stats and due queue are rebuilt after.
+        
+        Args:
+            user_id: ID of the user
+            
+        Returns:
+            Number of mistakes updated
+        """
+        scheduler = get_scheduler()
+        cursor = db.mistakes.find(
+            {"user_id": ObjectId(user_id), "practice_count": {"$gt": 0}},
+            {"practice_count": 1, "success_count": 1, "last_practiced": 1, "srs": 1}
+        ).batch_size(MISTAKE_RESCHEDULE_BATCH_SIZE)
+        
+        updated = 0
+        operations = []
+        for mistake in cursor:
+            state = mistake.get("srs")
+            if not isinstance(state, dict) or state.get("a") != scheduler.name:
+                state = scheduler.replay(mistake["practice_count"], mistake.get("success_count", 0))
+            last_practiced = mistake.get("last_practiced") or datetime.utcnow()
+            
+            operations.append(UpdateOne(
+                {"_id": mistake["_id"], "practice_count": mistake["practice_count"]},
+                {"$set": {
+                    "srs": state,
+                    "next_practice_date": last_practiced + timedelta(days=interval_days(state))
+                }}
+            ))
+            if len(operations) >= MISTAKE_RESCHEDULE_BATCH_SIZE:
+                updated += db.mistakes.bulk_write(operations, ordered=False).modified_count
+                operations = []
+        
+        if operations:
+            updated += db.mistakes.bulk_write(operations, ordered=False).modified_count
+        
+        if updated:
+            self.reconcile_mistake_stats(user_id)
+            self.rebuild_due_queue(user_id)
+        return updated
+    
+    def reschedule_all_mistakes(self) -> int:
+        """
+        Run update_next_practice_dates for every user with practiced mistakes.
+        
+        Returns:
+            Number of mistakes updated
+        """
+        updated = 0
+        users = db.mistakes.aggregate(
+            [{"$match": {"practice_count": {"$gt": 0}}}, {"$group": {"_id": "$user_id"}}],
+            allowDiskUse=True
+        )
+        for user in users:
+            try:
+                updated += self.update_next_practice_dates(str(user["_id"]))
+            except Exception as e:
+                logger.error(f"Error rescheduling mistakes for user {user['_id']}: {str(e)}")
+        return updated
+    
+    def ensure_indexes(self):
+        """
+        Create the unique fingerprint index and the drill indexes.
+        
+        Mistakes that are not mastered are unique per (user_id, type,
+        fingerprint). Mastered mistakes have no fingerprint, so the same
+        mistake made again starts a new drill item. Mistakes stored before
+        fingerprints existed are outside the partial indexes until they are
+        migrated with `python -m app.commands.migrate_mistake_fingerprints`;
+        that migration is not run here, so requests never wait for it.
+        
+        Also indexes the LSH band keys used to find near-duplicates, and
+        the drill mistakes by next practice date for rebuilding due queues
+        and ranking review sessions.
+        """
+        if MistakeService._indexes_ready:
+            return
+        
+        with MistakeService._indexes_lock:
+            if MistakeService._indexes_ready:
+                return
+            
+            db.mistakes.create_index(
+                [("user_id", ASCENDING), ("type", ASCENDING), ("fingerprint", ASCENDING)],
+                unique=True,
+                partialFilterExpression={"fingerprint": {"$exists": True}}
+            )
+            db.mistakes.create_index(
+                [("user_id", ASCENDING), ("lsh_bands", ASCENDING)],
+                partialFilterExpression={"fingerprint": {"$exists": True}}
+            )
+            db.mistakes.create_index(
+                [("user_id", ASCENDING), ("in_drill_queue", ASCENDING), ("next_practice_date", ASCENDING)]
+            )
+            
+            MistakeService._indexes_ready = True
+    
+    def _store_unique_mistakes(self, user_id: str, mistakes: List[Dict[str, Any]]) -> int:
         """
         Store mistakes while handling duplicates.
         
         This method matches the class diagram's storeUniqueMistakes method.
+        Every mistake is an upsert on (user_id, type, fingerprint): new
+        mistakes are inserted with $setOnInsert, existing ones get their
+        frequency incremented. All upserts go in one bulk write, and the
+        unique index keeps concurrent workers from creating duplicates.
+        
+        Near-duplicates (e.g. "I go to school yesterday" and "i go to the
+        school yesterday") are merged into the existing mistake, found through
+        its LSH band keys with one indexed query.
         
         Args:
             user_id: ID of the user
             mistakes: List of mistakes to store
             
         Returns:
-            List of stored mistake IDs
+            Number of mistakes stored (inserted or merged into an existing one)
         """
-        stored_ids = []
+        self.ensure_indexes()
         
+        # Skip empty mistakes and merge repeats within the batch
+        unique: Dict[tuple, Dict[str, Any]] = {}
+        occurrences: Dict[tuple, int] = {}
         for mistake in mistakes:
-            # Skip empty mistakes
             if not mistake.get("original_text") or not mistake.get("correction"):
                 continue
-                
-            # Check for existing similar mistake
-            existing = None
-            try:
-                existing = db.mistakes.find_one({
+            key = (mistake["type"], mistake_fingerprint(mistake["original_text"]))
+            if key not in unique:
+                unique[key] = mistake
+            occurrences[key] = occurrences.get(key, 0) + 1
+        
+        if not unique:
+            return 0
+        
+        # Fold near-duplicates into existing mistakes or earlier ones in the batch
+        redirects, bands = self._find_near_duplicates(user_id, unique)
+        merged_into_existing = {}
+        for key, target in redirects.items():
+            unique.pop(key)
+            if target in unique:
+                occurrences[target] += occurrences.pop(key)
+            else:
+                merged_into_existing[target] = merged_into_existing.get(target, 0) + occurrences.pop(key)
+        
+        now = datetime.utcnow()
+        keys = list(unique)
+        operations = []
+        for key in keys:
+            mistake_type, fingerprint = key
+            new_fields = {
+                field: value for field, value in unique[key].items()
+                if field not in ("_id", "user_id", "type", "frequency", "last_occurred")
+            }
+            new_fields["lsh_bands"] = bands[key]
+            operations.append(UpdateOne(
+                {"user_id": ObjectId(user_id), "type": mistake_type, "fingerprint": fingerprint},
+                {
+                    "$setOnInsert": new_fields,
+                    "$inc": {"frequency": occurrences[key]},
+                    "$set": {"last_occurred": now}
+                },
+                upsert=True
+            ))
+        for (mistake_type, fingerprint), count in merged_into_existing.items():
+            operations.append(UpdateOne(
+                {"user_id": ObjectId(user_id), "type": mistake_type, "fingerprint": fingerprint},
+                {"$inc": {"frequency": count}, "$set": {"last_occurred": now}}
+            ))
+        
+        upserted, failed = self._bulk_upsert(operations)
+        
+        # Count the inserted mistakes in the materialized stats and due queue
+        stats_delta: Dict[str, int] = {}
+        inserted = []
+        for index, mistake_id in upserted.items():
+            mistake = unique[keys[index]]
+            stats_delta["total"] = stats_delta.get("total", 0) + 1
+            stats_delta[f"type.{mistake['type']}"] = stats_delta.get(f"type.{mistake['type']}", 0) + 1
+            self._mistake_stats_delta(mistake, 1, stats_delta)
+            inserted.append({**mistake, "_id": mistake_id})
+        self._apply_stats_delta(user_id, stats_delta)
+        self._update_due_queue(user_id, inserted)
+        
+        return len(operations) - len(failed)
+    
+    def _find_near_duplicates(self, user_id: str, unique: Dict[tuple, Dict[str, Any]]) -> tuple:
+        """
+        Find mistakes in a batch that are near-duplicates of another mistake.
+        
+        Candidates are the user's active mistakes sharing at least one LSH
+        band key with the batch, loaded with one query on the multikey
+        index; a candidate of the same type is a match if the exact Jaccard
+        similarity of the texts reaches MISTAKE_SIMILARITY_THRESHOLD.
+        
+        Args:
+            user_id: ID of the user
+            unique: Batch mistakes keyed by (type, fingerprint)
+            
+        Returns:
+            Tuple of ({batch key: key of the mistake to merge it into},
+            {batch key: its LSH band keys})
+        """
+        bands = {key: lsh_bands(mistake["original_text"]) for key, mistake in unique.items()}
+        all_bands = sorted({band for key_bands in bands.values() for band in key_bands})
+        
+        try:
+            candidates = list(db.mistakes.find(
+                {
                     "user_id": ObjectId(user_id),
-                    "type": mistake["type"],
-                    "original_text": mistake["original_text"],
-                    "status": {"$ne": "MASTERED"}
-                })
-            except Exception as e:
-                logger.error(f"Error finding existing mistake: {str(e)}")
+                    "fingerprint": {"$exists": True},
+                    "lsh_bands": {"$in": all_bands}
+                },
+                {"type": 1, "fingerprint": 1, "original_text": 1, "lsh_bands": 1}
+            ).limit(MISTAKE_SIMILARITY_MAX_CANDIDATES))
+        except Exception as e:
+            logger.error(f"Error finding similar mistakes: {str(e)}")
+            candidates = []
+        
+        pool = [
+            ((doc["type"], doc["fingerprint"]), doc.get("original_text", ""), set(doc.get("lsh_bands", [])))
+            for doc in candidates
+        ]
+        existing_keys = {entry[0] for entry in pool}
+        
+        redirects = {}
+        for key, mistake in unique.items():
+            if key in existing_keys:
+                # Exact match: the upsert increments it
                 continue
             
-            if existing:
-                # Update existing mistake (increase frequency)
-                try:
-                    db.mistakes.update_one(
-                        {"_id": existing["_id"]},
-                        {
-                            "$inc": {"frequency": 1},
-                            "$set": {"last_occurred": datetime.utcnow()}
-                        }
-                    )
-                    stored_ids.append(str(existing["_id"]))
-                except Exception as e:
-                    logger.error(f"Error updating existing mistake: {str(e)}")
+            key_bands = set(bands[key])
+            best_key, best_similarity = None, MISTAKE_SIMILARITY_THRESHOLD
+            for other_key, other_text, other_bands in pool:
+                if other_key[0] != key[0] or not key_bands & other_bands:
+                    continue
+                similarity = jaccard_similarity(mistake["original_text"], other_text)
+                if similarity >= best_similarity:
+                    best_key, best_similarity = other_key, similarity
+            
+            if best_key:
+                redirects[key] = best_key
             else:
-                # Insert new mistake
-                try:
-                    result = db.mistakes.insert_one(mistake)
-                    stored_ids.append(str(result.inserted_id))
-                except Exception as e:
-                    logger.error(f"Error inserting new mistake: {str(e)}")
+                pool.append((key, mistake["original_text"], key_bands))
+        
+        return redirects, bands
+    
+    def _bulk_upsert(self, operations: List[UpdateOne]) -> tuple:
+        """
+        Run upserts in one unordered bulk write.
         
-        return stored_ids
+        Two workers upserting the same new mistake at once can make one of
+        them fail with a duplicate key error; those upserts are retried once,
+        and then match the document the other worker inserted.
+        
+        Args:
+            operations: Upsert operations
+            
+        Returns:
+            Tuple of ({index of an operation that inserted a document: its _id}, indexes that failed)
+        """
+        upserted, failed = {}, set()
+        pending = list(range(len(operations)))
+        
+        for attempt in range(2):
+            if not pending:
+                break
+            try:
+                result = db.mistakes.bulk_write([operations[i] for i in pending], ordered=False)
+                upserted.update((pending[i], mistake_id) for i, mistake_id in result.upserted_ids.items())
+                pending = []
+            except BulkWriteError as e:
+                details = e.details or {}
+                upserted.update((pending[item["index"]], item["_id"]) for item in details.get("upserted", []))
+                retry = []
+                for error in details.get("writeErrors", []):
+                    if error.get("code") == DUPLICATE_KEY_ERROR and attempt == 0:
+                        retry.append(pending[error["index"]])
+                    else:
+                        failed.add(pending[error["index"]])
+                pending = retry
+            except Exception as e:
+                logger.error(f"Error storing mistakes: {str(e)}")
+                failed.update(pending)
+                pending = []
+        
+        if failed:
+            logger.error(f"Failed to store {len(failed)} of {len(operations)} mistakes")
+        return upserted, failed
     
     def _transform_to_practice_item(self, mistake: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -549,7 +1425,9 @@ class MistakeService:
         mistake_copy["_id"] = str(mistake_copy["_id"]) 
         mistake_copy["user_id"] = str(mistake_copy["user_id"])
         
-        # Add practice prompt
+        # Add practice prompt, from the pre-generated exercise for this practice if there is one
+        mistake_copy.pop("exercises", None)
+        mistake_copy["exercise"] = select_exercise(mistake)
         mistake_copy["practice_prompt"] = self._generate_practice_prompt(mistake)
         
         return mistake_copy
@@ -558,12 +1436,19 @@ class MistakeService:
         """
         Generate a prompt for practicing this mistake.
         
+        Pre-generated exercises are rotated by practice count; mistakes
+        without them fall back to a fixed template.
+        
         Args:
             mistake: Mistake data
             
         Returns:
             Practice prompt string
         """
+        exercise = select_exercise(mistake)
+        if exercise:
+            return exercise["prompt"]
+        
         if mistake["type"] == "GRAMMAR":
             return f"Correct the grammar in this sentence: \"{mistake['context']}\""
         
@@ -0,0 +1,108 @@
+import hashlib
+import os
+import re
+import unicodedata
+from typing import List, Set
+
+# Character shingle length used for similarity
+MISTAKE_SHINGLE_SIZE = int(os.getenv("MISTAKE_SHINGLE_SIZE", "3"))
+# MinHash signature layout: MISTAKE_LSH_BANDS bands of MISTAKE_LSH_ROWS values each.
+# With 8 x 4, pairs with Jaccard similarity 0.8 share a band ~98% of the time, pairs at 0.3 ~6%.
+MISTAKE_LSH_BANDS = int(os.getenv("MISTAKE_LSH_BANDS", "8"))
+MISTAKE_LSH_ROWS = int(os.getenv("MISTAKE_LSH_ROWS", "4"))
+# Candidates at or above this Jaccard similarity are merged
+MISTAKE_SIMILARITY_THRESHOLD = float(os.getenv("MISTAKE_SIMILARITY_THRESHOLD", "0.8"))
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s']")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Universal hash family h(x) = (a * x + b) mod p, with fixed parameters so
+# signatures stored in the database stay comparable across processes
+_MERSENNE_PRIME = (1 << 61) - 1
+_HASH_PARAMS = [
+    (
+        int.from_bytes(hashlib.sha1(f"a{i}".encode()).digest()[:8], "big") % (_MERSENNE_PRIME - 1) + 1,
+        int.from_bytes(hashlib.sha1(f"b{i}".encode()).digest()[:8], "big") % _MERSENNE_PRIME
+    )
+    for i in range(MISTAKE_LSH_BANDS * MISTAKE_LSH_ROWS)
+]
+
+
+def normalize_mistake_text(text: str) -> str:
+    """
+    Normalize mistake text for duplicate detection.
+
+    Lowercases, strips punctuation and collapses whitespace, so
+    "I goes home." and "i goes home" are the same mistake.
+
+    Args:
+        text: Original mistake text
+
+    Returns:
+        Normalized text
+    """
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    text = _PUNCTUATION_RE.sub(" ", text)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def shingles(text: str) -> Set[str]:
+    """
+    Get the character shingles of a mistake text.
+
+    Args:
+        text: Original mistake text
+
+    Returns:
+        Set of MISTAKE_SHINGLE_SIZE-character substrings of the padded, normalized text
+    """
+    padded = f" {normalize_mistake_text(text)} "
+    if len(padded) <= MISTAKE_SHINGLE_SIZE:
+        return {padded}
+    return {padded[i:i + MISTAKE_SHINGLE_SIZE] for i in range(len(padded) - MISTAKE_SHINGLE_SIZE + 1)}
+
+
+def jaccard_similarity(first: str, second: str) -> float:
+    """
+    Exact Jaccard similarity of two mistake texts' shingle sets.
+
+    Args:
+        first: Mistake text
+        second: Mistake text
+
+    Returns:
+        Similarity between 0 and 1
+    """
+    a, b = shingles(first), shingles(second)
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def lsh_bands(text: str) -> List[str]:
+    """
+    Get the locality-sensitive hash band keys of a mistake text.
+
+    The MinHash signature is split into MISTAKE_LSH_BANDS bands, and each band
+    is hashed into a short key prefixed with its band number. Two texts are
+    near-duplicate candidates if they share any key, which a multikey index
+    on the stored keys finds without scanning the user's mistakes.
+
+    Args:
+        text: Original mistake text
+
+    Returns:
+        One key per band
+    """
+    values = [
+        int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for shingle in shingles(text)
+    ]
+    signature = [min((a * value + b) % _MERSENNE_PRIME for value in values) for a, b in _HASH_PARAMS]
+
+    keys = []
+    for band in range(MISTAKE_LSH_BANDS):
+        rows = signature[band * MISTAKE_LSH_ROWS:(band + 1) * MISTAKE_LSH_ROWS]
+        digest = hashlib.blake2b(",".join(map(str, rows)).encode("utf-8"), digest_size=6).hexdigest()
+        keys.append(f"{band}:{digest}")
+    return keys
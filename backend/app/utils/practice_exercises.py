@@ -0,0 +1,156 @@
+"""
+Pre-generated practice exercises for mistakes.
+
+Exercises are generated offline in batches (see
+app.commands.generate_practice_exercises) and stored on the mistake as
+`exercises`, so serving a practice item stays a database read. At practice
+time the exercises are rotated by the mistake's practice count, so each
+review shows a different drill.
+
+This module only holds the exercise format, the batch prompt and the
+response validation; it does not call Gemini itself.
+"""
+
+import os
+from typing import Any, Dict, List, Optional
+
+# Exercise types, in the order they are rotated
+FILL_IN_THE_BLANK = "FILL_IN_THE_BLANK"
+REWRITE = "REWRITE"
+CHOOSE_CORRECT = "CHOOSE_CORRECT"
+EXERCISE_TYPES = [FILL_IN_THE_BLANK, REWRITE, CHOOSE_CORRECT]
+
+# Exercises kept per mistake
+MISTAKE_EXERCISES_PER_MISTAKE = int(os.getenv("MISTAKE_EXERCISES_PER_MISTAKE", "3"))
+# Blank marker in fill-in-the-blank prompts
+BLANK = "____"
+
+_EXERCISE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "type": {"type": "STRING", "enum": EXERCISE_TYPES},
+        "prompt": {"type": "STRING"},
+        "options": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "answer": {"type": "STRING"}
+    },
+    "required": ["type", "prompt", "answer"]
+}
+
+# Gemini response schema for a batch: the exercises keyed by mistake id
+BATCH_EXERCISES_RESPONSE_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "mistake_id": {"type": "STRING"},
+            "exercises": {"type": "ARRAY", "items": _EXERCISE_SCHEMA}
+        },
+        "required": ["mistake_id", "exercises"]
+    }
+}
+
+EXERCISE_INSTRUCTIONS = f"""
+You are writing short practice drills for an English learner, based on mistakes they made while speaking.
+For every mistake below, write exactly one exercise of each of these types:
+- {FILL_IN_THE_BLANK}: a new sentence (not the learner's own) with the corrected form replaced by "{BLANK}". The answer is the words that fill the blank.
+- {REWRITE}: a new sentence containing the same mistake, asking the learner to rewrite it correctly. The answer is the corrected sentence.
+- {CHOOSE_CORRECT}: a question with 3 or 4 options, exactly one of them correct. The answer is the correct option, copied exactly.
+Use simple, natural sentences that fit the situation of the mistake when one is given.
+Write the prompt as an instruction to the learner, and do not reveal the answer in it.
+"""
+
+
+def build_exercises_prompt(mistakes: List[Dict[str, Any]]) -> str:
+    """
+    Build one prompt asking for exercises for several mistakes.
+
+    Args:
+        mistakes: Mistake documents (type, original_text, correction, explanation, context)
+
+    Returns:
+        Formatted prompt string for Gemini
+    """
+    prompt = f"""
+    {EXERCISE_INSTRUCTIONS}
+    Write exercises for each of the following {len(mistakes)} mistakes. Do not mix them up.
+    """
+
+    for mistake in mistakes:
+        situation = mistake.get("situation_context") or {}
+        prompt += f"""
+    ===== Mistake ID: {mistake["_id"]} =====
+    Type: {mistake.get("type", "")}
+    Mistake: {mistake.get("original_text", "")}
+    Correction: {mistake.get("correction", "")}
+    Explanation: {mistake.get("explanation", "")}
+    Learner's sentence: {mistake.get("context") or ""}
+    """
+        if situation.get("situation"):
+            prompt += f"""Situation: {situation["situation"]}
+    """
+
+    prompt += """
+    Return only a JSON array with one object per mistake, in this format:
+    [
+        {"mistake_id": "<mistake id>", "exercises": [{"type": "<exercise type>", "prompt": "<instruction>", "options": ["<option>", ...], "answer": "<answer>"}]}
+    ]
+    """
+    return prompt
+
+
+def parse_exercises(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Validate the exercises Gemini returned for one mistake.
+
+    Invalid exercises are dropped: unknown types, empty prompts or answers,
+    fill-in-the-blank prompts without a blank, and choices without the
+    answer among at least two options. At most one exercise per type is
+    kept, ordered by EXERCISE_TYPES.
+
+    Args:
+        entries: Parsed exercise objects
+
+    Returns:
+        Valid exercises with type, prompt, answer and (for choices) options
+    """
+    exercises: Dict[str, Dict[str, Any]] = {}
+    for entry in entries or []:
+        if not isinstance(entry, dict):
+            continue
+        exercise_type = entry.get("type")
+        prompt = str(entry.get("prompt") or "").strip()
+        answer = str(entry.get("answer") or "").strip()
+        if exercise_type not in EXERCISE_TYPES or exercise_type in exercises or not prompt or not answer:
+            continue
+
+        exercise = {"type": exercise_type, "prompt": prompt, "answer": answer}
+        if exercise_type == FILL_IN_THE_BLANK and BLANK not in prompt:
+            continue
+        if exercise_type == CHOOSE_CORRECT:
+            options = list(dict.fromkeys(str(option).strip() for option in entry.get("options") or [] if str(option).strip()))
+            if len(options) < 2 or answer not in options:
+                continue
+            exercise["options"] = options
+        exercises[exercise_type] = exercise
+
+    ordered = [exercises[exercise_type] for exercise_type in EXERCISE_TYPES if exercise_type in exercises]
+    return ordered[:MISTAKE_EXERCISES_PER_MISTAKE]
+
+
+def select_exercise(mistake: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Pick the stored exercise for the mistake's next practice.
+
+    Exercises rotate with the practice count, so consecutive reviews of the
+    same mistake show different drills.
+
+    Args:
+        mistake: Mistake document
+
+    Returns:
+        The exercise, or None if none have been generated
+    """
+    exercises = mistake.get("exercises") or []
+    if not exercises:
+        return None
+    return exercises[mistake.get("practice_count", 0) % len(exercises)]
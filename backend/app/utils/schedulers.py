@@ -0,0 +1,406 @@
+"""
+Pluggable schedulers for mistake practice.
+
+A scheduler turns a practice result into the mistake's next interval. Each
+one has a Python form, used for bulk rescheduling and simulations, and an
+aggregation expression form, used by the pipeline update that records a
+practice attempt; the two must give the same result.
+
+Scheduler state is stored on the mistake as a compact subdocument
+`srs: {"a": <scheduler name>, "s": <float>, "d": <float>}`. `s` is the
+stability in days, which is also the next interval (before the
+MAX_INTERVAL_DAYS cap); `d` is the difficulty or ease factor, depending on
+the algorithm.
+"""
+
+import math
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.spaced_repetition import calculate_next_review_time
+
+# Name of the scheduler used for practice updates
+MISTAKE_SCHEDULER = os.getenv("MISTAKE_SCHEDULER", "exponential")
+
+# Longest interval between two practices of a mistake
+MAX_INTERVAL_DAYS = 30
+
+DAY_MILLISECONDS = 24 * 3600 * 1000
+
+
+class Scheduler:
+    """
+    Base class of practice schedulers.
+
+    Subclasses implement `review` and `review_expression`. States passed in
+    are always this scheduler's own; a mistake scheduled by another
+    algorithm starts again from `initial_state`.
+    """
+    name = ""
+
+    def initial_state(self) -> Dict[str, Any]:
+        """State of a mistake that has never been practiced."""
+        return {"a": self.name, "s": 0.0, "d": 0.0}
+
+    def review(
+        self,
+        state: Dict[str, Any],
+        practice_count: int,
+        was_successful: bool,
+        elapsed_days: float
+    ) -> Dict[str, Any]:
+        """
+        Compute the state after one practice.
+
+        Args:
+            state: Current state
+            practice_count: Number of practices before this one
+            was_successful: Whether the practice was successful
+            elapsed_days: Days since the previous practice (0 if none)
+
+        Returns:
+            New state
+        """
+        raise NotImplementedError
+
+    def review_expression(self, was_successful: bool, now: Any) -> Dict[str, Any]:
+        """
+        Aggregation expression equivalent to `review`.
+
+        Evaluated against the mistake before its practice counters and
+        `last_practiced` are updated.
+
+        Args:
+            was_successful: Whether the practice was successful
+            now: Time of the practice
+
+        Returns:
+            Expression producing the new state
+        """
+        raise NotImplementedError
+
+    def review_batch(
+        self,
+        stability: np.ndarray,
+        difficulty: np.ndarray,
+        practice_count: np.ndarray,
+        was_successful: np.ndarray,
+        elapsed_days: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Apply `review` to many states at once, e.g. in simulations.
+
+        This default calls `review` per state; subclasses override it with
+        array operations giving the same results.
+
+        Args:
+            stability: `s` of each state
+            difficulty: `d` of each state
+            practice_count: Number of practices before this one, per state
+            was_successful: Boolean result per state
+            elapsed_days: Days since the previous practice, per state
+
+        Returns:
+            Tuple of (new stability, new difficulty) arrays
+        """
+        new_stability = np.empty(len(stability))
+        new_difficulty = np.empty(len(stability))
+        for i in range(len(stability)):
+            state = self.review(
+                {"a": self.name, "s": float(stability[i]), "d": float(difficulty[i])},
+                int(practice_count[i]),
+                bool(was_successful[i]),
+                float(elapsed_days[i])
+            )
+            new_stability[i] = state["s"]
+            new_difficulty[i] = state["d"]
+        return new_stability, new_difficulty
+
+    def state_of(self, mistake: Dict[str, Any]) -> Dict[str, Any]:
+        """Get a mistake's state, or the initial state if it was scheduled by another algorithm."""
+        state = mistake.get("srs")
+        if isinstance(state, dict) and state.get("a") == self.name:
+            return state
+        return self.initial_state()
+
+    def replay(self, practice_count: int, success_count: int) -> Dict[str, Any]:
+        """
+        Rebuild a state from a mistake's practice counters.
+
+        Only the counts are stored, not the order of the results, so failures
+        are replayed first, each practice happening when it was due.
+
+        Args:
+            practice_count: Number of practices
+            success_count: Number of successful practices
+
+        Returns:
+            Approximate state after those practices
+        """
+        state = self.initial_state()
+        success_count = max(0, min(success_count, practice_count))
+        for count in range(practice_count):
+            was_successful = count >= practice_count - success_count
+            elapsed_days = interval_days(state) if count else 0.0
+            state = self.review(state, count, was_successful, elapsed_days)
+        return state
+
+    def _state_vars(self) -> Dict[str, Any]:
+        """$let variables `s` and `d` for the current state, as in `state_of`."""
+        own_state = {"$eq": ["$srs.a", self.name]}
+        initial = self.initial_state()
+        return {
+            "s": {"$cond": [own_state, "$srs.s", initial["s"]]},
+            "d": {"$cond": [own_state, "$srs.d", initial["d"]]}
+        }
+
+
+class ExponentialScheduler(Scheduler):
+    """
+    The original schedule: 2^n days after the n-th practice if successful
+    (capped at 30), 4 hours after a failure. `d` is unused.
+    """
+    name = "exponential"
+
+    def review(self, state, practice_count, was_successful, elapsed_days):
+        if not was_successful:
+            return {"a": self.name, "s": 4 / 24, "d": 0.0}
+        return {"a": self.name, "s": float(min(2 ** (practice_count + 1), MAX_INTERVAL_DAYS)), "d": 0.0}
+
+    def review_batch(self, stability, difficulty, practice_count, was_successful, elapsed_days):
+        exponent = np.minimum(practice_count + 1, 62)
+        success_stability = np.minimum(2.0 ** exponent, MAX_INTERVAL_DAYS)
+        return np.where(was_successful, success_stability, 4 / 24), np.zeros(len(stability))
+
+    def review_expression(self, was_successful, now):
+        if not was_successful:
+            stability = 4 / 24
+        else:
+            stability = {"$toDouble": {"$min": [
+                {"$pow": [2, {"$add": [{"$ifNull": ["$practice_count", 0]}, 1]}]},
+                MAX_INTERVAL_DAYS
+            ]}}
+        return {"a": self.name, "s": stability, "d": 0.0}
+
+
+class SM2Scheduler(Scheduler):
+    """
+    SuperMemo-2, as in spaced_repetition.calculate_next_review_time, with a
+    success scored as performance 1.0 and a failure as 0.0. `s` is the
+    interval in days, `d` the ease factor.
+    """
+    name = "sm2"
+    initial_ease = 2.5
+
+    def initial_state(self):
+        return {"a": self.name, "s": 0.0, "d": self.initial_ease}
+
+    def review(self, state, practice_count, was_successful, elapsed_days):
+        result = calculate_next_review_time(int(state["s"]), state["d"], 1.0 if was_successful else 0.0)
+        return {"a": self.name, "s": float(result["interval"]), "d": result["ease_factor"]}
+
+    def review_batch(self, stability, difficulty, practice_count, was_successful, elapsed_days):
+        interval = np.floor(stability)
+        ease = np.maximum(1.3, difficulty + 0.1)
+        grown = np.minimum(MAX_INTERVAL_DAYS, np.ceil(interval * ease))
+
+        new_stability = np.select([interval < 1, interval < 2], [1.0, 6.0], grown)
+        new_difficulty = np.where(interval < 2, difficulty, ease)
+        return (
+            np.where(was_successful, new_stability, 1.0),
+            np.where(was_successful, new_difficulty, np.maximum(1.3, difficulty - 0.2))
+        )
+
+    def review_expression(self, was_successful, now):
+        if not was_successful:
+            return {"$let": {
+                "vars": self._state_vars(),
+                "in": {"a": self.name, "s": 1.0, "d": {"$max": [1.3, {"$subtract": ["$$d", 0.2]}]}}
+            }}
+
+        # Performance 5: the ease factor grows by 0.1 from the third interval on
+        return {"$let": {
+            "vars": self._state_vars(),
+            "in": {"$switch": {
+                "branches": [
+                    {"case": {"$lt": ["$$s", 1]}, "then": {"a": self.name, "s": 1.0, "d": "$$d"}},
+                    {"case": {"$lt": ["$$s", 2]}, "then": {"a": self.name, "s": 6.0, "d": "$$d"}}
+                ],
+                "default": {"$let": {
+                    "vars": {"ease": {"$max": [1.3, {"$add": ["$$d", 0.1]}]}},
+                    "in": {
+                        "a": self.name,
+                        "s": {"$toDouble": {"$min": [MAX_INTERVAL_DAYS, {"$ceil": {"$multiply": ["$$s", "$$ease"]}}]}},
+                        "d": "$$ease"
+                    }
+                }}
+            }}
+        }}
+
+
+class FSRSScheduler(Scheduler):
+    """
+    FSRS-4.5 with the default parameters, a failure rated Again and a
+    success rated Good, and 90% desired retention (so the interval equals
+    the stability). `s` is the stability in days, `d` the difficulty (1-10).
+    """
+    name = "fsrs"
+    weights = (
+        0.4872, 1.4003, 3.7145, 13.8206, 5.1618, 1.2298, 0.8975, 0.031, 1.6474,
+        0.1367, 1.0461, 2.1072, 0.0793, 0.3246, 1.587, 0.2272, 2.8755
+    )
+    decay = -0.5
+    factor = 19 / 81
+
+    def _initial_difficulty(self, rating: int) -> float:
+        w = self.weights
+        return min(10.0, max(1.0, w[4] - (rating - 3) * w[5]))
+
+    def review(self, state, practice_count, was_successful, elapsed_days):
+        w = self.weights
+        rating = 3 if was_successful else 1
+
+        if state["s"] <= 0:
+            return {"a": self.name, "s": w[rating - 1], "d": self._initial_difficulty(rating)}
+
+        stability = state["s"]
+        retrievability = (1 + self.factor * max(0.0, elapsed_days) / stability) ** self.decay
+        difficulty = state["d"] - w[6] * (rating - 3)
+        difficulty = w[7] * self._initial_difficulty(3) + (1 - w[7]) * difficulty
+        difficulty = min(10.0, max(1.0, difficulty))
+
+        if was_successful:
+            stability = stability * (
+                1 + math.exp(w[8]) * (11 - difficulty) * stability ** -w[9]
+                * (math.exp(w[10] * (1 - retrievability)) - 1)
+            )
+        else:
+            stability = (
+                w[11] * difficulty ** -w[12] * ((stability + 1) ** w[13] - 1)
+                * math.exp(w[14] * (1 - retrievability))
+            )
+        return {"a": self.name, "s": stability, "d": difficulty}
+
+    def review_batch(self, stability, difficulty, practice_count, was_successful, elapsed_days):
+        w = self.weights
+        rating = np.where(was_successful, 3, 1)
+        first = stability <= 0
+        current = np.where(first, 1.0, stability)
+
+        retrievability = (1 + self.factor * np.maximum(0.0, elapsed_days) / current) ** self.decay
+        new_difficulty = w[7] * self._initial_difficulty(3) + (1 - w[7]) * (difficulty - w[6] * (rating - 3))
+        new_difficulty = np.clip(new_difficulty, 1.0, 10.0)
+
+        recall_stability = current * (
+            1 + math.exp(w[8]) * (11 - new_difficulty) * current ** -w[9]
+            * (np.exp(w[10] * (1 - retrievability)) - 1)
+        )
+        forget_stability = (
+            w[11] * new_difficulty ** -w[12] * ((current + 1) ** w[13] - 1)
+            * np.exp(w[14] * (1 - retrievability))
+        )
+
+        initial_stability = np.where(was_successful, w[2], w[0])
+        initial_difficulty = np.clip(w[4] - (rating - 3) * w[5], 1.0, 10.0)
+        return (
+            np.where(first, initial_stability, np.where(was_successful, recall_stability, forget_stability)),
+            np.where(first, initial_difficulty, new_difficulty)
+        )
+
+    def review_expression(self, was_successful, now):
+        w = self.weights
+        rating = 3 if was_successful else 1
+
+        elapsed_days = {"$max": [0, {"$divide": [
+            {"$subtract": [now, {"$ifNull": ["$last_practiced", now]}]},
+            DAY_MILLISECONDS
+        ]}]}
+        retrievability = {"$pow": [
+            {"$add": [1, {"$divide": [{"$multiply": [self.factor, "$$t"]}, "$$s"]}]},
+            self.decay
+        ]}
+        difficulty = {"$min": [10.0, {"$max": [1.0, {"$add": [
+            w[7] * self._initial_difficulty(3),
+            {"$multiply": [1 - w[7], {"$subtract": ["$$d", w[6] * (rating - 3)]}]}
+        ]}]}]}
+
+        if was_successful:
+            stability = {"$multiply": ["$$s", {"$add": [1, {"$multiply": [
+                math.exp(w[8]),
+                {"$subtract": [11, "$$nd"]},
+                {"$pow": ["$$s", -w[9]]},
+                {"$subtract": [{"$exp": {"$multiply": [w[10], {"$subtract": [1, "$$r"]}]}}, 1]}
+            ]}]}]}
+        else:
+            stability = {"$multiply": [
+                w[11],
+                {"$pow": ["$$nd", -w[12]]},
+                {"$subtract": [{"$pow": [{"$add": ["$$s", 1]}, w[13]]}, 1]},
+                {"$exp": {"$multiply": [w[14], {"$subtract": [1, "$$r"]}]}}
+            ]}
+
+        return {"$let": {
+            "vars": {**self._state_vars(), "t": elapsed_days},
+            "in": {"$cond": [
+                {"$lte": ["$$s", 0]},
+                {"a": self.name, "s": w[rating - 1], "d": self._initial_difficulty(rating)},
+                {"$let": {
+                    "vars": {"r": retrievability, "nd": difficulty},
+                    "in": {"a": self.name, "s": stability, "d": "$$nd"}
+                }}
+            ]}
+        }}
+
+
+SCHEDULERS: Dict[str, Scheduler] = {
+    scheduler.name: scheduler
+    for scheduler in (ExponentialScheduler(), SM2Scheduler(), FSRSScheduler())
+}
+
+
+def get_scheduler(name: Optional[str] = None) -> Scheduler:
+    """
+    Get a scheduler by name.
+
+    Args:
+        name: Scheduler name (defaults to MISTAKE_SCHEDULER)
+
+    Returns:
+        The scheduler
+
+    Raises:
+        ValueError: If the name is unknown
+    """
+    name = name or MISTAKE_SCHEDULER
+    scheduler = SCHEDULERS.get(name)
+    if scheduler is None:
+        raise ValueError(f"Unknown scheduler: {name}")
+    return scheduler
+
+
+def interval_days(state: Dict[str, Any]) -> float:
+    """Days until the next practice for a state."""
+    return min(MAX_INTERVAL_DAYS, max(0.0, state["s"]))
+
+
+def interval_expression(state_field: str = "$srs", offsets: Optional[List[int]] = None) -> Dict[str, Any]:
+    """
+    Aggregation expression equivalent to interval_days, in milliseconds.
+
+    Args:
+        state_field: Field holding the scheduler state
+        offsets: Optional day shift per interval rounded to whole days
+            (0 to MAX_INTERVAL_DAYS), e.g. from load smoothing
+
+    Returns:
+        Expression producing the interval in milliseconds
+    """
+    days = {"$min": [MAX_INTERVAL_DAYS, {"$max": [0, f"{state_field}.s"]}]}
+    if offsets:
+        days = {"$let": {
+            "vars": {"days": days},
+            "in": {"$add": ["$$days", {"$arrayElemAt": [{"$literal": offsets}, {"$toInt": {"$round": ["$$days", 0]}}]}]}
+        }}
+    return {"$round": [{"$multiply": [days, DAY_MILLISECONDS]}, 0]}
@@ -5,11 +5,13 @@ This module implements a modified version of the SuperMemo-2 algorithm
 for spaced repetition learning, adapted for language mistake drilling.
 """
 
-from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional
 import math
 import logging
 
+import numpy as np
+
 # Initialize logger
 logger = logging.getLogger(__name__)
 
@@ -71,73 +73,128 @@ def calculate_next_review_time(
         }
 
 
-def prioritize_mistakes_for_review(mistakes: List[Dict[str, Any]], limit: int = 10) -> List[Dict[str, Any]]:
+def _to_naive_utc(value: Any, default: datetime) -> datetime:
+    """Convert a stored date (datetime or ISO string) to a naive UTC datetime."""
+    if value is None:
+        return default
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _days_before(now: datetime, values: List[Any]) -> np.ndarray:
+    """Whole days from each date to `now`, floored like timedelta.days; missing dates count as `now`."""
+    values = [
+        value if type(value) is datetime and value.tzinfo is None else _to_naive_utc(value, now)
+        for value in values
+    ]
+    return np.fromiter(((now - value).days for value in values), dtype=np.int64, count=len(values))
+
+
+def score_mistakes(mistakes: List[Dict[str, Any]], now: Optional[datetime] = None) -> np.ndarray:
+    """
+    Compute the review priority of every mistake with array operations.
+    
+    The mistake fields are read into NumPy columns in one pass each, with
+    date fields reduced to whole days before a single reference time, and
+    the scores are then computed for all mistakes at once.
+    
+    Args:
+        mistakes: List of mistake dictionaries
+        now: Reference time (defaults to now)
+    
+    Returns:
+        Array of priority scores, -1 for mistakes not in the drill queue
+    """
+    now = now or datetime.utcnow()
+    count = len(mistakes)
+    
+    frequency = np.fromiter((m.get("frequency", 1) for m in mistakes), dtype=np.float64, count=count)
+    severity = np.fromiter((m.get("severity", 3) for m in mistakes), dtype=np.float64, count=count)
+    failed_practices = np.fromiter((m.get("failed_practices", 0) for m in mistakes), dtype=np.float64, count=count)
+    active = np.fromiter((bool(m.get("in_drill_queue", True)) for m in mistakes), dtype=bool, count=count)
+    days_since = _days_before(now, [m.get("last_occurred") for m in mistakes])
+    days_overdue = _days_before(now, [m.get("next_practice_date") for m in mistakes])
+    
+    with np.errstate(divide="ignore"):
+        # More recent mistakes get higher priority, but with diminishing returns
+        recency_factor = 1 / (1 + days_since * 0.1)
+    
+    # Failed practices increase priority
+    failed_factor = np.minimum(1.0, failed_practices * 0.2)
+    
+    # Due date factor - higher priority for overdue items, lower for items not due yet
+    due_factor = np.where(
+        days_overdue > 0,
+        1.0 + np.minimum(1.0, days_overdue * 0.1),
+        np.maximum(0.1, 1.0 + days_overdue * 0.1)
+    )
+    
+    # Combined priority score
+    priority = (
+        np.minimum(5, frequency) * 2.0 +  # 2-10 points for frequency
+        severity * 1.5 +                  # 1.5-7.5 points for severity
+        recency_factor * 5.0 +            # 0-5 points for recency
+        failed_factor * 3.0 +             # 0-3 points for failed practices
+        due_factor * 5.0                  # 0.5-10 points for due date
+    )
+    
+    return np.where(active, priority, -1.0)
+
+
+def _top_k(scores: np.ndarray, limit: int) -> np.ndarray:
+    """
+    Get the indexes of the `limit` highest non-negative scores, highest first.
+    
+    Uses argpartition instead of a full sort. Ties keep their input order,
+    as with a stable sort, including ties at the cut-off.
+    """
+    candidates = np.flatnonzero(scores >= 0)
+    if limit <= 0 or candidates.size == 0:
+        return candidates[:0]
+    
+    if limit < candidates.size:
+        selected = np.argpartition(-scores[candidates], limit - 1)[:limit]
+        threshold = scores[candidates[selected]].min()
+        candidates = candidates[scores[candidates] >= threshold]
+    
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order][:limit]
+
+
+def prioritize_mistakes_for_review(
+    mistakes: List[Dict[str, Any]],
+    limit: int = 10,
+    now: Optional[datetime] = None
+) -> List[Dict[str, Any]]:
     """
     Sort and prioritize mistakes for review based on various factors.
     
+    Scores are computed for all mistakes at once by score_mistakes, and only
+    the top `limit` are sorted. The returned mistakes get a `priority_score`.
+    
     Args:
         mistakes: List of mistake dictionaries
         limit: Maximum number of mistakes to return
+        now: Reference time for the date factors (defaults to now)
     
     Returns:
         Sorted list of mistakes for review, limited to specified count
     """
     try:
-        # Score each mistake based on prioritization factors
-        for mistake in mistakes:
-            # Skip mistakes not in drill queue
-            if not mistake.get("in_drill_queue", True):
-                mistake["priority_score"] = -1
-                continue
-                
-            # Calculate base priority score
-            frequency = min(5, mistake.get("frequency", 1))
-            severity = mistake.get("severity", 3)
-            
-            # Calculate days since last occurrence
-            last_occurred = mistake.get("last_occurred", datetime.utcnow())
-            if isinstance(last_occurred, str):
-                last_occurred = datetime.fromisoformat(last_occurred.replace("Z", "+00:00"))
-            days_since = (datetime.utcnow() - last_occurred).days
-            
-            # More recent mistakes get higher priority, but with diminishing returns
-            recency_factor = 1 / (1 + days_since * 0.1)
-            
-            # Failed practices increase priority
-            failed_practices = mistake.get("failed_practices", 0)
-            failed_factor = min(1.0, failed_practices * 0.2)
-            
-            # Due date factor - higher priority for overdue items
-            next_practice = mistake.get("next_practice_date", datetime.utcnow())
-            if isinstance(next_practice, str):
-                next_practice = datetime.fromisoformat(next_practice.replace("Z", "+00:00"))
-            
-            days_overdue = (datetime.utcnow() - next_practice).days
-            due_factor = 1.0
-            if days_overdue > 0:
-                due_factor = 1.0 + min(1.0, days_overdue * 0.1)
-            elif days_overdue < 0:  # Not due yet
-                due_factor = max(0.1, 1.0 + days_overdue * 0.1)
-            
-            # Combined priority score
-            priority = (
-                frequency * 2.0 +      # 2-10 points for frequency
-                severity * 1.5 +       # 1.5-7.5 points for severity
-                recency_factor * 5.0 + # 0-5 points for recency
-                failed_factor * 3.0 +  # 0-3 points for failed practices
-                due_factor * 5.0       # 0.5-10 points for due date
-            )
-            
-            mistake["priority_score"] = priority
+        if not mistakes:
+            return []
         
-        # Filter out mistakes not in drill queue
-        active_mistakes = [m for m in mistakes if m.get("priority_score", -1) >= 0]
+        scores = score_mistakes(mistakes, now)
         
-        # Sort by priority score (descending)
-        sorted_mistakes = sorted(active_mistakes, key=lambda x: x.get("priority_score", 0), reverse=True)
-        
-        # Limit to specified count
-        return sorted_mistakes[:limit]
+        prioritized = []
+        for index in _top_k(scores, limit):
+            mistake = mistakes[index]
+            mistake["priority_score"] = float(scores[index])
+            prioritized.append(mistake)
+        return prioritized
     
     except Exception as e:
         logger.error(f"Error prioritizing mistakes: {str(e)}")
@@ -145,6 +202,88 @@ def prioritize_mistakes_for_review(mistakes: List[Dict[str, Any]], limit: int =
         return sorted(mistakes, key=lambda x: x.get("frequency", 0), reverse=True)[:limit]
 
 
+def review_priority_pipeline(user_id: Any, limit: int = 10, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """
+    Build an aggregation that ranks a user's mistakes inside the database.
+    
+    Computes the same priority score as score_mistakes with $addFields, then
+    sorts and limits, so only `limit` documents leave the database. Ties are
+    broken by _id. Served by the (user_id, in_drill_queue, next_practice_date)
+    index on db.mistakes.
+    
+    Args:
+        user_id: ObjectId of the user
+        limit: Maximum number of mistakes to return
+        now: Reference time for the date factors (defaults to now)
+    
+    Returns:
+        Pipeline for db.mistakes.aggregate; each result has a `priority_score`
+    """
+    now = now or datetime.utcnow()
+    
+    def days_before_now(field: str) -> Dict[str, Any]:
+        # Floored like timedelta.days; missing dates count as now, ISO strings are parsed
+        date = {"$toDate": {"$ifNull": [f"${field}", now]}}
+        return {"$floor": {"$divide": [{"$subtract": [now, date]}, 24 * 3600 * 1000]}}
+    
+    days_since = "$_review.days_since"
+    days_overdue = "$_review.days_overdue"
+    frequency = {"$min": [5, {"$ifNull": ["$frequency", 1]}]}
+    severity = {"$ifNull": ["$severity", 3]}
+    recency_factor = {"$divide": [1, {"$add": [1, {"$multiply": [days_since, 0.1]}]}]}
+    failed_factor = {"$min": [1.0, {"$multiply": [{"$ifNull": ["$failed_practices", 0]}, 0.2]}]}
+    due_factor = {"$cond": [
+        {"$gt": [days_overdue, 0]},
+        {"$add": [1.0, {"$min": [1.0, {"$multiply": [days_overdue, 0.1]}]}]},
+        {"$max": [0.1, {"$add": [1.0, {"$multiply": [days_overdue, 0.1]}]}]}
+    ]}
+    
+    # Terms are added pairwise in the same order as in Python, so scores match exactly
+    terms = [
+        {"$multiply": [frequency, 2.0]},
+        {"$multiply": [severity, 1.5]},
+        {"$multiply": [recency_factor, 5.0]},
+        {"$multiply": [failed_factor, 3.0]},
+        {"$multiply": [due_factor, 5.0]}
+    ]
+    priority = terms[0]
+    for term in terms[1:]:
+        priority = {"$add": [priority, term]}
+    
+    return [
+        {"$match": {"user_id": user_id, "in_drill_queue": {"$ne": False}}},
+        {"$addFields": {
+            "_review.days_since": days_before_now("last_occurred"),
+            "_review.days_overdue": days_before_now("next_practice_date")
+        }},
+        {"$addFields": {"priority_score": priority}},
+        {"$match": {"priority_score": {"$gte": 0}}},
+        {"$sort": {"priority_score": -1, "_id": 1}},
+        {"$limit": limit},
+        {"$unset": "_review"}
+    ]
+
+
+def build_review_session(user_id: str, mistakes: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Wrap prioritized mistakes in a review session.
+    
+    Args:
+        user_id: User ID
+        mistakes: Mistakes to review, highest priority first
+        
+    Returns:
+        Dictionary with session information and mistakes to review
+    """
+    return {
+        "session_id": f"session_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}",
+        "user_id": user_id,
+        "mistakes": mistakes,
+        "created_at": datetime.utcnow(),
+        "expires_at": datetime.utcnow() + timedelta(hours=24)
+    }
+
+
 def get_review_session(mistakes: List[Dict[str, Any]], user_id: str, session_size: int = 5) -> Dict[str, Any]:
     """
     Create a review session for the given user.
@@ -160,16 +299,7 @@ def get_review_session(mistakes: List[Dict[str, Any]], user_id: str, session_siz
     # Prioritize mistakes for review
     prioritized_mistakes = prioritize_mistakes_for_review(mistakes, limit=session_size)
     
-    # Create session
-    session = {
-        "session_id": f"session_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}",
-        "user_id": user_id,
-        "mistakes": prioritized_mistakes,
-        "created_at": datetime.utcnow(),
-        "expires_at": datetime.utcnow() + timedelta(hours=24)
-    }
-    
-    return session
+    return build_review_session(user_id, prioritized_mistakes)
 
 
 def record_review_result(
@@ -0,0 +1,201 @@
+import logging
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from pymongo import ASCENDING
+
+from app.config.database import db
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in seconds
+TASK_LAG_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600)
+TASK_DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram, in the shape Prometheus expects.
+
+    Attributes:
+        buckets: Upper bounds of the buckets, ascending
+        counts: Observations per bucket (the last slot counts values above every bound)
+        total: Sum of all observed values
+        count: Number of observations
+    """
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        """Record one observation."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Cumulative bucket counts keyed by upper bound, plus sum and count."""
+        cumulative = []
+        running = 0
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            running += count
+            cumulative.append({"le": bound, "count": running})
+        return {"buckets": cumulative, "sum": self.total, "count": self.count}
+
+
+class TaskMetrics:
+    """
+    Metrics for the background task scheduler.
+
+    Lag, duration and outcome counters are recorded in-process by the
+    EventHandler that ran the task. Queue depth and the age of the oldest due
+    task are read from `db.scheduled_tasks` at collection time, so they cover
+    every process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lag: Dict[str, Histogram] = defaultdict(lambda: Histogram(TASK_LAG_BUCKETS))
+        self._duration: Dict[str, Histogram] = defaultdict(lambda: Histogram(TASK_DURATION_BUCKETS))
+        self._completed: Dict[str, int] = defaultdict(int)
+        self._failed: Dict[str, int] = defaultdict(int)
+
+    def observe_start(self, task_name: str, scheduled_time: Optional[datetime], started_at: datetime):
+        """
+        Record the scheduling lag of a task that was just claimed.
+
+        Args:
+            task_name: Name of the task
+            scheduled_time: When the task was due
+            started_at: When the task was claimed
+        """
+        if scheduled_time is None:
+            return
+        lag = max(0.0, (started_at - scheduled_time).total_seconds())
+        with self._lock:
+            self._lag[task_name].observe(lag)
+
+    def observe_finish(self, task_name: str, duration_seconds: float, succeeded: bool):
+        """
+        Record the outcome and execution time of a task.
+
+        Args:
+            task_name: Name of the task
+            duration_seconds: Time spent in the handler
+            succeeded: Whether the task completed without raising
+        """
+        with self._lock:
+            self._duration[task_name].observe(duration_seconds)
+            if succeeded:
+                self._completed[task_name] += 1
+            else:
+                self._failed[task_name] += 1
+
+    def get_queue_stats(self) -> Dict[str, Any]:
+        """
+        Read queue depth and the oldest due task from the database.
+
+        Returns:
+            Dictionary with `depth` (list of {status, task_name, count}) and
+            `oldest_pending_age_seconds` (0 if no task is overdue)
+        """
+        now = datetime.utcnow()
+        depth = [
+            {"status": row["_id"]["status"], "task_name": row["_id"]["task_name"], "count": row["count"]}
+            for row in db.scheduled_tasks.aggregate([
+                {"$group": {
+                    "_id": {"status": "$status", "task_name": "$task_name"},
+                    "count": {"$sum": 1}
+                }}
+            ])
+        ]
+
+        oldest = db.scheduled_tasks.find_one(
+            {"status": "pending", "scheduled_time": {"$lte": now}},
+            {"scheduled_time": 1},
+            sort=[("scheduled_time", ASCENDING)]
+        )
+        oldest_age = (now - oldest["scheduled_time"]).total_seconds() if oldest else 0.0
+
+        return {"depth": depth, "oldest_pending_age_seconds": oldest_age}
+
+    def get_snapshot(self) -> Dict[str, Any]:
+        """
+        Collect all metrics.
+
+        Returns:
+            Dictionary with queue stats from the database and this process's
+            lag/duration histograms and outcome counters per task name
+        """
+        snapshot = self.get_queue_stats()
+        with self._lock:
+            task_names = sorted(set(self._lag) | set(self._duration))
+            snapshot["tasks"] = {
+                task_name: {
+                    "completed": self._completed.get(task_name, 0),
+                    "failed": self._failed.get(task_name, 0),
+                    "lag_seconds": self._lag[task_name].to_dict() if task_name in self._lag else None,
+                    "duration_seconds": self._duration[task_name].to_dict() if task_name in self._duration else None
+                }
+                for task_name in task_names
+            }
+        return snapshot
+
+    def render_prometheus(self, snapshot: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Render metrics in the Prometheus text exposition format.
+
+        Args:
+            snapshot: Result of get_snapshot (collected if not given)
+
+        Returns:
+            Exposition text
+        """
+        snapshot = snapshot or self.get_snapshot()
+        lines: List[str] = [
+            "# HELP scheduled_tasks_queue_depth Scheduled tasks by status and task name.",
+            "# TYPE scheduled_tasks_queue_depth gauge"
+        ]
+        for row in snapshot["depth"]:
+            lines.append(
+                f'scheduled_tasks_queue_depth{{status="{row["status"]}",task_name="{row["task_name"]}"}} {row["count"]}'
+            )
+
+        lines += [
+            "# HELP scheduled_tasks_oldest_pending_age_seconds Time the oldest due pending task has been waiting.",
+            "# TYPE scheduled_tasks_oldest_pending_age_seconds gauge",
+            f"scheduled_tasks_oldest_pending_age_seconds {snapshot['oldest_pending_age_seconds']}"
+        ]
+
+        for outcome in ("completed", "failed"):
+            lines += [
+                f"# HELP scheduled_tasks_{outcome}_total Tasks {outcome} by this process.",
+                f"# TYPE scheduled_tasks_{outcome}_total counter"
+            ]
+            for task_name, stats in snapshot["tasks"].items():
+                lines.append(f'scheduled_tasks_{outcome}_total{{task_name="{task_name}"}} {stats[outcome]}')
+
+        for metric, key, description in (
+            ("scheduled_tasks_lag_seconds", "lag_seconds", "Time between a task's scheduled time and its start."),
+            ("scheduled_tasks_duration_seconds", "duration_seconds", "Task execution time.")
+        ):
+            lines += [f"# HELP {metric} {description}", f"# TYPE {metric} histogram"]
+            for task_name, stats in snapshot["tasks"].items():
+                histogram = stats[key]
+                if not histogram:
+                    continue
+                for bucket in histogram["buckets"]:
+                    lines.append(f'{metric}_bucket{{task_name="{task_name}",le="{bucket["le"]}"}} {bucket["count"]}')
+                lines.append(f'{metric}_sum{{task_name="{task_name}"}} {histogram["sum"]}')
+                lines.append(f'{metric}_count{{task_name="{task_name}"}} {histogram["count"]}')
+
+        return "\n".join(lines) + "\n"
+
+
+# Create a singleton instance
+task_metrics = TaskMetrics()
@@ -0,0 +1,146 @@
+import heapq
+import itertools
+import math
+from typing import Any, List, Optional
+
+
+class TimingWheel:
+    """
+    Hierarchical timing wheel.
+
+    Time is divided into ticks of `tick_seconds`. Level 0 has one slot per
+    tick for the current rotation; each higher level has one slot per full
+    rotation of the level below, so `levels` levels of `slots_per_level`
+    slots cover slots_per_level ** levels ticks. Items further out wait in an
+    overflow heap until the top level wraps.
+
+    Adding an item is O(1) (apart from the rare overflow case): it goes into
+    the slot of the lowest level whose current rotation contains its due
+    tick. When time reaches the start of a higher-level slot, that slot's
+    items are cascaded down; level-0 slots are emitted as the clock passes
+    them. `advance` skips over empty slots, so the cost of a long idle period
+    does not depend on its length.
+
+    Times are plain floats (e.g. POSIX timestamps). Items are never emitted
+    early: the due time is rounded up to the next tick.
+    """
+
+    def __init__(self, tick_seconds: float = 1.0, slots_per_level: int = 64, levels: int = 4, start: float = 0.0):
+        self.tick_seconds = tick_seconds
+        self.slots_per_level = slots_per_level
+        self.levels = levels
+        self._spans = [slots_per_level ** level for level in range(levels + 1)]
+        self._wheels: List[List[List[tuple]]] = [
+            [[] for _ in range(slots_per_level)] for _ in range(levels)
+        ]
+        self._overflow: List[tuple] = []
+        self._ready: List[Any] = []
+        self._sequence = itertools.count()
+        self._current_tick = math.floor(start / tick_seconds)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, due_time: float, item: Any):
+        """
+        Schedule an item.
+
+        Args:
+            due_time: When the item becomes due
+            item: Value returned by `advance` once due
+        """
+        self._size += 1
+        self._place(math.ceil(due_time / self.tick_seconds), item)
+
+    def advance(self, now: float) -> List[Any]:
+        """
+        Move the clock forward and collect due items.
+
+        Args:
+            now: Current time
+
+        Returns:
+            Items that became due, in due order (ties in insertion order)
+        """
+        target_tick = math.floor(now / self.tick_seconds)
+        while self._current_tick < target_tick:
+            next_tick = self._next_event_tick()
+            if next_tick is None or next_tick > target_tick:
+                self._current_tick = target_tick
+                break
+            self._current_tick = next_tick
+            self._on_tick()
+
+        ready, self._ready = self._ready, []
+        self._size -= len(ready)
+        return ready
+
+    def next_deadline(self) -> Optional[float]:
+        """
+        Get the time `advance` should next be called.
+
+        This is the due time of the earliest item in the current level-0
+        rotation, or otherwise the next time a non-empty higher-level slot is
+        cascaded (which may still be before the earliest item is due).
+
+        Returns:
+            Time as a float, the current tick's time if items are ready, or None if empty
+        """
+        if self._ready:
+            return self._current_tick * self.tick_seconds
+        next_tick = self._next_event_tick()
+        return next_tick * self.tick_seconds if next_tick is not None else None
+
+    def _place(self, due_tick: int, item: Any):
+        """Put an item in the lowest level whose current rotation contains its due tick."""
+        if due_tick <= self._current_tick:
+            self._ready.append(item)
+            return
+
+        for level in range(self.levels):
+            outer_span = self._spans[level + 1]
+            if due_tick // outer_span == self._current_tick // outer_span:
+                slot = (due_tick // self._spans[level]) % self.slots_per_level
+                self._wheels[level][slot].append((due_tick, next(self._sequence), item))
+                return
+
+        heapq.heappush(self._overflow, (due_tick, next(self._sequence), item))
+
+    def _next_event_tick(self) -> Optional[int]:
+        """Find the next tick at which a slot must be emitted or cascaded."""
+        for level in range(self.levels):
+            span = self._spans[level]
+            outer_span = self._spans[level + 1]
+            position = (self._current_tick // span) % self.slots_per_level
+            slots = self._wheels[level]
+            for slot in range(position + 1, self.slots_per_level):
+                if slots[slot]:
+                    return (self._current_tick // outer_span) * outer_span + slot * span
+
+        if self._overflow:
+            top_span = self._spans[self.levels]
+            return (self._current_tick // top_span + 1) * top_span
+        return None
+
+    def _on_tick(self):
+        """Cascade the higher-level slots that start at the current tick and emit level 0."""
+        tick = self._current_tick
+        top_span = self._spans[self.levels]
+
+        if tick % top_span == 0:
+            while self._overflow and self._overflow[0][0] // top_span == tick // top_span:
+                due_tick, _, item = heapq.heappop(self._overflow)
+                self._place(due_tick, item)
+
+        for level in range(self.levels - 1, 0, -1):
+            span = self._spans[level]
+            if tick % span == 0:
+                slot = (tick // span) % self.slots_per_level
+                entries, self._wheels[level][slot] = self._wheels[level][slot], []
+                for due_tick, _, item in sorted(entries):
+                    self._place(due_tick, item)
+
+        slot = tick % self.slots_per_level
+        entries, self._wheels[0][slot] = self._wheels[0][slot], []
+        self._ready.extend(item for _, _, item in sorted(entries, key=lambda entry: entry[1]))
@@ -2,9 +2,14 @@
 import httpx
 from fastapi import HTTPException
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 import os
 import random
+import time
 import logging
+from typing import Any, Dict, Optional, Set
+
+from app.utils.task_metrics import Histogram
 logging.basicConfig(level=logging.INFO)
 
 logger = logging.getLogger(__name__)
@@ -15,6 +20,18 @@ TTS_ENDPOINT_PATH = "/v1/audio/speech"
 TTS_MODEL_NAME = "kokoro"  # Default TTS model
 TTS_VOICE_NAME = "af_heart"  # Default voice
 
+# Connection pool of the shared TTS client; idle connections are kept alive and reused
+TTS_MAX_CONNECTIONS = int(os.getenv("TTS_MAX_CONNECTIONS", "20"))
+TTS_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("TTS_MAX_KEEPALIVE_CONNECTIONS", "10"))
+TTS_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("TTS_KEEPALIVE_EXPIRY_SECONDS", "60"))
+# Timeouts: connecting, waiting for a free pooled connection, and reading/writing
+TTS_CONNECT_TIMEOUT_SECONDS = float(os.getenv("TTS_CONNECT_TIMEOUT_SECONDS", "5"))
+TTS_POOL_TIMEOUT_SECONDS = float(os.getenv("TTS_POOL_TIMEOUT_SECONDS", "10"))
+TTS_TIMEOUT_SECONDS = float(os.getenv("TTS_TIMEOUT_SECONDS", "60"))
+
+# Histogram bucket upper bounds in seconds for the time until the TTS service responds
+TTS_RESPONSE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
 
     
 MALE = ["im_nicola", "am_echo", "am_eric", "am_fenrir", "am_liam", "am_michael", "am_onyx", "am_puck", "am_v0adam", "hm_omega", "bm_daniel", "bm_fable", "bm_george", "bm_lewis", "bm_v0george", "bm_v0lewis"]
@@ -22,6 +39,155 @@ FEMALE = ["af_aoede", "af_heart", "bf_v0isabella", "jf_alpha"]
 
 
 
+class TTSClient:
+    """
+    Application-scoped HTTP client for the TTS service.
+
+    One httpx.AsyncClient with a bounded connection pool is shared by all
+    speech requests, so HTTP/1.1 keep-alive connections to the TTS service
+    are reused instead of being set up for every request. The client is
+    started and closed with the application (see app.main) and created on
+    first use if a request arrives before startup.
+
+    Also keeps pool metrics for this process: streams in flight, new versus
+    reused connections, pool timeouts, errors and time to response headers.
+    """
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        # Requests waiting for response headers, and responses still holding a connection
+        self._sending = 0
+        self._open_streams: Set[int] = set()
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.connections_opened = 0
+        self.pool_timeouts = 0
+        self.errors = 0
+        self.response_seconds = Histogram(TTS_RESPONSE_BUCKETS)
+
+    @property
+    def in_flight(self) -> int:
+        """Requests currently holding or waiting for a pooled connection."""
+        return self._sending + len(self._open_streams)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The shared client, created on first use."""
+        if self._client is None or self._client.is_closed:
+            self.start()
+        return self._client
+
+    def start(self):
+        """Create the shared client with the configured pool."""
+        if self._client is not None and not self._client.is_closed:
+            return
+        self._client = httpx.AsyncClient(
+            base_url=TTS_BACKEND_BASE_URL,
+            limits=httpx.Limits(
+                max_connections=TTS_MAX_CONNECTIONS,
+                max_keepalive_connections=TTS_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=TTS_KEEPALIVE_EXPIRY_SECONDS
+            ),
+            timeout=httpx.Timeout(
+                TTS_TIMEOUT_SECONDS,
+                connect=TTS_CONNECT_TIMEOUT_SECONDS,
+                pool=TTS_POOL_TIMEOUT_SECONDS
+            )
+        )
+        logger.info(
+            f"TTS client started for {TTS_BACKEND_BASE_URL} "
+            f"(max {TTS_MAX_CONNECTIONS} connections, {TTS_MAX_KEEPALIVE_CONNECTIONS} kept alive)"
+        )
+
+    async def close(self):
+        """Close the shared client and its pooled connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            logger.info("TTS client closed")
+
+    async def _trace(self, event_name: str, info: Dict[str, Any]):
+        """Count new TCP connections (httpcore trace hook); other requests reuse a pooled one."""
+        if event_name == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+
+    async def open_stream(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """
+        Send a request and return the response without reading the body.
+
+        The response holds a pooled connection until it is passed to
+        close_stream.
+
+        Args:
+            method: HTTP method
+            path: Path relative to TTS_BACKEND_BASE_URL
+            **kwargs: Arguments for httpx.AsyncClient.build_request
+
+        Returns:
+            The streaming response
+        """
+        request = self.client.build_request(method, path, extensions={"trace": self._trace}, **kwargs)
+        self.requests += 1
+        self._sending += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        started = time.perf_counter()
+        try:
+            response = await self.client.send(request, stream=True)
+        except httpx.PoolTimeout:
+            self.pool_timeouts += 1
+            raise
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self._sending -= 1
+        self._open_streams.add(id(response))
+        self.response_seconds.observe(time.perf_counter() - started)
+        return response
+
+    async def close_stream(self, response: httpx.Response):
+        """
+        Close a response from open_stream, returning its connection to the pool.
+
+        Safe to call more than once for the same response.
+        """
+        self._open_streams.discard(id(response))
+        if not response.is_closed:
+            await response.aclose()
+
+    def get_snapshot(self) -> Dict[str, Any]:
+        """
+        Collect the pool metrics of this process.
+
+        Returns:
+            Dictionary with pool limits, streams in flight, pool utilization
+            (in flight / max connections), request and connection counters,
+            the share of requests that reused a pooled connection and the
+            time-to-response histogram
+        """
+        return {
+            "base_url": TTS_BACKEND_BASE_URL,
+            "started": self._client is not None and not self._client.is_closed,
+            "max_connections": TTS_MAX_CONNECTIONS,
+            "max_keepalive_connections": TTS_MAX_KEEPALIVE_CONNECTIONS,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "pool_utilization": self.in_flight / TTS_MAX_CONNECTIONS if TTS_MAX_CONNECTIONS else 0.0,
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "connection_reuse_ratio": (
+                max(0, self.requests - self.connections_opened) / self.requests if self.requests else 0.0
+            ),
+            "pool_timeouts": self.pool_timeouts,
+            "errors": self.errors,
+            "response_seconds": self.response_seconds.to_dict()
+        }
+
+
+# Create a singleton instance
+tts_client = TTSClient()
+
+
 async def get_speech_from_tts_service(
     text_to_speak: str,
     voice_name: str, # e.g., "af_heart"
@@ -32,8 +198,10 @@ async def get_speech_from_tts_service(
 ):
     """
     Calls the external TTS Service to convert text to speech and streams the audio.
+
+    Uses the shared pooled client, so consecutive requests reuse kept-alive
+    connections to the TTS service.
     """
-    tts_request_url = f"{TTS_BACKEND_BASE_URL}{TTS_ENDPOINT_PATH}"
     payload = {
         "model": model_name,
         "input": text_to_speak,
@@ -61,28 +229,21 @@ async def get_speech_from_tts_service(
     if response_format == "mp3":
         headers["Accept"] = "audio/mpeg"
 
-    client = httpx.AsyncClient(timeout=60.0)
     response_stream = None  # Initialize to None to hold the actual response object
 
     try:
-        request = client.build_request("POST", tts_request_url, json=payload, headers=headers)
-        logger.info(f"DEBUG: Sending TTS request to: {request.url}")
-        logger.info(f"DEBUG: TTS Payload: {payload}") # Keep payload logging for now
-        logger.info(f"DEBUG: TTS Headers: {request.headers}")
-
-        response_stream = await client.send(request, stream=True)
-        logger.info(f"DEBUG: TTS response status: {response_stream.status_code}")
+        logger.debug(f"Sending TTS request to {TTS_BACKEND_BASE_URL}{TTS_ENDPOINT_PATH}: {payload}")
+        response_stream = await tts_client.open_stream("POST", TTS_ENDPOINT_PATH, json=payload, headers=headers)
+        logger.debug(f"TTS response status: {response_stream.status_code}")
 
         if response_stream.status_code != 200:
             error_content = await response_stream.aread()
-            if not response_stream.is_closed:
-                await response_stream.aclose()
-            await client.aclose() # Client must be closed here as StreamingResponse won't be returned
+            await tts_client.close_stream(response_stream)
             error_detail = f"TTS Service error ({response_stream.status_code}): {error_content.decode()}"
             logger.error(error_detail)
             raise HTTPException(status_code=response_stream.status_code, detail=error_detail)
         
-        async def generator_func(current_response, client_to_close):
+        async def generator_func(current_response):
             try:
                 async for chunk in current_response.aiter_bytes():
                     yield chunk
@@ -93,33 +254,30 @@ async def get_speech_from_tts_service(
                 logger.error(f"Exception in streaming generator: {e}", exc_info=True)
                 raise
             finally:
-                logger.info("DEBUG: Generator finally block: Closing response stream.")
-                if current_response is not None and not current_response.is_closed:
-                    await current_response.aclose()
-                logger.info("DEBUG: Generator finally block: Closing client.")
-                if client_to_close is not None: # httpx.AsyncClient.aclose() is idempotent
-                    await client_to_close.aclose()
+                # Return the connection to the pool; the shared client stays open
+                await tts_client.close_stream(current_response)
 
         media_type = response_stream.headers.get("content-type", "audio/mpeg" if response_format == "mp3" else "application/octet-stream")
            
-        return StreamingResponse(generator_func(response_stream, client), media_type=media_type)
+        # The background task also releases the connection if the body is never streamed
+        return StreamingResponse(
+            generator_func(response_stream),
+            media_type=media_type,
+            background=BackgroundTask(tts_client.close_stream, response_stream)
+        )
 
+    except HTTPException:
+        raise
     except (httpx.TimeoutException, httpx.RequestError) as e:
         logger.error(f"TTS Service communication error: {e}", exc_info=True)
-        if response_stream is not None and not response_stream.is_closed:
-            await response_stream.aclose()
-        if client is not None: # client is always defined here
-            await client.aclose()
+        if response_stream is not None:
+            await tts_client.close_stream(response_stream)
         status_code = 504 if isinstance(e, httpx.TimeoutException) else 503
         raise HTTPException(status_code=status_code, detail=f"TTS Service communication error: {str(e)}")
     except Exception as e: 
         logger.error(f"ERROR: Unexpected error in get_speech_from_tts_service: {str(e)}", exc_info=True)
-        if response_stream is not None and not response_stream.is_closed:
-            await response_stream.aclose()
-        if client is not None: # client is always defined here
-            await client.aclose()
-        if isinstance(e, HTTPException): # Re-raise if it's already an HTTPException
-            raise
+        if response_stream is not None:
+            await tts_client.close_stream(response_stream)
         raise HTTPException(status_code=500, detail=f"Unexpected error during TTS request: {str(e)}")
 
 
@@ -0,0 +1,121 @@
+"""
+Microbenchmark for prioritize_mistakes_for_review.
+
+Compares the vectorized scorer with the previous per-mistake loop on
+synthetic mistake sets, and checks that both pick the same mistakes.
+
+Usage (from the backend directory):
+    python benchmarks/prioritize_mistakes.py [--sizes 1000 10000 100000] [--limit 10]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.spaced_repetition import prioritize_mistakes_for_review
+
+
+def prioritize_mistakes_loop(mistakes: List[Dict[str, Any]], limit: int = 10) -> List[Dict[str, Any]]:
+    """The previous implementation: score each mistake in Python, then sort all of them."""
+    for mistake in mistakes:
+        if not mistake.get("in_drill_queue", True):
+            mistake["priority_score"] = -1
+            continue
+
+        frequency = min(5, mistake.get("frequency", 1))
+        severity = mistake.get("severity", 3)
+
+        last_occurred = mistake.get("last_occurred", datetime.utcnow())
+        if isinstance(last_occurred, str):
+            last_occurred = datetime.fromisoformat(last_occurred.replace("Z", "+00:00"))
+        days_since = (datetime.utcnow() - last_occurred).days
+        recency_factor = 1 / (1 + days_since * 0.1)
+
+        failed_practices = mistake.get("failed_practices", 0)
+        failed_factor = min(1.0, failed_practices * 0.2)
+
+        next_practice = mistake.get("next_practice_date", datetime.utcnow())
+        if isinstance(next_practice, str):
+            next_practice = datetime.fromisoformat(next_practice.replace("Z", "+00:00"))
+        days_overdue = (datetime.utcnow() - next_practice).days
+        due_factor = 1.0
+        if days_overdue > 0:
+            due_factor = 1.0 + min(1.0, days_overdue * 0.1)
+        elif days_overdue < 0:
+            due_factor = max(0.1, 1.0 + days_overdue * 0.1)
+
+        mistake["priority_score"] = (
+            frequency * 2.0 +
+            severity * 1.5 +
+            recency_factor * 5.0 +
+            failed_factor * 3.0 +
+            due_factor * 5.0
+        )
+
+    active_mistakes = [m for m in mistakes if m.get("priority_score", -1) >= 0]
+    sorted_mistakes = sorted(active_mistakes, key=lambda x: x.get("priority_score", 0), reverse=True)
+    return sorted_mistakes[:limit]
+
+
+def generate_mistakes(count: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """Generate mistakes with a realistic mix of values and date types."""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    mistakes = []
+    for index in range(count):
+        last_occurred = now - timedelta(seconds=rng.randint(0, 90 * 86400))
+        next_practice = now + timedelta(seconds=rng.randint(-30 * 86400, 30 * 86400))
+        mistakes.append({
+            "_id": index,
+            "frequency": rng.randint(1, 12),
+            "severity": rng.randint(1, 5),
+            "failed_practices": rng.randint(0, 6),
+            "in_drill_queue": rng.random() > 0.1,
+            # Older documents store ISO strings
+            "last_occurred": last_occurred.isoformat() if rng.random() < 0.2 else last_occurred,
+            "next_practice_date": next_practice
+        })
+    return mistakes
+
+
+def best_of(function, mistakes: List[Dict[str, Any]], limit: int, repeat: int) -> float:
+    """Best wall time of `repeat` runs, in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(mistakes, limit)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'mistakes':>10} {'loop ms':>10} {'vectorized ms':>14} {'speedup':>8}  same top-k")
+    for size in args.sizes:
+        mistakes = generate_mistakes(size)
+        loop_time = best_of(prioritize_mistakes_loop, mistakes, args.limit, args.repeat)
+        vectorized_time = best_of(prioritize_mistakes_for_review, mistakes, args.limit, args.repeat)
+
+        same = (
+            [m["_id"] for m in prioritize_mistakes_loop(mistakes, args.limit)] ==
+            [m["_id"] for m in prioritize_mistakes_for_review(mistakes, args.limit)]
+        )
+        print(
+            f"{size:>10} {loop_time * 1000:>10.2f} {vectorized_time * 1000:>14.2f} "
+            f"{loop_time / vectorized_time:>7.1f}x  {same}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Review load simulator for the practice schedulers.
+
+Simulates N users x M mistakes over a number of days, entirely in memory.
+The state of every mistake is kept in NumPy arrays, and each simulated day
+reviews all due mistakes with one Scheduler.review_batch call (or with
+Scheduler.review per mistake with --scalar, to measure the scalar path,
+which for sm2 is spaced_repetition.calculate_next_review_time).
+
+Recall outcomes come from a synthetic memory model: each mistake has a
+hidden memory strength in days, recall probability decays as
+0.9 ** (elapsed / strength), and the strength grows after a successful
+review and shrinks after a failure. Mistakes are introduced uniformly over
+the first --intro-days days and reviewed on the first day they are due, so
+intervals shorter than a day (e.g. 4 hours after a failure) come back the
+next day.
+
+With --load-balance, intervals get the bounded fuzz and load-weighted day
+choice of app.utils.load_smoothing, using per-user and global daily due
+histograms kept up to date as mistakes are rescheduled.
+
+Reports daily due counts, peak load and scheduler throughput. With --json
+the summary is printed as JSON, and --max-peak / --min-throughput make the
+run fail if the result regresses, so it can be used as a benchmark in CI.
+
+Usage (from the backend directory):
+    python benchmarks/review_load_simulation.py --users 100000 --mistakes 20 --days 365 --scheduler fsrs
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Dict
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.load_smoothing import MISTAKE_FUZZ_MAX_DAYS, MISTAKE_GLOBAL_LOAD_WEIGHT, fuzz_window
+from app.utils.schedulers import MAX_INTERVAL_DAYS, SCHEDULERS, Scheduler, get_scheduler
+
+
+def simulate(
+    scheduler_name: str,
+    users: int,
+    mistakes_per_user: int,
+    days: int,
+    intro_days: int = 60,
+    seed: int = 42,
+    scalar: bool = False,
+    load_balance: bool = False
+) -> Dict[str, Any]:
+    """
+    Run one simulation.
+
+    Args:
+        scheduler_name: Name of the scheduler to simulate
+        users: Number of users
+        mistakes_per_user: Number of mistakes per user
+        days: Number of simulated days
+        intro_days: Mistakes are introduced uniformly over this many days
+        seed: Random seed
+        scalar: Call Scheduler.review per mistake instead of review_batch
+        load_balance: Smooth due dates like DueLoadBalancer.offset_table
+
+    Returns:
+        Summary with daily due counts, peak load and throughput
+    """
+    scheduler = get_scheduler(scheduler_name)
+    rng = np.random.default_rng(seed)
+    count = users * mistakes_per_user
+
+    initial = scheduler.initial_state()
+    stability = np.full(count, initial["s"])
+    difficulty = np.full(count, initial["d"])
+    practice_count = np.zeros(count, dtype=np.int64)
+    introduced = rng.integers(0, max(1, intro_days), count)
+    # New mistakes are due a couple of hours after they are made, i.e. on the same day
+    due_day = introduced.astype(np.float64)
+    last_review = introduced.astype(np.float64)
+    # Hidden memory strength in days, varying per mistake
+    strength = rng.lognormal(mean=0.0, sigma=0.5, size=count)
+
+    # Due mistakes per user and day, and for all users, for load balancing
+    horizon = days + MAX_INTERVAL_DAYS + MISTAKE_FUZZ_MAX_DAYS + 2
+    owner = np.arange(count) // mistakes_per_user
+    if load_balance:
+        user_load = np.zeros((users, horizon), dtype=np.int32)
+        np.add.at(user_load, (owner, introduced), 1)
+        global_load = np.bincount(introduced, minlength=horizon).astype(np.float64)
+    window = [fuzz_window(interval) for interval in range(MAX_INTERVAL_DAYS + 1)]
+    shortest = np.array([low for low, _ in window])
+    longest = np.array([high for _, high in window])
+    shifts = np.arange(-MISTAKE_FUZZ_MAX_DAYS, MISTAKE_FUZZ_MAX_DAYS + 1)
+
+    daily_due = np.zeros(days, dtype=np.int64)
+    # Largest number of mistakes due on one day for each user, after the introduction period
+    user_peak = np.zeros(users, dtype=np.int64)
+    interval_total = 0.0
+    reviews = 0
+    successes = 0
+    scheduler_seconds = 0.0
+    start = time.perf_counter()
+
+    for day in range(days):
+        due = np.flatnonzero(due_day < day + 1)
+        daily_due[day] = due.size
+        if due.size == 0:
+            continue
+        if day >= intro_days:
+            np.maximum(user_peak, np.bincount(owner[due], minlength=users), out=user_peak)
+
+        elapsed = day - last_review[due]
+        recall_probability = 0.9 ** (elapsed / strength[due])
+        was_successful = rng.random(due.size) < recall_probability
+        never_practiced = practice_count[due] == 0
+
+        review_start = time.perf_counter()
+        review = Scheduler.review_batch if scalar else type(scheduler).review_batch
+        new_stability, new_difficulty = review(
+            scheduler, stability[due], difficulty[due], practice_count[due], was_successful,
+            np.where(never_practiced, 0.0, elapsed)
+        )
+        scheduler_seconds += time.perf_counter() - review_start
+
+        interval = np.minimum(MAX_INTERVAL_DAYS, np.maximum(0.0, new_stability))
+        if load_balance:
+            users_due = owner[due]
+            np.subtract.at(user_load, (users_due, day), 1)
+            global_load[day] -= due.size
+
+            rounded = np.round(interval).astype(np.int64)
+            candidates = rounded[:, None] + shifts[None, :]
+            valid = (candidates >= shortest[rounded][:, None]) & (candidates <= longest[rounded][:, None])
+            candidate_days = np.clip(day + candidates, 0, horizon - 1)
+            future = global_load[day + 1:day + 1 + MAX_INTERVAL_DAYS]
+            global_mean = future[future > 0].mean() if (future > 0).any() else 0.0
+            load = user_load[users_due[:, None], candidate_days].astype(np.float64)
+            if global_mean:
+                load += MISTAKE_GLOBAL_LOAD_WEIGHT * global_load[candidate_days] / global_mean
+            weights = np.where(valid, 1 / (1 + load) ** 2, 0.0)
+            cumulative = np.cumsum(weights, axis=1)
+            draw = rng.random(due.size)[:, None] * cumulative[:, -1:]
+            chosen = shifts[np.argmax(cumulative > draw, axis=1)]
+            interval = interval + chosen
+
+            new_day = np.minimum(day + np.maximum(1, np.floor(interval)).astype(np.int64), horizon - 1)
+            np.add.at(user_load, (users_due, new_day), 1)
+            np.add.at(global_load, new_day, 1)
+
+        stability[due] = new_stability
+        difficulty[due] = new_difficulty
+        practice_count[due] += 1
+        last_review[due] = day
+        due_day[due] = day + interval
+        interval_total += float(interval.sum())
+        strength[due] = np.where(
+            was_successful,
+            strength[due] * rng.uniform(1.8, 3.0, due.size),
+            np.maximum(0.5, strength[due] * 0.5)
+        )
+
+        reviews += due.size
+        successes += int(was_successful.sum())
+
+    wall_seconds = time.perf_counter() - start
+    peak_day = int(daily_due.argmax())
+    steady = daily_due[min(intro_days, days - 1):]
+    return {
+        "scheduler": scheduler.name,
+        "scalar": scalar,
+        "users": users,
+        "mistakes_per_user": mistakes_per_user,
+        "days": days,
+        "reviews": reviews,
+        "load_balance": load_balance,
+        "recall_rate": successes / reviews if reviews else 0.0,
+        "mean_interval_days": interval_total / reviews if reviews else 0.0,
+        "peak_daily_due": int(daily_due[peak_day]),
+        "peak_day": peak_day,
+        "mean_daily_due": float(daily_due.mean()),
+        "p95_daily_due": float(np.percentile(daily_due, 95)),
+        "steady_state_daily_due_per_user": float(steady.mean() / users) if steady.size else 0.0,
+        "steady_state_daily_due_cv": float(steady.std() / steady.mean()) if steady.size and steady.mean() else 0.0,
+        "mean_user_peak_daily_due": float(user_peak.mean()),
+        "scheduler_items_per_second": reviews / scheduler_seconds if scheduler_seconds else 0.0,
+        "wall_seconds": wall_seconds,
+        "daily_due": daily_due.tolist()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scheduler", choices=sorted(SCHEDULERS) + ["all"], default="all")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--mistakes", type=int, default=20, help="Mistakes per user")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--intro-days", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--scalar", action="store_true", help="Review one mistake at a time")
+    parser.add_argument("--load-balance", action="store_true", help="Smooth due dates with load balancing")
+    parser.add_argument("--json", action="store_true", help="Print the summaries as JSON")
+    parser.add_argument("--daily", action="store_true", help="Include daily due counts in the output")
+    parser.add_argument("--max-peak", type=int, help="Fail if the peak daily due count exceeds this")
+    parser.add_argument("--min-throughput", type=float, help="Fail if scheduler items/s is below this")
+    args = parser.parse_args()
+
+    names = sorted(SCHEDULERS) if args.scheduler == "all" else [args.scheduler]
+    results = [
+        simulate(name, args.users, args.mistakes, args.days, args.intro_days, args.seed, args.scalar, args.load_balance)
+        for name in names
+    ]
+
+    if args.json:
+        if not args.daily:
+            results = [{k: v for k, v in result.items() if k != "daily_due"} for result in results]
+        print(json.dumps(results, indent=2))
+    else:
+        print(
+            f"{'scheduler':>12} {'reviews':>12} {'recall':>7} {'interval':>8} {'peak/day':>10} {'peak day':>9} "
+            f"{'mean/day':>10} {'p95/day':>10} {'steady/user':>12} {'steady cv':>10} {'user peak':>10} "
+            f"{'items/s':>12} {'wall s':>8}"
+        )
+        for r in results:
+            print(
+                f"{r['scheduler']:>12} {r['reviews']:>12} {r['recall_rate']:>7.3f} {r['mean_interval_days']:>8.2f} "
+                f"{r['peak_daily_due']:>10} "
+                f"{r['peak_day']:>9} {r['mean_daily_due']:>10.0f} {r['p95_daily_due']:>10.0f} "
+                f"{r['steady_state_daily_due_per_user']:>12.2f} {r['steady_state_daily_due_cv']:>10.3f} "
+                f"{r['mean_user_peak_daily_due']:>10.2f} {r['scheduler_items_per_second']:>12.0f} "
+                f"{r['wall_seconds']:>8.1f}"
+            )
+            if args.daily:
+                print("  daily due:", " ".join(str(count) for count in r["daily_due"]))
+
+    failed = False
+    for r in results:
+        if args.max_peak is not None and r["peak_daily_due"] > args.max_peak:
+            print(f"{r['scheduler']}: peak daily due {r['peak_daily_due']} > {args.max_peak}", file=sys.stderr)
+            failed = True
+        if args.min_throughput is not None and r["scheduler_items_per_second"] < args.min_throughput:
+            print(
+                f"{r['scheduler']}: {r['scheduler_items_per_second']:.0f} items/s < {args.min_throughput:.0f}",
+                file=sys.stderr
+            )
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
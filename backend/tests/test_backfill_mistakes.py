@@ -0,0 +1,188 @@
+import os
+import sys
+import threading
+import pytest
+from bson import ObjectId
+from types import SimpleNamespace
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.commands.backfill_mistakes as backfill_module
+from app.commands.backfill_mistakes import CHECKPOINT_ID, MistakeBackfill, RateLimiter
+
+
+class FakeClock:
+    """Monotonic clock that only moves when slept on"""
+    def __init__(self):
+        self.now = 100.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class FakeCursor:
+    """The cursor operations the backfill uses"""
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, key, direction):
+        self.documents = sorted(self.documents, key=lambda document: document[key])
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    def __iter__(self):
+        return iter(self.documents)
+
+
+class FakeFeedback:
+    """db.feedback holding records without extracted mistakes"""
+    def __init__(self, count):
+        self.documents = [{"_id": ObjectId(), "user_id": ObjectId(), "transcription": f"text {i}"} for i in range(count)]
+
+    def find_one(self, query, projection=None, sort=None):
+        return max(self.documents, key=lambda document: document["_id"]) if self.documents else None
+
+    def find(self, query, projection=None):
+        bounds = query["_id"]
+        return FakeCursor([
+            document for document in self.documents
+            if document["_id"] <= bounds["$lte"] and ("$gt" not in bounds or document["_id"] > bounds["$gt"])
+        ])
+
+
+class FakeCheckpoints:
+    """db.backfill_checkpoints, checking every saved position against the finished feedback"""
+    def __init__(self, finished):
+        self.documents = {}
+        self.finished = finished
+        self.saved = []
+
+    def find_one(self, query):
+        return self.documents.get(query["_id"])
+
+    def insert_one(self, document):
+        self.documents[document["_id"]] = dict(document)
+
+    def delete_one(self, query):
+        self.documents.pop(query["_id"], None)
+
+    def update_one(self, query, update):
+        document = self.documents[query["_id"]]
+        document.update(update["$set"])
+        for field, value in update.get("$inc", {}).items():
+            document[field] += value
+        if "last_id" in update["$set"]:
+            self.saved.append(update["$set"]["last_id"])
+
+
+class OutOfOrderService:
+    """Mistake service whose first batch finishes last and whose `failing` feedback raises"""
+    def __init__(self, first_id, later_batches, failing=None):
+        self.first_id = first_id
+        self.later_batches = later_batches
+        self.failing = failing
+        self.finished = set()
+        self.later_done = threading.Semaphore(0)
+        self.lock = threading.Lock()
+
+    def ensure_indexes(self):
+        pass
+
+    def process_feedback_batch(self, items):
+        ids = [ObjectId(item["feedback_id"]) for item in items]
+        if self.first_id in ids:
+            # Hold the first batch until the later ones have finished
+            for _ in range(self.later_batches):
+                self.later_done.acquire(timeout=5)
+        elif self.failing is None:
+            self.later_done.release()
+        if self.failing in ids:
+            raise RuntimeError("extraction failed")
+        with self.lock:
+            self.finished.update(ids)
+        if self.failing is not None and self.first_id not in ids:
+            self.later_done.release()
+        return len(ids)
+
+
+def make_backfill(monkeypatch, feedback_count, later_batches, failing_index=None):
+    """A backfill over fake collections with one feedback record per batch"""
+    feedback = FakeFeedback(feedback_count)
+    first_id = feedback.documents[0]["_id"]
+    failing = feedback.documents[failing_index]["_id"] if failing_index is not None else None
+    service = OutOfOrderService(first_id, later_batches, failing)
+    checkpoints = FakeCheckpoints(service.finished)
+    monkeypatch.setattr(backfill_module, "db", SimpleNamespace(feedback=feedback, backfill_checkpoints=checkpoints))
+
+    backfill = MistakeBackfill(batch_size=1, workers=2, rate=0, report_seconds=3600)
+    backfill.mistake_service = service
+    return backfill, feedback, checkpoints, service
+
+
+# ============== Rate Limiter Tests ==============
+def test_rate_limiter_allows_one_second_burst(monkeypatch):
+    """Up to `rate` items pass at once, more wait for tokens to refill"""
+    clock = FakeClock()
+    monkeypatch.setattr(backfill_module, "time", clock)
+    limiter = RateLimiter(10)
+
+    limiter.acquire(10)
+    assert clock.slept == []
+
+    limiter.acquire(5)
+    assert clock.slept == [pytest.approx(0.5)]
+
+    clock.now += 10
+    limiter.acquire(10)
+    assert len(clock.slept) == 1
+
+
+def test_rate_limiter_disabled(monkeypatch):
+    """A rate of 0 never blocks"""
+    clock = FakeClock()
+    monkeypatch.setattr(backfill_module, "time", clock)
+
+    RateLimiter(0).acquire(10 ** 6)
+
+    assert clock.slept == []
+
+
+# ============== Checkpoint Tests ==============
+def test_checkpoint_waits_for_earlier_batches(monkeypatch):
+    """Later batches finishing first never move the checkpoint past an unfinished one"""
+    backfill, feedback, checkpoints, service = make_backfill(monkeypatch, feedback_count=6, later_batches=2)
+
+    def checked_update(query, update, original=checkpoints.update_one):
+        last_id = update["$set"].get("last_id")
+        if last_id is not None:
+            assert all(document["_id"] in service.finished for document in feedback.documents if document["_id"] <= last_id)
+        original(query, update)
+
+    checkpoints.update_one = checked_update
+    summary = backfill.run()
+
+    assert summary["completed"]
+    assert summary["feedback_processed"] == 6
+    assert checkpoints.saved == sorted(checkpoints.saved)
+    assert checkpoints.documents[CHECKPOINT_ID]["last_id"] == feedback.documents[-1]["_id"]
+    assert checkpoints.documents[CHECKPOINT_ID]["completed_at"] is not None
+
+
+def test_failed_batch_stops_the_checkpoint(monkeypatch):
+    """A failure keeps the checkpoint before the failed batch, so the next run retries it"""
+    backfill, feedback, checkpoints, service = make_backfill(monkeypatch, feedback_count=6, later_batches=2, failing_index=2)
+
+    summary = backfill.run()
+
+    assert not summary["completed"]
+    checkpoint = checkpoints.documents[CHECKPOINT_ID]
+    assert checkpoint["last_id"] == feedback.documents[1]["_id"]
+    assert checkpoint["completed_at"] is None
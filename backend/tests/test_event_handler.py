@@ -0,0 +1,160 @@
+import os
+import sys
+import time
+import threading
+import pytest
+from bson import ObjectId
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.utils.event_handler as event_handler_module
+from app.utils.event_handler import EventHandler
+
+TASK_NAME = "process_feedback_for_mistakes"
+PAGE_SIZE = 5
+
+
+class FakeCursor:
+    """The cursor operations the scheduler uses"""
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, key, direction):
+        self.documents = sorted(self.documents, key=lambda document: document[key])
+        return self
+
+    def limit(self, count):
+        self.documents = self.documents[:count]
+        return self
+
+    def __iter__(self):
+        return iter(self.documents)
+
+
+class FakeScheduledTasks:
+    """In-memory scheduled_tasks holding pending tasks; claimed tasks leave the pending set"""
+    def __init__(self, tasks):
+        self.tasks = {task["_id"]: task for task in tasks}
+        self.lock = threading.Lock()
+        self.queries = 0
+
+    def pending(self, horizon=None):
+        with self.lock:
+            return [
+                dict(task) for task in self.tasks.values()
+                if task["status"] == "pending" and (horizon is None or task["scheduled_time"] <= horizon)
+            ]
+
+    def find(self, query, projection=None):
+        self.queries += 1
+        return FakeCursor(self.pending(query["scheduled_time"]["$lte"]))
+
+    def find_one(self, query, projection=None, sort=None):
+        return None
+
+    def update_many(self, query, update):
+        return SimpleNamespace(modified_count=0)
+
+    def claim(self, task_id):
+        with self.lock:
+            self.tasks[ObjectId(task_id)]["status"] = "processing"
+
+
+def overdue_tasks(count):
+    """Pending tasks that were due an hour ago"""
+    due = datetime.utcnow() - timedelta(hours=1)
+    return [
+        {"_id": ObjectId(), "task_name": TASK_NAME, "status": "pending", "scheduled_time": due + timedelta(seconds=i)}
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def scheduled_tasks(monkeypatch):
+    """Replace the database with one holding three pages of overdue tasks"""
+    collection = FakeScheduledTasks(overdue_tasks(PAGE_SIZE * 3))
+    monkeypatch.setattr(event_handler_module, "db", SimpleNamespace(scheduled_tasks=collection))
+    monkeypatch.setattr(event_handler_module, "TASK_LOAD_PAGE_SIZE", PAGE_SIZE)
+    return collection
+
+
+@pytest.fixture
+def handler(scheduled_tasks):
+    """An event handler whose pool marks tasks claimed instead of running them"""
+    handler = EventHandler()
+    handler.running = True
+    handler._executor = ThreadPoolExecutor(max_workers=2)
+    handler._run_task = scheduled_tasks.claim
+    yield handler
+    with handler._cond:
+        handler.running = False
+        handler._cond.notify_all()
+    handler._executor.shutdown(wait=True)
+
+
+# ============== Dispatcher Tests ==============
+def test_refresh_after_full_overdue_page_is_not_immediate(handler, scheduled_tasks):
+    """A full page of overdue tasks must not ask for a refresh in the past"""
+    before = datetime.utcnow()
+    handler._refresh_from_db()
+
+    assert len(handler._wheel) == PAGE_SIZE
+    assert handler._next_refresh >= before + timedelta(seconds=event_handler_module.TASK_MIN_REFRESH_SECONDS)
+
+
+def test_dispatcher_runs_every_page_of_overdue_tasks(handler, scheduled_tasks):
+    """Overdue pages are dispatched one after another instead of being re-queried forever"""
+    thread = threading.Thread(target=handler._process_queue, daemon=True)
+    thread.start()
+
+    deadline = time.monotonic() + 10
+    while scheduled_tasks.pending() and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    with handler._cond:
+        handler.running = False
+        handler._cond.notify_all()
+    thread.join(timeout=5)
+
+    assert scheduled_tasks.pending() == []
+    # One query per page plus the final empty one, not a query loop
+    assert scheduled_tasks.queries <= 3 + 2
+
+
+def test_dispatch_after_stop_leaves_tasks_pending(scheduled_tasks):
+    """A dispatcher still running after stop does not submit to the closed pool"""
+    handler = EventHandler()
+    handler.register_task_handler(TASK_NAME, lambda data: None)
+    handler.running = True
+    handler._refresh_from_db()
+    handler.stop()
+
+    with handler._cond:
+        handler._dispatch_due_tasks()
+
+    assert handler._task_types[TASK_NAME].running == 0
+    assert len(scheduled_tasks.pending()) == PAGE_SIZE * 3
+
+
+def test_refresh_does_not_park_waiting_tasks_twice(handler, scheduled_tasks):
+    """Parked tasks stay pending in the database, but a refresh must not queue them again"""
+    release = threading.Event()
+    handler._run_task = lambda task_id: (scheduled_tasks.claim(task_id), release.wait(5))
+    handler.register_task_handler(TASK_NAME, lambda data: None, max_concurrency=1)
+    task_type = handler._task_types[TASK_NAME]
+
+    for _ in range(3):
+        handler._refresh_from_db()
+        with handler._cond:
+            handler._dispatch_due_tasks()
+
+    # One running; the rest of the page parked once each, plus the task that moved into the page
+    assert task_type.running == 1
+    assert sorted(task_type.waiting) == sorted(set(task_type.waiting))
+    assert len(task_type.waiting) == PAGE_SIZE
+    assert len(handler._wheel) == 0
+    release.set()
@@ -0,0 +1,46 @@
+import os
+import sys
+import pytest
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.feedback_batcher import FeedbackBatcher
+
+
+@pytest.fixture
+def batcher():
+    """A batcher that answers 'ok' per message and fails message 'bad'"""
+    def handler(batch):
+        return {
+            item.message_id: ValueError("generation failed") if item.message_id == "bad" else f"ok {item.transcription}"
+            for item in batch if item.message_id != "missing"
+        }
+
+    batcher = FeedbackBatcher(handler, max_batch_size=3, max_wait_seconds=0.05)
+    yield batcher
+    batcher.stop()
+
+
+# ============== Batching Tests ==============
+def test_batch_resolves_each_future(batcher):
+    """Every item gets its own result from one batch"""
+    futures = [batcher.submit(f"m{i}", f"text {i}") for i in range(3)]
+
+    assert [future.result(timeout=5) for future in futures] == ["ok text 0", "ok text 1", "ok text 2"]
+
+
+def test_item_error_is_raised_from_its_future(batcher):
+    """A per-item exception is raised to that caller only, so the job can be retried"""
+    good = batcher.submit("good", "fine")
+    bad = batcher.submit("bad", "broken")
+
+    assert good.result(timeout=5) == "ok fine"
+    with pytest.raises(ValueError):
+        bad.result(timeout=5)
+
+
+def test_missing_item_raises(batcher):
+    """Items the handler did not answer fail instead of hanging"""
+    with pytest.raises(KeyError):
+        batcher.submit("missing", "lost").result(timeout=5)
@@ -0,0 +1,104 @@
+import os
+import sys
+import pytest
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.utils.feedback_cache as feedback_cache_module
+from app.models.results.feedback_result import FeedbackResult
+from app.utils.feedback_cache import FeedbackCache, normalize_transcription
+
+CONTEXT = {"user_role": "Customer", "ai_role": "Waiter", "situation": "Ordering food", "last_ai_turn": "What would you like?"}
+
+
+class FakeClock:
+    """Monotonic clock moved by hand"""
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replace the cache's clock"""
+    clock = FakeClock()
+    monkeypatch.setattr(feedback_cache_module.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def cache(clock):
+    """A small enabled cache"""
+    return FeedbackCache(max_entries=2, ttl_seconds=60, max_words=5, enabled=True)
+
+
+def feedback(text):
+    """A feedback result with one grammar issue"""
+    return FeedbackResult(user_feedback=text, grammar_issues=[{"issue": "a", "correction": "b"}])
+
+
+# ============== Key Tests ==============
+def test_equivalent_utterances_share_a_key(cache):
+    """Case, punctuation, filler words and spacing do not change the key"""
+    assert normalize_transcription("Um, Yes... I  like it!") == "yes i like it"
+    assert cache.make_key("Um, Yes... I  like it!", CONTEXT) == cache.make_key("yes i like it", CONTEXT)
+
+
+def test_context_is_part_of_the_key(cache):
+    """The same answer to another question is cached separately"""
+    other_context = dict(CONTEXT, last_ai_turn="Anything to drink?")
+
+    assert cache.make_key("yes please", CONTEXT) != cache.make_key("yes please", other_context)
+
+
+def test_long_or_empty_utterances_are_not_cacheable(cache):
+    """Answers over max_words, or with only filler words, get no key"""
+    assert cache.make_key("one two three four five six", CONTEXT) is None
+    assert cache.make_key("um uh", CONTEXT) is None
+
+
+def test_disabled_cache_makes_no_keys(clock):
+    """A disabled cache never stores anything"""
+    assert FeedbackCache(enabled=False).make_key("yes", CONTEXT) is None
+
+
+# ============== Lookup Tests ==============
+def test_hit_returns_an_independent_copy(cache):
+    """Callers can modify a cached result without affecting the cache"""
+    key = cache.make_key("yes", CONTEXT)
+    cache.put(key, feedback("Good answer"))
+
+    first = cache.get(key)
+    first.grammar_issues[0]["issue"] = "changed"
+
+    assert cache.get(key).grammar_issues == [{"issue": "a", "correction": "b"}]
+    assert cache.get_stats()["hits"] == 2
+
+
+def test_entries_expire_after_ttl(cache, clock):
+    """An entry older than the TTL is a miss and is dropped"""
+    key = cache.make_key("yes", CONTEXT)
+    cache.put(key, feedback("Good answer"))
+
+    clock.now += 61
+
+    assert cache.get(key) is None
+    stats = cache.get_stats()
+    assert (stats["expirations"], stats["misses"], stats["size"]) == (1, 1, 0)
+
+
+def test_least_recently_used_entry_is_evicted(cache):
+    """A lookup refreshes an entry, so the other one is evicted first"""
+    keys = [cache.make_key(text, CONTEXT) for text in ("yes", "no", "maybe")]
+    cache.put(keys[0], feedback("yes"))
+    cache.put(keys[1], feedback("no"))
+    cache.get(keys[0])
+    cache.put(keys[2], feedback("maybe"))
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]).user_feedback == "yes"
+    assert cache.get(keys[2]).user_feedback == "maybe"
+    assert cache.get_stats()["evictions"] == 1
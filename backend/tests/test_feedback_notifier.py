@@ -0,0 +1,184 @@
+import os
+import sys
+import asyncio
+import json
+import threading
+import pytest
+from bson import ObjectId
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.routes.feedback as feedback_routes
+import app.utils.feedback_notifier as feedback_notifier_module
+from app.utils.feedback_notifier import FeedbackNotifier
+
+USER_ID = str(ObjectId())
+FEEDBACK = {"id": "f1", "user_feedback": "Nice", "created_at": None}
+
+
+class FakeFeedback:
+    """db.feedback returning the stored documents matching the stream query"""
+    def __init__(self, documents):
+        self.documents = documents
+        self.queries = []
+
+    def create_index(self, keys):
+        pass
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        matching = [
+            document for document in self.documents
+            if document["user_id"] == query["user_id"] and document["_id"] >= query["_id"]["$gte"]
+        ]
+        return SimpleNamespace(sort=lambda key, direction: sorted(matching, key=lambda document: document[key]))
+
+
+def publish_from_thread(notifier, message_id):
+    """Publish the way a feedback worker does, from another thread"""
+    thread = threading.Thread(target=notifier.publish, args=(USER_ID, message_id, FEEDBACK))
+    thread.start()
+    thread.join()
+
+
+# ============== Stream Tests ==============
+def test_subscriber_receives_events_published_from_a_worker_thread():
+    """Events cross from the worker thread to the subscriber's queue on the loop"""
+    async def scenario():
+        notifier = FeedbackNotifier()
+        queue = notifier.subscribe(USER_ID)
+        publish_from_thread(notifier, "m1")
+        return await asyncio.wait_for(queue.get(), timeout=1)
+
+    assert asyncio.run(scenario()) == {"message_id": "m1", "feedback": FEEDBACK}
+
+
+def test_unsubscribed_queue_gets_nothing():
+    """A closed stream no longer receives events"""
+    async def scenario():
+        notifier = FeedbackNotifier()
+        queue = notifier.subscribe(USER_ID)
+        notifier.unsubscribe(USER_ID, queue)
+        publish_from_thread(notifier, "m1")
+        await asyncio.sleep(0.05)
+        return queue.empty(), dict(notifier._subscribers)
+
+    assert asyncio.run(scenario()) == (True, {})
+
+
+def test_stored_events_cover_other_processes(monkeypatch):
+    """Feedback stored since the given time is read back in the published event shape"""
+    user_object_id = ObjectId(USER_ID)
+    now = datetime.utcnow()
+    old = {"_id": ObjectId.from_datetime(now - timedelta(minutes=5)), "user_id": user_object_id, "target_id": ObjectId(), "user_feedback": "Old"}
+    new = {"_id": ObjectId(), "user_id": user_object_id, "target_id": ObjectId(), "user_feedback": "New", "timestamp": now}
+    collection = FakeFeedback([new, old])
+    monkeypatch.setattr(feedback_notifier_module, "db", SimpleNamespace(feedback=collection))
+
+    events = FeedbackNotifier().stored_events(USER_ID, now - timedelta(seconds=5))
+
+    assert events == [{
+        "message_id": str(new["target_id"]),
+        "feedback": {"id": str(new["_id"]), "user_feedback": "New", "created_at": now.isoformat()}
+    }]
+    assert collection.queries[0]["target_type"] == "message"
+
+
+# ============== Long-Poll Tests ==============
+def test_waiter_wakes_on_publish():
+    """A parked long-poll returns as soon as its message's feedback is published"""
+    async def scenario():
+        notifier = FeedbackNotifier()
+        ready = threading.Event()
+        waiting = asyncio.create_task(notifier.wait_for_feedback("m1", timeout=5, is_ready=ready.is_set))
+        await asyncio.sleep(0.05)
+        ready.set()
+        publish_from_thread(notifier, "m1")
+        started = asyncio.get_running_loop().time()
+        result = await waiting
+        return result, asyncio.get_running_loop().time() - started, dict(notifier._waiters)
+
+    result, waited, waiters = asyncio.run(scenario())
+
+    assert result is True
+    assert waited < 1
+    assert waiters == {}
+
+
+def test_waiter_rechecks_for_feedback_stored_elsewhere(monkeypatch):
+    """Without any publish, the periodic check still finds the feedback"""
+    monkeypatch.setattr(feedback_notifier_module, "FEEDBACK_LONG_POLL_RECHECK_SECONDS", 0.02)
+    checks = []
+
+    def is_ready():
+        checks.append(1)
+        return len(checks) >= 3
+
+    result = asyncio.run(FeedbackNotifier().wait_for_feedback("m1", timeout=5, is_ready=is_ready))
+
+    assert result is True
+    assert len(checks) == 3
+
+
+def test_waiter_times_out():
+    """A long-poll without feedback gives up after the timeout"""
+    assert asyncio.run(FeedbackNotifier().wait_for_feedback("m1", timeout=0.05, is_ready=lambda: False)) is False
+
+
+# ============== Stream Route Tests ==============
+class FakeRequest:
+    """A request that disconnects after a number of checks"""
+    def __init__(self, checks_before_disconnect):
+        self.checks = checks_before_disconnect
+
+    async def is_disconnected(self):
+        self.checks -= 1
+        return self.checks < 0
+
+
+@pytest.fixture
+def stream_notifier(monkeypatch):
+    """A fresh notifier for the stream route, recording database reads"""
+    notifier = FeedbackNotifier()
+    reads = []
+    monkeypatch.setattr(notifier, "stored_events", lambda user_id, since: reads.append(since) or [])
+    monkeypatch.setattr(feedback_routes, "feedback_notifier", notifier)
+    notifier.reads = reads
+    return notifier
+
+
+def test_unread_stream_leaves_no_subscriber(stream_notifier):
+    """Opening the response subscribes nothing until it is iterated"""
+    async def scenario():
+        await feedback_routes.stream_feedback_events(FakeRequest(1), {"_id": USER_ID})
+        return dict(stream_notifier._subscribers)
+
+    assert asyncio.run(scenario()) == {}
+
+
+@pytest.mark.parametrize("db_recheck", [False, True])
+def test_stream_reads_the_database_only_when_enabled(stream_notifier, monkeypatch, db_recheck):
+    """With in-process workers the stream is fed by publish alone"""
+    monkeypatch.setattr(feedback_routes, "FEEDBACK_STREAM_DB_RECHECK", db_recheck)
+    monkeypatch.setattr(feedback_routes, "FEEDBACK_STREAM_RECHECK_SECONDS", 0.01)
+    monkeypatch.setattr(feedback_routes, "FEEDBACK_STREAM_KEEPALIVE_SECONDS", 0.05)
+
+    async def scenario():
+        response = await feedback_routes.stream_feedback_events(FakeRequest(2), {"_id": USER_ID})
+        chunks = [await response.body_iterator.__anext__()]
+        await asyncio.sleep(0.02)
+        publish_from_thread(stream_notifier, "m1")
+        chunks += [chunk async for chunk in response.body_iterator]
+        return chunks, dict(stream_notifier._subscribers)
+
+    chunks, subscribers = asyncio.run(scenario())
+
+    assert chunks[0].startswith("event: connected")
+    assert [chunk for chunk in chunks if chunk.startswith("event: feedback_ready")] == [
+        f"event: feedback_ready\ndata: {json.dumps({'message_id': 'm1', 'feedback': FEEDBACK})}\n\n"
+    ]
+    assert bool(stream_notifier.reads) is db_recheck
+    assert subscribers == {}
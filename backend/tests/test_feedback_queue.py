@@ -0,0 +1,121 @@
+import os
+import sys
+import time
+import threading
+import pytest
+from bson import ObjectId
+from datetime import datetime
+from types import SimpleNamespace
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.utils.feedback_queue as feedback_queue_module
+from app.utils.feedback_queue import FeedbackJobQueue
+
+POLL_SECONDS = 0.05
+
+
+class FakeJobs:
+    """In-memory feedback_jobs recording which threads claim and which owners get renewed"""
+    def __init__(self, jobs):
+        self.jobs = jobs
+        self.lock = threading.Lock()
+        self.claim_threads = []
+        self.renewed_owners = []
+
+    def find_one_and_update(self, query, update, sort=None, return_document=None):
+        with self.lock:
+            self.claim_threads.append(threading.current_thread().name)
+            for job in self.jobs:
+                if job["status"] == "pending":
+                    job.update(update["$set"])
+                    job["attempts"] = job.get("attempts", 0) + 1
+                    return dict(job)
+        return None
+
+    def update_many(self, query, update):
+        with self.lock:
+            owners = query["owner"]["$in"]
+            self.renewed_owners += owners
+            return SimpleNamespace(modified_count=len(owners))
+
+    def update_one(self, query, update):
+        with self.lock:
+            for job in self.jobs:
+                if job["_id"] == query["_id"] and job.get("owner") == query["owner"]:
+                    job.update(update["$set"])
+        return SimpleNamespace(modified_count=1)
+
+
+class BlockingFeedbackService:
+    """Feedback service whose generation waits until released"""
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Event()
+
+    def generate_and_store_feedback(self, **kwargs):
+        self.started.set()
+        self.release.wait(5)
+        return "feedback-id"
+
+
+def pending_job():
+    """A job that is due now"""
+    return {
+        "_id": ObjectId(),
+        "user_message_id": "message",
+        "user_id": "user",
+        "conversation_id": "conversation",
+        "transcription": "hello",
+        "status": "pending",
+        "attempts": 0,
+        "run_at": datetime.utcnow()
+    }
+
+
+def make_queue(jobs, service, worker_count):
+    """A queue over the fake collection with fast polling and lease renewal"""
+    queue = FeedbackJobQueue(feedback_service=service, worker_count=worker_count)
+    queue.collection = FakeJobs(jobs)
+    queue._indexes_ready = True
+    return queue
+
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch):
+    """Poll and renew leases every few milliseconds"""
+    monkeypatch.setattr(feedback_queue_module, "FEEDBACK_QUEUE_POLL_SECONDS", POLL_SECONDS)
+    monkeypatch.setattr(feedback_queue_module, "FEEDBACK_JOB_LEASE_RENEW_SECONDS", POLL_SECONDS)
+
+
+# ============== Polling Tests ==============
+def test_idle_workers_share_one_poller():
+    """Only the poller thread queries for jobs, at most once per poll interval"""
+    queue = make_queue([], BlockingFeedbackService(), worker_count=5)
+    queue.start()
+    time.sleep(POLL_SECONDS * 6)
+    queue.stop()
+
+    assert set(queue.collection.claim_threads) == {"feedback-poller"}
+    assert len(queue.collection.claim_threads) <= 10
+
+
+def test_lease_is_renewed_while_job_runs():
+    """A long generation keeps its lease, so no other worker picks the job up"""
+    job = pending_job()
+    service = BlockingFeedbackService()
+    queue = make_queue([job], service, worker_count=2)
+    queue.start()
+    assert service.started.wait(5)
+    time.sleep(POLL_SECONDS * 4)
+    service.release.set()
+
+    deadline = time.monotonic() + 5
+    while job["status"] != "completed" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    queue.stop()
+
+    assert job["status"] == "completed"
+    assert job["owner"] in queue.collection.renewed_owners
+    assert queue._running_owners == set()
@@ -0,0 +1,116 @@
+import os
+import sys
+import json
+import pytest
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.utils.feedback_service as feedback_service_module
+from app.utils.feedback_batcher import PendingFeedback
+from app.utils.feedback_service import FEEDBACK_RESPONSE_SCHEMA, FeedbackService
+
+GRAMMAR_ISSUE = {"issue": "I goes", "correction": "I go", "explanation": "Subject-verb agreement", "severity": 3}
+VOCABULARY_ISSUE = {"original": "big", "better_alternative": "huge", "reason": "Stronger", "example_usage": "A huge house"}
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    """Replace the Gemini JSON call with canned responses, recording the schemas asked for"""
+    calls = []
+
+    def respond(responses):
+        def generate_json_response(prompt, schema):
+            calls.append(schema)
+            response = responses.pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+        monkeypatch.setattr(feedback_service_module, "generate_json_response", generate_json_response)
+        return calls
+
+    return respond
+
+
+@pytest.fixture
+def service():
+    """A feedback service without batching"""
+    return FeedbackService()
+
+
+# ============== Single Call Tests ==============
+def test_feedback_and_issues_come_from_one_call(gemini, service):
+    """One schema-constrained call returns the text and the structured issues"""
+    payload = {"user_feedback": "Good try", "grammar_issues": [GRAMMAR_ISSUE], "vocabulary_issues": [VOCABULARY_ISSUE]}
+    calls = gemini([f"```json\n{json.dumps(payload)}\n```"])
+
+    result = service.request_feedback("I goes to a big house")
+
+    assert calls == [FEEDBACK_RESPONSE_SCHEMA]
+    assert result.user_feedback == "Good try"
+    assert result.get_detailed_feedback() == {"grammar_issues": [GRAMMAR_ISSUE], "vocabulary_issues": [VOCABULARY_ISSUE]}
+
+
+def test_invalid_issues_are_dropped(gemini, service):
+    """An issue that does not match its schema is skipped, the rest of the feedback is kept"""
+    broken = dict(GRAMMAR_ISSUE, severity=9)
+    gemini([json.dumps({"user_feedback": "Ok", "grammar_issues": [broken, GRAMMAR_ISSUE], "vocabulary_issues": [{"original": "x"}]})])
+
+    result = service.request_feedback("I goes")
+
+    assert result.grammar_issues == [GRAMMAR_ISSUE]
+    assert result.vocabulary_issues == []
+
+
+def test_missing_feedback_text_raises(gemini, service):
+    """A response without user_feedback is an error, not empty feedback"""
+    gemini([json.dumps({"user_feedback": "", "grammar_issues": [], "vocabulary_issues": []})])
+
+    with pytest.raises(ValueError):
+        service.request_feedback("hello")
+
+
+@pytest.mark.parametrize("response", ["not json", RuntimeError("quota exceeded")])
+def test_dual_feedback_falls_back_on_errors(gemini, service, response):
+    """generate_dual_feedback returns generic feedback when the call or parsing fails"""
+    gemini([response])
+
+    result = service.generate_dual_feedback("hello")
+
+    assert result.is_fallback
+    assert result.grammar_issues == [] and result.vocabulary_issues == []
+
+
+# ============== Batch Tests ==============
+def pending(message_id, transcription):
+    """A batched feedback request"""
+    return PendingFeedback(message_id=message_id, transcription=transcription, context=None)
+
+
+def test_batch_answers_every_message_from_one_call(gemini, service):
+    """A complete batch response needs no individual calls"""
+    calls = gemini([json.dumps([
+        {"message_id": "a", "user_feedback": "A", "grammar_issues": [], "vocabulary_issues": []},
+        {"message_id": "b", "user_feedback": "B", "grammar_issues": [GRAMMAR_ISSUE], "vocabulary_issues": []}
+    ])])
+
+    results = service.generate_batch_feedback([pending("a", "one"), pending("b", "two")])
+
+    assert len(calls) == 1
+    assert {message_id: result.user_feedback for message_id, result in results.items()} == {"a": "A", "b": "B"}
+
+
+def test_batch_retries_missing_items_and_returns_their_errors(gemini, service):
+    """Items left out of the batch are retried alone; a failed retry is returned, not replaced by fallback text"""
+    error = RuntimeError("quota exceeded")
+    gemini([
+        json.dumps([{"message_id": "a", "user_feedback": "A", "grammar_issues": [], "vocabulary_issues": []}]),
+        json.dumps({"user_feedback": "B", "grammar_issues": [], "vocabulary_issues": []}),
+        error
+    ])
+
+    results = service.generate_batch_feedback([pending("a", "one"), pending("b", "two"), pending("c", "three")])
+
+    assert results["a"].user_feedback == "A"
+    assert results["b"].user_feedback == "B"
+    assert results["c"] is error
@@ -0,0 +1,154 @@
+import os
+import sys
+import random
+import pytest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.utils.load_smoothing as load_smoothing_module
+from app.utils.load_smoothing import DAY_FORMAT, DueLoadBalancer, fuzz_window
+from app.utils.schedulers import MAX_INTERVAL_DAYS
+
+NOW = datetime(2024, 1, 1, 12)
+
+
+@pytest.fixture
+def balancer(monkeypatch):
+    """A balancer with load balancing on and no global load"""
+    monkeypatch.setattr(load_smoothing_module, "MISTAKE_LOAD_BALANCING", True)
+    balancer = DueLoadBalancer()
+    monkeypatch.setattr(balancer, "global_load", lambda: {})
+    return balancer
+
+
+# ============== Fuzz Window Tests ==============
+def test_short_intervals_are_not_fuzzed():
+    """Intervals below two days are kept exact"""
+    assert fuzz_window(0) == (0, 0)
+    assert fuzz_window(1) == (1, 1)
+
+
+def test_window_is_symmetric_below_the_cap():
+    """The window is centred on the interval and at least one day wide on each side"""
+    assert fuzz_window(2) == (1, 3)
+    assert fuzz_window(10) == (9, 11)
+    assert fuzz_window(20) == (18, 22)
+
+
+def test_window_never_passes_max_interval():
+    """Near the cap the window narrows on both sides, and intervals at the cap are kept"""
+    for interval in range(MAX_INTERVAL_DAYS + 1):
+        shortest, longest = fuzz_window(interval)
+        assert 0 <= shortest <= longest <= MAX_INTERVAL_DAYS
+
+    assert fuzz_window(MAX_INTERVAL_DAYS - 1) == (MAX_INTERVAL_DAYS - 2, MAX_INTERVAL_DAYS)
+    assert fuzz_window(MAX_INTERVAL_DAYS) == (MAX_INTERVAL_DAYS, MAX_INTERVAL_DAYS)
+
+
+# ============== Offset Table Tests ==============
+def test_offsets_stay_inside_the_window(balancer):
+    """Every interval is shifted to a day of its own fuzz window"""
+    offsets = balancer.offset_table({}, NOW, random.Random(7))
+
+    assert len(offsets) == MAX_INTERVAL_DAYS + 1
+    for interval, offset in enumerate(offsets):
+        shortest, longest = fuzz_window(interval)
+        assert shortest <= interval + offset <= longest
+
+
+def test_mean_offset_is_zero_near_the_cap(balancer):
+    """Without load differences, fuzzing does not shorten intervals at or near the cap"""
+    rng = random.Random(7)
+    tables = [balancer.offset_table({}, NOW, rng) for _ in range(2000)]
+
+    for interval in range(MAX_INTERVAL_DAYS - 4, MAX_INTERVAL_DAYS + 1):
+        mean_offset = sum(offsets[interval] for offsets in tables) / len(tables)
+        assert mean_offset == pytest.approx(0, abs=0.1)
+
+
+def test_offsets_prefer_the_lightest_day(balancer):
+    """A day with nothing due wins over days with many reviews due"""
+    busy = {(NOW + timedelta(days=days)).strftime(DAY_FORMAT): 1000 for days in (9, 10)}
+
+    offsets = balancer.offset_table(busy, NOW, random.Random(7))
+
+    assert 10 + offsets[10] == 11
+
+
+def test_disabled_balancing_keeps_exact_intervals(balancer, monkeypatch):
+    """With load balancing off every shift is zero"""
+    monkeypatch.setattr(load_smoothing_module, "MISTAKE_LOAD_BALANCING", False)
+
+    assert balancer.offset_table({}, NOW) == [0] * (MAX_INTERVAL_DAYS + 1)
+
+
+# ============== Global Load Tests ==============
+class FakeDueLoad:
+    """db.due_load keeping one count per day document"""
+    def __init__(self, counts=None):
+        self.counts = dict(counts or {})
+        self.writes = []
+
+    def bulk_write(self, operations, ordered=True):
+        self.writes.append(len(operations))
+        for operation in operations:
+            day = operation._filter["_id"]
+            self.counts[day] = self.counts.get(day, 0) + operation._doc["$inc"]["count"]
+
+    def find(self, query):
+        bounds = query["_id"]
+        return [
+            {"_id": day, "count": count} for day, count in self.counts.items()
+            if bounds["$gte"] <= day <= bounds["$lte"]
+        ]
+
+
+@pytest.fixture
+def due_load(monkeypatch):
+    """A fake global load collection"""
+    collection = FakeDueLoad()
+    monkeypatch.setattr(load_smoothing_module, "db", SimpleNamespace(due_load=collection))
+    return collection
+
+
+def day(days_ahead: int) -> str:
+    """The day `days_ahead` days from now"""
+    return (datetime.utcnow() + timedelta(days=days_ahead)).strftime(DAY_FORMAT)
+
+
+def test_deltas_are_summed_before_writing(due_load, monkeypatch):
+    """Changes between flushes become one upsert per day; past days are skipped"""
+    monkeypatch.setattr(load_smoothing_module, "MISTAKE_GLOBAL_LOAD_FLUSH_SECONDS", 3600)
+    balancer = DueLoadBalancer()
+
+    balancer.apply_delta({day(1): 1, day(-1): -1})
+    balancer.apply_delta({day(1): 2, day(2): 1})
+    balancer.apply_delta({day(2): -1})
+    assert due_load.writes == []
+
+    balancer.flush()
+
+    assert due_load.writes == [1]
+    assert due_load.counts == {day(1): 3}
+
+
+def test_deltas_are_written_once_the_interval_passes(due_load, monkeypatch):
+    """With no flush interval every change is written straight away"""
+    monkeypatch.setattr(load_smoothing_module, "MISTAKE_GLOBAL_LOAD_FLUSH_SECONDS", 0)
+    balancer = DueLoadBalancer()
+
+    balancer.apply_delta({day(1): 1})
+    balancer.apply_delta({day(1): 1})
+
+    assert due_load.writes == [1, 1]
+    assert due_load.counts == {day(1): 2}
+
+
+def test_global_load_reads_the_days_ahead(due_load):
+    """Only days from today up to the interval cap are read, and empty days are left out"""
+    due_load.counts.update({day(-1): 5, day(0): 2, day(3): 0, day(MAX_INTERVAL_DAYS): 4, day(MAX_INTERVAL_DAYS + 5): 9})
+
+    assert DueLoadBalancer().global_load() == {day(0): 2, day(MAX_INTERVAL_DAYS): 4}
@@ -0,0 +1,64 @@
+import os
+import sys
+import pytest
+from bson import ObjectId
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.main import app
+from app.config.database import db
+from app.utils.auth import get_current_user
+
+TEST_USER_ID = ObjectId()
+
+client = TestClient(app)
+
+@pytest.fixture(autouse=True)
+def setup_teardown():
+    """Fixture to authenticate as the test user and clear their mistakes before and after each test"""
+    app.dependency_overrides[get_current_user] = lambda: {"_id": TEST_USER_ID}
+    db.mistakes.delete_many({"user_id": TEST_USER_ID})
+    yield
+    db.mistakes.delete_many({"user_id": TEST_USER_ID})
+    app.dependency_overrides.pop(get_current_user, None)
+
+def insert_mistake(original_text: str, mistake_type: str, minutes_ago: int):
+    """Insert a stored mistake of the given type"""
+    db.mistakes.insert_one({
+        "user_id": TEST_USER_ID,
+        "type": mistake_type,
+        "original_text": original_text,
+        "correction": original_text,
+        "explanation": "",
+        "status": "NEW",
+        "last_occurred": datetime.utcnow() - timedelta(minutes=minutes_ago),
+        "next_practice_date": datetime.utcnow()
+    })
+
+# ============== List Mistakes Tests ==============
+def test_list_mistakes_filters_by_type():
+    """The lower-case type filter matches the upper-case stored types"""
+    insert_mistake("I goes home", "GRAMMAR", minutes_ago=2)
+    insert_mistake("very big", "VOCABULARY", minutes_ago=1)
+    insert_mistake("She go to school", "GRAMMAR", minutes_ago=0)
+
+    response = client.get("/api/mistakes", params={"type": "grammar"})
+
+    assert response.status_code == 200, f"Response: {response.json()}"
+    data = response.json()
+    assert data["total"] == 2
+    assert [item["original_text"] for item in data["items"]] == ["She go to school", "I goes home"]
+    assert {item["type"] for item in data["items"]} == {"GRAMMAR"}
+
+def test_list_mistakes_without_filters():
+    """Without filters every mistake is listed, most recently made first"""
+    insert_mistake("I goes home", "GRAMMAR", minutes_ago=1)
+    insert_mistake("very big", "VOCABULARY", minutes_ago=0)
+
+    data = client.get("/api/mistakes").json()
+
+    assert data["total"] == 2
+    assert [item["type"] for item in data["items"]] == ["VOCABULARY", "GRAMMAR"]
@@ -0,0 +1,306 @@
+import os
+import sys
+import pytest
+from bson import ObjectId
+from datetime import datetime, timedelta
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config.database import db
+from app.utils.load_smoothing import due_load_balancer
+import app.utils.mistake_service as mistake_service_module
+from app.utils.mistake_service import MistakeService
+
+TEST_USER_ID = ObjectId()
+
+@pytest.fixture(autouse=True)
+def setup_teardown(monkeypatch):
+    """Fixture to clear the test user's mistakes, stats, due queue and sessions before and after each test"""
+    # Keep the test mistakes out of the global due load
+    monkeypatch.setattr(due_load_balancer, "apply_delta", lambda day_delta: None)
+    for collection in (db.mistake_stats, db.mistake_queues):
+        collection.delete_many({"_id": TEST_USER_ID})
+    for collection in (db.mistakes, db.practice_sessions):
+        collection.delete_many({"user_id": TEST_USER_ID})
+    yield
+    for collection in (db.mistake_stats, db.mistake_queues):
+        collection.delete_many({"_id": TEST_USER_ID})
+    for collection in (db.mistakes, db.practice_sessions):
+        collection.delete_many({"user_id": TEST_USER_ID})
+
+@pytest.fixture
+def service():
+    """A mistake service"""
+    return MistakeService()
+
+def make_mistake(original_text: str, mistake_type: str = "GRAMMAR", days_due: float = 0) -> dict:
+    """A mistake as built from feedback, due `days_due` days from now"""
+    now = datetime.utcnow()
+    return {
+        "user_id": TEST_USER_ID,
+        "type": mistake_type,
+        "original_text": original_text,
+        "correction": f"{original_text} (corrected)",
+        "explanation": "",
+        "severity": 3,
+        "created_at": now,
+        "last_occurred": now,
+        "frequency": 1,
+        "practice_count": 0,
+        "success_count": 0,
+        "next_practice_date": now + timedelta(days=days_due),
+        "in_drill_queue": True,
+        "is_learned": False,
+        "mastery_level": 0,
+        "status": "NEW"
+    }
+
+def stored_statistics() -> dict:
+    """The materialized stats document without bookkeeping fields and emptied counters"""
+    stats = db.mistake_stats.find_one({"_id": TEST_USER_ID})
+    return {
+        field: {key: count for key, count in stats.get(field, {}).items() if count}
+        for field in ("status", "type", "due_histogram")
+    } | {"total": stats["total"]}
+
+# ============== Statistics Tests ==============
+def test_statistics_are_rebuilt_when_missing(service):
+    """Without a stats document, the statistics come from one aggregation and are stored"""
+    service._store_unique_mistakes(str(TEST_USER_ID), [
+        make_mistake("I goes home", days_due=-1),
+        make_mistake("She go to school", days_due=2),
+        make_mistake("very big", mistake_type="VOCABULARY", days_due=-2)
+    ])
+    assert db.mistake_stats.find_one({"_id": TEST_USER_ID}) is None
+
+    statistics = service.get_mistake_statistics(str(TEST_USER_ID))
+
+    assert statistics.total_count == 3
+    assert statistics.new_count == 3
+    assert statistics.type_distribution == {"GRAMMAR": 2, "VOCABULARY": 1}
+    assert statistics.due_for_practice == 2
+    assert db.mistake_stats.find_one({"_id": TEST_USER_ID})["total"] == 3
+
+def test_incremental_statistics_match_reconcile(service):
+    """Counters kept up to date by stores and practice equal a full recount"""
+    service.get_mistake_statistics(str(TEST_USER_ID))
+    service._store_unique_mistakes(str(TEST_USER_ID), [
+        make_mistake("I goes home", days_due=-1),
+        make_mistake("She go to school", days_due=-1),
+        make_mistake("very big", mistake_type="VOCABULARY", days_due=3)
+    ])
+    service._store_unique_mistakes(str(TEST_USER_ID), [make_mistake("I goes home"), make_mistake("He have a car")])
+    mistakes = list(db.mistakes.find({"user_id": TEST_USER_ID}).sort("original_text", 1))
+    service.record_practice_results(str(TEST_USER_ID), [
+        {"mistake_id": str(mistakes[0]["_id"]), "was_successful": True, "user_answer": "a"},
+        {"mistake_id": str(mistakes[1]["_id"]), "was_successful": False, "user_answer": "b"}
+    ])
+
+    incremental = stored_statistics()
+    service.reconcile_mistake_stats(str(TEST_USER_ID))
+
+    assert incremental == stored_statistics()
+    assert incremental["total"] == 4
+    assert incremental["status"] == {"NEW": 3, "LEARNING": 1}
+# ============== Fingerprint Tests ==============
+def test_repeated_mistake_increments_frequency(service):
+    """The same mistake, within a batch or later, is one document with a growing frequency"""
+    stored = service._store_unique_mistakes(str(TEST_USER_ID), [make_mistake("I goes home."), make_mistake("i goes  home")])
+    service._store_unique_mistakes(str(TEST_USER_ID), [make_mistake("I GOES HOME")])
+
+    mistakes = list(db.mistakes.find({"user_id": TEST_USER_ID}))
+    assert stored == 1
+    assert len(mistakes) == 1
+    assert mistakes[0]["frequency"] == 3
+    assert mistakes[0]["original_text"] == "I goes home."
+
+def test_same_text_of_another_type_is_a_separate_mistake(service):
+    """Fingerprints are unique per type"""
+    service._store_unique_mistakes(str(TEST_USER_ID), [make_mistake("big"), make_mistake("big", mistake_type="VOCABULARY")])
+
+    assert db.mistakes.count_documents({"user_id": TEST_USER_ID}) == 2
+
+def test_mastered_mistake_made_again_starts_a_new_item(service):
+    """Mastering a mistake releases its fingerprint"""
+    service._store_unique_mistakes(str(TEST_USER_ID), [make_mistake("I goes home")])
+    mistake = db.mistakes.find_one({"user_id": TEST_USER_ID})
+    service.record_practice_results(str(TEST_USER_ID), [
+        {"mistake_id": str(mistake["_id"]), "was_successful": True, "user_answer": "I go home"}
+        for _ in range(3)
+    ])
+
+    service._store_unique_mistakes(str(TEST_USER_ID), [make_mistake("I goes home")])
+
+    mistakes = list(db.mistakes.find({"user_id": TEST_USER_ID}).sort("created_at", 1))
+    assert [m["status"] for m in mistakes] == ["MASTERED", "NEW"]
+    assert "fingerprint" not in mistakes[0]
+    assert mistakes[1]["frequency"] == 1
+
+def test_ensure_indexes_leaves_legacy_mistakes_alone(service, monkeypatch):
+    """Mistakes without a fingerprint are left for the migration command"""
+    monkeypatch.setattr(MistakeService, "_indexes_ready", False)
+    legacy = make_mistake("I goes home")
+    db.mistakes.insert_one(legacy)
+    before = db.mistakes.find_one({"_id": legacy["_id"]})
+
+    service.ensure_indexes()
+
+    assert db.mistakes.find_one({"_id": legacy["_id"]}) == before
+# ============== Practice Results Tests ==============
+def test_session_results_are_one_bulk_write(service, monkeypatch):
+    """Every result goes in one bulk write; unknown mistakes get an error entry"""
+    service._store_unique_mistakes(str(TEST_USER_ID), [make_mistake("I goes home"), make_mistake("She go to school")])
+    mistakes = {m["original_text"]: str(m["_id"]) for m in db.mistakes.find({"user_id": TEST_USER_ID})}
+    collection_type = type(db.mistakes)
+    bulk_write = collection_type.bulk_write
+    calls = []
+
+    def counting_bulk_write(self, operations, *args, **kwargs):
+        calls.append(len(operations))
+        return bulk_write(self, operations, *args, **kwargs)
+
+    monkeypatch.setattr(collection_type, "bulk_write", counting_bulk_write)
+    unknown = str(ObjectId())
+
+    responses = service.record_practice_results(str(TEST_USER_ID), [
+        {"mistake_id": mistakes["I goes home"], "was_successful": True, "user_answer": "I go home"},
+        {"mistake_id": mistakes["She go to school"], "was_successful": False, "user_answer": "She go"},
+        {"mistake_id": unknown, "was_successful": True, "user_answer": ""}
+    ])
+
+    assert calls == [3]
+    assert [(r["mistake_id"], r.get("status"), r.get("mastery_level")) for r in responses[:2]] == [
+        (mistakes["I goes home"], "LEARNING", 100),
+        (mistakes["She go to school"], "NEW", 0)
+    ]
+    assert all(r["next_practice_date"] > datetime.utcnow() for r in responses[:2])
+    assert responses[2] == {"mistake_id": unknown, "error": "Mistake not found"}
+
+def test_repeated_results_build_up_to_mastery(service):
+    """Results for the same mistake apply in order: 80% after three attempts is mastered"""
+    service._store_unique_mistakes(str(TEST_USER_ID), [make_mistake("I goes home")])
+    mistake_id = str(db.mistakes.find_one({"user_id": TEST_USER_ID})["_id"])
+
+    service.record_practice_results(str(TEST_USER_ID), [
+        {"mistake_id": mistake_id, "was_successful": was_successful, "user_answer": ""}
+        for was_successful in (False, True, True)
+    ])
+    learning = db.mistakes.find_one({"_id": ObjectId(mistake_id)})
+    service.record_practice_results(str(TEST_USER_ID), [
+        {"mistake_id": mistake_id, "was_successful": was_successful, "user_answer": ""}
+        for was_successful in (True, True)
+    ])
+    mastered = db.mistakes.find_one({"_id": ObjectId(mistake_id)})
+
+    assert (learning["practice_count"], learning["success_count"], learning["status"]) == (3, 2, "LEARNING")
+    assert (mastered["practice_count"], mastered["mastery_level"], mastered["status"]) == (5, 80, "MASTERED")
+
+def test_results_are_attached_to_the_session(service):
+    """With a session id, the answers are pushed to the practice session"""
+    service._store_unique_mistakes(str(TEST_USER_ID), [make_mistake("I goes home")])
+    mistake_id = str(db.mistakes.find_one({"user_id": TEST_USER_ID})["_id"])
+    session_id = db.practice_sessions.insert_one({"user_id": TEST_USER_ID, "mistakes_practiced": []}).inserted_id
+
+    service.record_practice_results(
+        str(TEST_USER_ID),
+        [{"mistake_id": mistake_id, "was_successful": True, "user_answer": "I go home"}],
+        session_id=str(session_id)
+    )
+
+    session = db.practice_sessions.find_one({"_id": session_id})
+    assert [(p["mistake_id"], p["user_answer"], p["was_successful"]) for p in session["mistakes_practiced"]] == [
+        (mistake_id, "I go home", True)
+    ]
+    assert session["completed_at"]
+# ============== Due Queue Tests ==============
+def due_texts(service, limit: int = 5) -> list:
+    """Original texts of the due mistakes, in queue order"""
+    return [mistake["original_text"] for mistake in service.get_due_mistakes(str(TEST_USER_ID), limit)]
+
+def test_missing_queue_is_rebuilt_in_due_order(service):
+    """The first read builds the queue; only due drill mistakes come back, earliest first"""
+    db.mistakes.insert_many([
+        make_mistake("two days late", days_due=-2),
+        make_mistake("not due", days_due=1),
+        make_mistake("one day late", days_due=-1),
+        {**make_mistake("out of the drill", days_due=-3), "in_drill_queue": False},
+        make_mistake("three days late", days_due=-3)
+    ])
+
+    assert due_texts(service) == ["three days late", "two days late", "one day late"]
+    assert due_texts(service, limit=2) == ["three days late", "two days late"]
+    queue = db.mistake_queues.find_one({"_id": TEST_USER_ID})
+    assert len(queue["items"]) == 4 and not queue["truncated"]
+
+def test_queue_follows_stores_and_practice(service):
+    """Stored mistakes are added to an existing queue, practiced ones move to their new date"""
+    service._store_unique_mistakes(str(TEST_USER_ID), [make_mistake("I goes home", days_due=-1)])
+    due_texts(service)
+    rebuilt_at = db.mistake_queues.find_one({"_id": TEST_USER_ID})["rebuilt_at"]
+
+    service._store_unique_mistakes(str(TEST_USER_ID), [make_mistake("She go to school", days_due=-2)])
+    after_store = due_texts(service)
+    mistake = db.mistakes.find_one({"user_id": TEST_USER_ID, "original_text": "She go to school"})
+    service.record_practice_results(str(TEST_USER_ID), [
+        {"mistake_id": str(mistake["_id"]), "was_successful": True, "user_answer": "She goes to school"}
+    ])
+
+    assert after_store == ["She go to school", "I goes home"]
+    assert due_texts(service) == ["I goes home"]
+    queue = db.mistake_queues.find_one({"_id": TEST_USER_ID})
+    assert queue["rebuilt_at"] == rebuilt_at
+    assert [item["mistake_id"] for item in queue["items"]].count(mistake["_id"]) == 1
+
+def test_capped_queue_is_rebuilt_when_low(service, monkeypatch):
+    """A queue that dropped entries at the cap is rebuilt once it runs low"""
+    monkeypatch.setattr(mistake_service_module, "MISTAKE_QUEUE_SIZE", 4)
+    db.mistakes.insert_many([make_mistake(f"mistake {index}", days_due=index - 10) for index in range(6)])
+
+    assert due_texts(service, limit=2) == ["mistake 0", "mistake 1"]
+    queue = db.mistake_queues.find_one({"_id": TEST_USER_ID})
+    assert len(queue["items"]) == 4 and queue["truncated"]
+
+    db.mistake_queues.update_one({"_id": TEST_USER_ID}, {"$set": {"items": queue["items"][3:]}})
+
+    assert due_texts(service, limit=2) == ["mistake 0", "mistake 1"]
+def test_practiced_mistakes_do_not_hide_dropped_ones(service, monkeypatch):
+    """Practiced entries later than the cutoff stay out, so mistakes dropped by the cap are still served"""
+    monkeypatch.setattr(mistake_service_module, "MISTAKE_QUEUE_SIZE", 4)
+    db.mistakes.insert_many([make_mistake(f"mistake {index}", days_due=index - 10) for index in range(6)])
+    assert due_texts(service, limit=1) == ["mistake 0"]
+    practiced = db.mistakes.find({"user_id": TEST_USER_ID, "original_text": {"$in": ["mistake 0", "mistake 1", "mistake 2"]}})
+    service.record_practice_results(str(TEST_USER_ID), [
+        {"mistake_id": str(mistake["_id"]), "was_successful": True, "user_answer": ""} for mistake in practiced
+    ])
+
+    queue = db.mistake_queues.find_one({"_id": TEST_USER_ID})
+    assert len(queue["items"]) == 1
+
+    assert due_texts(service, limit=1) == ["mistake 3"]
+    assert due_texts(service) == ["mistake 3", "mistake 4", "mistake 5"]
+
+def test_queue_is_rebuilt_once_its_cutoff_passes(service, monkeypatch):
+    """A truncated queue built before its cutoff is rebuilt once the cutoff is in the past"""
+    monkeypatch.setattr(mistake_service_module, "MISTAKE_QUEUE_SIZE", 4)
+    db.mistakes.insert_many([make_mistake(f"mistake {index}", days_due=index - 10) for index in range(6)])
+    due_texts(service)
+    queue = db.mistake_queues.find_one({"_id": TEST_USER_ID})
+    built_before_cutoff = queue["cutoff"] - timedelta(days=1)
+    db.mistake_queues.update_one({"_id": TEST_USER_ID}, {"$set": {"rebuilt_at": built_before_cutoff}})
+
+    due_texts(service, limit=1)
+    rebuilt = db.mistake_queues.find_one({"_id": TEST_USER_ID})
+    due_texts(service, limit=1)
+
+    assert queue["cutoff"] == queue["items"][-1]["next_practice_date"]
+    assert rebuilt["rebuilt_at"] > queue["cutoff"]
+    assert db.mistake_queues.find_one({"_id": TEST_USER_ID})["rebuilt_at"] == rebuilt["rebuilt_at"]
+
+def test_rebuild_includes_mistakes_without_a_drill_flag(service):
+    """Legacy mistakes without in_drill_queue are queued, like in the other drill queries"""
+    legacy = make_mistake("I goes home", days_due=-1)
+    legacy.pop("in_drill_queue")
+    db.mistakes.insert_one(legacy)
+
+    assert due_texts(service) == ["I goes home"]
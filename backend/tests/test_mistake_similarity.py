@@ -0,0 +1,77 @@
+import os
+import sys
+import random
+import string
+import pytest
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.mistake_service import mistake_fingerprint
+from app.utils.mistake_similarity import (
+    MISTAKE_LSH_BANDS,
+    jaccard_similarity,
+    lsh_bands,
+    normalize_mistake_text,
+    shingles
+)
+
+
+def share_band(first, second):
+    """Whether two texts are near-duplicate candidates"""
+    return bool(set(lsh_bands(first)) & set(lsh_bands(second)))
+
+
+# ============== Fingerprint Tests ==============
+def test_fingerprint_ignores_case_punctuation_and_spacing():
+    """Spelling variants of the same mistake get one fingerprint"""
+    assert normalize_mistake_text("  I GOES, home! ") == "i goes home"
+    assert mistake_fingerprint("I goes home.") == mistake_fingerprint("i  goes home")
+
+
+def test_fingerprint_keeps_apostrophes_and_words():
+    """Different words give different fingerprints"""
+    assert mistake_fingerprint("I don't goes") != mistake_fingerprint("I dont goes")
+    assert mistake_fingerprint("I goes home") != mistake_fingerprint("I go home")
+
+
+# ============== Similarity Tests ==============
+def test_short_texts_have_one_shingle():
+    """A text shorter than a shingle is still comparable"""
+    assert shingles("") == {"  "}
+    assert jaccard_similarity("a", "a") == 1.0
+
+
+def test_jaccard_similarity_bounds():
+    """Identical texts score 1, unrelated texts close to 0"""
+    assert jaccard_similarity("I goes home.", "i goes home") == 1.0
+    assert jaccard_similarity("I goes home", "xyzzy qwv") == 0.0
+    assert 0.5 < jaccard_similarity("I goes to the school", "I goes to school") < 1.0
+
+
+# ============== LSH Banding Tests ==============
+def test_band_keys_are_stable_and_numbered():
+    """One key per band, prefixed with the band number, the same on every call"""
+    keys = lsh_bands("I goes home")
+
+    assert keys == lsh_bands("i goes home!")
+    assert [key.split(":")[0] for key in keys] == [str(band) for band in range(MISTAKE_LSH_BANDS)]
+
+
+def test_near_duplicates_share_a_band():
+    """Texts with high Jaccard similarity become candidates"""
+    first, second = "she have been living here for years", "she have been living here for many years"
+
+    assert jaccard_similarity(first, second) >= 0.8
+    assert share_band(first, second)
+
+
+def test_unrelated_texts_rarely_share_a_band():
+    """Random texts seldom collide, so candidate lookups stay small"""
+    rng = random.Random(3)
+    texts = ["".join(rng.choice(string.ascii_lowercase + " ") for _ in range(30)) for _ in range(40)]
+
+    pairs = [(a, b) for i, a in enumerate(texts) for b in texts[i + 1:]]
+    collisions = sum(share_band(a, b) for a, b in pairs)
+
+    assert collisions / len(pairs) < 0.05
@@ -0,0 +1,83 @@
+import os
+import sys
+import pytest
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.practice_exercises import (
+    BLANK,
+    CHOOSE_CORRECT,
+    EXERCISE_TYPES,
+    FILL_IN_THE_BLANK,
+    REWRITE,
+    parse_exercises,
+    select_exercise
+)
+
+
+@pytest.fixture
+def valid_entries():
+    """One valid exercise of each type, in reverse rotation order"""
+    return [
+        {"type": CHOOSE_CORRECT, "prompt": "Pick the correct one", "options": ["He go", "He goes", "He goes"], "answer": "He goes"},
+        {"type": REWRITE, "prompt": "Rewrite: She don't like it", "answer": "She doesn't like it"},
+        {"type": FILL_IN_THE_BLANK, "prompt": f"He {BLANK} to school every day", "answer": "goes"}
+    ]
+
+
+# ============== Parsing Tests ==============
+def test_valid_exercises_are_kept_in_rotation_order(valid_entries):
+    """Every type is kept once, ordered by EXERCISE_TYPES"""
+    exercises = parse_exercises(valid_entries)
+
+    assert [exercise["type"] for exercise in exercises] == EXERCISE_TYPES
+    assert exercises[2]["options"] == ["He go", "He goes"]
+
+
+def test_invalid_exercises_are_dropped():
+    """Unknown types, missing answers, blanks and choices without the answer are rejected"""
+    exercises = parse_exercises([
+        "not an object",
+        {"type": "ESSAY", "prompt": "Write an essay", "answer": "..."},
+        {"type": REWRITE, "prompt": "Rewrite this", "answer": "  "},
+        {"type": FILL_IN_THE_BLANK, "prompt": "No blank here", "answer": "goes"},
+        {"type": CHOOSE_CORRECT, "prompt": "Pick one", "options": ["a", "b"], "answer": "c"},
+        {"type": CHOOSE_CORRECT, "prompt": "Pick one", "options": ["a"], "answer": "a"}
+    ])
+
+    assert exercises == []
+
+
+def test_duplicate_types_keep_the_first():
+    """A second exercise of the same type is ignored"""
+    exercises = parse_exercises([
+        {"type": REWRITE, "prompt": "First", "answer": "one"},
+        {"type": REWRITE, "prompt": "Second", "answer": "two"}
+    ])
+
+    assert [exercise["prompt"] for exercise in exercises] == ["First"]
+
+
+def test_missing_entries_parse_to_nothing():
+    """A mistake the model skipped has no exercises"""
+    assert parse_exercises(None) == []
+
+
+# ============== Rotation Tests ==============
+def test_exercises_rotate_with_practice_count(valid_entries):
+    """Consecutive practices show each exercise in turn, then start over"""
+    exercises = parse_exercises(valid_entries)
+
+    chosen = [
+        select_exercise({"exercises": exercises, "practice_count": count})["type"]
+        for count in range(len(exercises) + 1)
+    ]
+
+    assert chosen == EXERCISE_TYPES + [EXERCISE_TYPES[0]]
+
+
+def test_no_exercise_without_generated_exercises():
+    """Mistakes without exercises fall back to the template prompt"""
+    assert select_exercise({"practice_count": 2}) is None
+    assert select_exercise({"exercises": [], "practice_count": 2}) is None
@@ -0,0 +1,79 @@
+import os
+import sys
+import random
+import pytest
+from bson import ObjectId
+from datetime import datetime, timedelta
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config.database import db
+from app.utils.spaced_repetition import prioritize_mistakes_for_review, review_priority_pipeline
+
+TEST_USER_ID = ObjectId()
+
+@pytest.fixture(autouse=True)
+def setup_teardown():
+    """Fixture to clear the test user's mistakes before and after each test"""
+    db.mistakes.delete_many({"user_id": TEST_USER_ID})
+    yield
+    db.mistakes.delete_many({"user_id": TEST_USER_ID})
+
+def reference_time() -> datetime:
+    """Current time truncated to milliseconds, the precision MongoDB stores"""
+    now = datetime.utcnow()
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+def insert_mistakes(now: datetime, count: int = 300, seed: int = 7) -> list:
+    """Insert mistakes covering ties, missing fields, ISO string dates and inactive items"""
+    rng = random.Random(seed)
+    mistakes = []
+    for _ in range(count):
+        last_occurred = now - timedelta(milliseconds=rng.randint(0, 60 * 86400 * 1000))
+        next_practice = now + timedelta(milliseconds=rng.randint(-20 * 86400 * 1000, 20 * 86400 * 1000))
+        mistake = {
+            "user_id": TEST_USER_ID,
+            "type": "GRAMMAR",
+            "frequency": rng.randint(1, 8),
+            "severity": rng.randint(1, 5),
+            "in_drill_queue": rng.random() > 0.1,
+            "last_occurred": last_occurred,
+            "next_practice_date": next_practice
+        }
+        if rng.random() < 0.2:
+            mistake["failed_practices"] = rng.randint(0, 6)
+        if rng.random() < 0.1:
+            mistake["last_occurred"] = last_occurred.isoformat(timespec="milliseconds") + "Z"
+        if rng.random() < 0.05:
+            del mistake["severity"]
+        if rng.random() < 0.05:
+            del mistake["next_practice_date"]
+        mistakes.append(mistake)
+
+    db.mistakes.insert_many(mistakes)
+    return sorted(mistakes, key=lambda mistake: mistake["_id"])
+
+# ============== Parity Tests ==============
+@pytest.mark.parametrize("limit", [1, 5, 20, 500])
+def test_database_ranking_matches_python(limit):
+    """The aggregation returns the same mistakes, in the same order, as prioritize_mistakes_for_review"""
+    now = reference_time()
+    mistakes = insert_mistakes(now)
+
+    expected = prioritize_mistakes_for_review([dict(m) for m in mistakes], limit=limit, now=now)
+    actual = list(db.mistakes.aggregate(review_priority_pipeline(TEST_USER_ID, limit, now)))
+
+    assert [m["_id"] for m in actual] == [m["_id"] for m in expected]
+    assert [m["priority_score"] for m in actual] == pytest.approx([m["priority_score"] for m in expected])
+
+def test_database_ranking_excludes_inactive_mistakes():
+    """Mistakes outside the drill queue are never returned"""
+    now = reference_time()
+    insert_mistakes(now, count=50)
+
+    actual = list(db.mistakes.aggregate(review_priority_pipeline(TEST_USER_ID, 100, now)))
+
+    assert actual
+    assert all(m["in_drill_queue"] for m in actual)
+    assert all("_review" not in m for m in actual)
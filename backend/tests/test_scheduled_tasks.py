@@ -0,0 +1,162 @@
+import os
+import sys
+import json
+import pytest
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime, timedelta
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.utils.event_handler as event_handler_module
+from app.config.database import db
+from app.utils.event_handler import TASK_MAX_ATTEMPTS, EventHandler
+
+TASK_NAME = f"test_task_{ObjectId()}"
+
+@pytest.fixture(autouse=True)
+def setup_teardown():
+    """Fixture to clear this module's scheduled tasks before and after each test"""
+    db.scheduled_tasks.delete_many({"task_name": TASK_NAME})
+    yield
+    db.scheduled_tasks.delete_many({"task_name": TASK_NAME})
+
+@pytest.fixture
+def handlers():
+    """Two handlers standing in for two processes, with a test task that fails on request"""
+    def handler(data):
+        if data.get("fail"):
+            raise RuntimeError("task failed")
+
+    pair = [EventHandler(), EventHandler()]
+    for event_handler in pair:
+        event_handler.register_task_handler(TASK_NAME, handler)
+    return pair
+
+def insert_task(**fields) -> ObjectId:
+    """Insert a due pending task"""
+    task = {"_id": ObjectId(), "task_name": TASK_NAME, "data": {}, "status": "pending", "scheduled_time": datetime.utcnow(), **fields}
+    db.scheduled_tasks.insert_one(task)
+    return task["_id"]
+
+# ============== Lease Tests ==============
+def test_only_one_process_claims_a_task(handlers):
+    """The second claim fails while the first owner holds the lease"""
+    task_id = insert_task()
+
+    first = handlers[0]._claim_task(str(task_id))
+    second = handlers[1]._claim_task(str(task_id))
+
+    assert first["owner"] == handlers[0].owner_id
+    assert first["attempts"] == 1
+    assert second is None
+
+def test_expired_lease_can_be_claimed_again(handlers):
+    """A task whose owner stopped renewing is taken over by another process"""
+    task_id = insert_task(status="processing", owner="dead", lease_expires_at=datetime.utcnow() - timedelta(seconds=1), attempts=1)
+
+    task = handlers[1]._claim_task(str(task_id))
+
+    assert task["owner"] == handlers[1].owner_id
+    assert task["attempts"] == 2
+
+def test_expired_lease_out_of_attempts_is_not_claimed(handlers):
+    """A task that used every attempt is left for recovery to fail, not run again"""
+    task_id = insert_task(status="processing", owner="dead", lease_expires_at=datetime.utcnow() - timedelta(seconds=1), attempts=TASK_MAX_ATTEMPTS)
+
+    assert handlers[1]._claim_task(str(task_id)) is None
+    assert db.scheduled_tasks.find_one({"_id": task_id})["attempts"] == TASK_MAX_ATTEMPTS
+
+def test_recovery_fails_tasks_out_of_attempts(handlers):
+    """Expired tasks go back to pending, unless they used every attempt"""
+    expired = datetime.utcnow() - timedelta(seconds=1)
+    retried = insert_task(status="processing", owner="dead", lease_expires_at=expired, attempts=1)
+    exhausted = insert_task(status="processing", owner="dead", lease_expires_at=expired, attempts=TASK_MAX_ATTEMPTS)
+
+    handlers[0]._recover_expired_leases(datetime.utcnow())
+
+    assert db.scheduled_tasks.find_one({"_id": retried})["status"] == "pending"
+    failed = db.scheduled_tasks.find_one({"_id": exhausted})
+    assert failed["status"] == "failed"
+    assert "owner" not in failed and "lease_expires_at" not in failed
+
+# ============== Batching Tests ==============
+def test_items_for_one_group_share_a_pending_task(handlers):
+    """Feedback for the same user within the window lands in one task; other users get their own"""
+    first = handlers[0].schedule_batched_task(TASK_NAME, "user-a", {"feedback_id": "1"}, delay_in_seconds=60)
+    second = handlers[1].schedule_batched_task(TASK_NAME, "user-a", {"feedback_id": "2"}, delay_in_seconds=60)
+    other = handlers[0].schedule_batched_task(TASK_NAME, "user-b", {"feedback_id": "3"}, delay_in_seconds=60)
+
+    assert first == second != other
+    task = db.scheduled_tasks.find_one({"_id": ObjectId(first)})
+    assert task["data"] == {"group_key": "user-a", "items": [{"feedback_id": "1"}, {"feedback_id": "2"}]}
+    assert task["status"] == "pending"
+
+def test_only_one_pending_batch_per_group(handlers):
+    """The unique index rejects a second pending batch for a group, but not other pending tasks"""
+    handlers[0]._ensure_indexes()
+    insert_task(data={"group_key": "user-a", "items": []})
+    insert_task()
+    insert_task()
+
+    with pytest.raises(DuplicateKeyError):
+        insert_task(data={"group_key": "user-a", "items": []})
+
+def test_batch_upsert_retries_after_losing_a_race(handlers, monkeypatch):
+    """An upsert rejected by the unique index is retried and joins the existing batch"""
+    first = handlers[0].schedule_batched_task(TASK_NAME, "user-a", {"feedback_id": "1"})
+    collection_type = type(db.scheduled_tasks)
+    find_one_and_update = collection_type.find_one_and_update
+    attempts = []
+
+    def racing_find_one_and_update(self, *args, **kwargs):
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise DuplicateKeyError("E11000 duplicate key error")
+        return find_one_and_update(self, *args, **kwargs)
+
+    monkeypatch.setattr(collection_type, "find_one_and_update", racing_find_one_and_update)
+
+    second = handlers[1].schedule_batched_task(TASK_NAME, "user-a", {"feedback_id": "2"})
+
+    assert second == first
+    assert len(attempts) == 2
+    assert db.scheduled_tasks.find_one({"_id": ObjectId(first)})["data"]["items"] == [{"feedback_id": "1"}, {"feedback_id": "2"}]
+
+def test_claimed_batch_is_not_extended(handlers):
+    """Once a batch is running, new items start the next batch"""
+    first = handlers[0].schedule_batched_task(TASK_NAME, "user-a", {"feedback_id": "1"})
+    handlers[0]._claim_task(first)
+
+    second = handlers[0].schedule_batched_task(TASK_NAME, "user-a", {"feedback_id": "2"})
+
+    assert second != first
+    assert db.scheduled_tasks.find_one({"_id": ObjectId(first)})["data"]["items"] == [{"feedback_id": "1"}]
+
+# ============== Retention Tests ==============
+@pytest.mark.parametrize("fail, status", [(False, "completed"), (True, "failed")])
+def test_finished_tasks_expire(handlers, fail, status):
+    """Completed and failed tasks get an expire_at for the TTL index; failed ones await archiving"""
+    task_id = insert_task(data={"fail": fail})
+
+    handlers[0]._run_task(str(task_id))
+
+    task = db.scheduled_tasks.find_one({"_id": task_id})
+    assert task["status"] == status
+    assert task["expire_at"] > datetime.utcnow()
+    assert task.get("archived") is (False if fail else None)
+
+def test_maintenance_archives_failed_tasks_once(handlers, tmp_path, monkeypatch):
+    """Failed tasks are written to the node-local archive and flagged, so the next run skips them"""
+    monkeypatch.setattr(event_handler_module, "TASK_ARCHIVE_DIR", str(tmp_path))
+    task_id = insert_task(data={"fail": True})
+    handlers[0]._run_task(str(task_id))
+
+    handlers[0]._handle_scheduled_tasks_maintenance({})
+    handlers[0]._handle_scheduled_tasks_maintenance({})
+
+    archived = [json.loads(line) for path in tmp_path.iterdir() for line in path.read_text().splitlines()]
+    assert [task["_id"] for task in archived].count(str(task_id)) == 1
+    task = db.scheduled_tasks.find_one({"_id": task_id})
+    assert task["archived"] is True and task["archived_at"]
@@ -0,0 +1,130 @@
+import os
+import sys
+import random
+import numpy as np
+import pytest
+from bson import ObjectId
+from datetime import datetime, timedelta
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config.database import db
+from app.utils.schedulers import DAY_MILLISECONDS, SCHEDULERS, interval_days, interval_expression
+
+TEST_USER_ID = ObjectId()
+
+@pytest.fixture(autouse=True)
+def setup_teardown():
+    """Fixture to clear the test user's mistakes before and after each test"""
+    db.mistakes.delete_many({"user_id": TEST_USER_ID})
+    yield
+    db.mistakes.delete_many({"user_id": TEST_USER_ID})
+
+def reference_time() -> datetime:
+    """Current time truncated to milliseconds, the precision MongoDB stores"""
+    now = datetime.utcnow()
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+def insert_mistakes(scheduler, now: datetime, count: int = 200, seed: int = 11) -> list:
+    """Insert mistakes with the scheduler's own states, other schedulers' states and no state at all"""
+    rng = random.Random(seed)
+    mistakes = []
+    for _ in range(count):
+        practice_count = rng.randint(0, 8)
+        mistake = {"user_id": TEST_USER_ID, "type": "GRAMMAR", "practice_count": practice_count}
+        kind = rng.random()
+        if kind < 0.6:
+            mistake["srs"] = scheduler.replay(practice_count, rng.randint(0, practice_count))
+        elif kind < 0.8:
+            other = rng.choice([other for other in SCHEDULERS.values() if other is not scheduler])
+            mistake["srs"] = other.replay(practice_count, practice_count)
+        if rng.random() < 0.9:
+            mistake["last_practiced"] = now - timedelta(milliseconds=rng.randint(0, 40 * 86400 * 1000))
+        mistakes.append(mistake)
+
+    db.mistakes.insert_many(mistakes)
+    return sorted(mistakes, key=lambda mistake: mistake["_id"])
+
+def python_review(scheduler, mistake: dict, was_successful: bool, now: datetime) -> dict:
+    """The state the Python form computes for a practice at `now`"""
+    last_practiced = mistake.get("last_practiced")
+    elapsed_days = max(0.0, (now - last_practiced).total_seconds() / 86400) if last_practiced else 0.0
+    return scheduler.review(scheduler.state_of(mistake), mistake.get("practice_count", 0), was_successful, elapsed_days)
+
+# ============== Parity Tests ==============
+@pytest.mark.parametrize("name", sorted(SCHEDULERS))
+@pytest.mark.parametrize("was_successful", [True, False])
+def test_review_expression_matches_python(name, was_successful):
+    """The aggregation form computes the same state and interval as `review`"""
+    scheduler = SCHEDULERS[name]
+    now = reference_time()
+    mistakes = insert_mistakes(scheduler, now)
+
+    actual = list(db.mistakes.aggregate([
+        {"$match": {"user_id": TEST_USER_ID}},
+        {"$sort": {"_id": 1}},
+        {"$set": {"next_srs": scheduler.review_expression(was_successful, now)}},
+        {"$set": {"interval_ms": interval_expression("$next_srs")}}
+    ]))
+
+    expected = [python_review(scheduler, mistake, was_successful, now) for mistake in mistakes]
+    assert [m["_id"] for m in actual] == [m["_id"] for m in mistakes]
+    assert [m["next_srs"]["a"] for m in actual] == [state["a"] for state in expected]
+    assert [m["next_srs"]["s"] for m in actual] == pytest.approx([state["s"] for state in expected])
+    assert [m["next_srs"]["d"] for m in actual] == pytest.approx([state["d"] for state in expected])
+    assert [m["interval_ms"] for m in actual] == pytest.approx(
+        [round(interval_days(state) * DAY_MILLISECONDS) for state in expected], abs=1
+    )
+
+def test_interval_expression_applies_offsets():
+    """Load smoothing offsets are looked up by the interval rounded to whole days"""
+    offsets = [day % 3 - 1 for day in range(31)]
+    states = [{"a": "exponential", "s": s, "d": 0.0} for s in (0.0, 4 / 24, 1.0, 2.4, 2.6, 16.0, 45.0)]
+    db.mistakes.insert_many([{"user_id": TEST_USER_ID, "srs": state} for state in states])
+
+    actual = list(db.mistakes.aggregate([
+        {"$match": {"user_id": TEST_USER_ID}},
+        {"$sort": {"_id": 1}},
+        {"$project": {"interval_ms": interval_expression(offsets=offsets)}}
+    ]))
+
+    expected = [
+        round((interval_days(state) + offsets[round(interval_days(state))]) * DAY_MILLISECONDS)
+        for state in states
+    ]
+    assert [m["interval_ms"] for m in actual] == expected
+
+def random_states(scheduler, count: int = 500, seed: int = 5):
+    """Columns of states reached by replaying random practice histories"""
+    rng = random.Random(seed)
+    practice_counts, states = [], []
+    for _ in range(count):
+        practice_count = rng.randint(0, 10)
+        practice_counts.append(practice_count)
+        states.append(scheduler.replay(practice_count, rng.randint(0, practice_count)))
+    was_successful = [rng.random() < 0.7 for _ in range(count)]
+    elapsed_days = [rng.uniform(0, 45) for _ in range(count)]
+    return states, practice_counts, was_successful, elapsed_days
+
+# ============== Batch Parity Tests ==============
+@pytest.mark.parametrize("name", sorted(SCHEDULERS))
+def test_review_batch_matches_python(name):
+    """The array form used by the load simulation gives the same states as `review`"""
+    scheduler = SCHEDULERS[name]
+    states, practice_counts, was_successful, elapsed_days = random_states(scheduler)
+
+    stability, difficulty = scheduler.review_batch(
+        np.array([state["s"] for state in states]),
+        np.array([state["d"] for state in states]),
+        np.array(practice_counts),
+        np.array(was_successful),
+        np.array(elapsed_days)
+    )
+
+    expected = [
+        scheduler.review(state, count, success, elapsed)
+        for state, count, success, elapsed in zip(states, practice_counts, was_successful, elapsed_days)
+    ]
+    assert list(stability) == pytest.approx([state["s"] for state in expected])
+    assert list(difficulty) == pytest.approx([state["d"] for state in expected])
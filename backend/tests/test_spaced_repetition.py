@@ -0,0 +1,119 @@
+import os
+import sys
+import random
+import pytest
+from datetime import datetime, timedelta, timezone
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.spaced_repetition import prioritize_mistakes_for_review, score_mistakes
+
+NOW = datetime(2024, 6, 1, 12, 0, 0)
+
+
+def reference_priority(mistake: dict, now: datetime) -> float:
+    """The scoring formula computed one mistake at a time"""
+    def days_before(value):
+        if value is None:
+            return 0
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return (now - value).days
+
+    days_since = days_before(mistake.get("last_occurred"))
+    days_overdue = days_before(mistake.get("next_practice_date"))
+    recency_factor = 1 / (1 + days_since * 0.1)
+    failed_factor = min(1.0, mistake.get("failed_practices", 0) * 0.2)
+    if days_overdue > 0:
+        due_factor = 1.0 + min(1.0, days_overdue * 0.1)
+    else:
+        due_factor = max(0.1, 1.0 + days_overdue * 0.1)
+    return (
+        min(5, mistake.get("frequency", 1)) * 2.0 +
+        mistake.get("severity", 3) * 1.5 +
+        recency_factor * 5.0 +
+        failed_factor * 3.0 +
+        due_factor * 5.0
+    )
+
+
+def make_mistakes(count: int, seed: int = 3) -> list:
+    """Mistakes covering ties, missing fields, ISO string and aware dates, and inactive items"""
+    rng = random.Random(seed)
+    mistakes = []
+    for index in range(count):
+        last_occurred = NOW - timedelta(hours=rng.randint(0, 40 * 24))
+        next_practice = NOW + timedelta(hours=rng.randint(-20 * 24, 20 * 24))
+        mistake = {
+            "index": index,
+            "frequency": rng.randint(1, 8),
+            "severity": rng.randint(1, 5),
+            "failed_practices": rng.randint(0, 6),
+            "in_drill_queue": rng.random() > 0.1,
+            "last_occurred": last_occurred,
+            "next_practice_date": next_practice
+        }
+        variant = rng.random()
+        if variant < 0.1:
+            mistake["last_occurred"] = last_occurred.isoformat() + "Z"
+        elif variant < 0.2:
+            mistake["next_practice_date"] = next_practice.replace(tzinfo=timezone.utc)
+        elif variant < 0.3:
+            for field in ("frequency", "severity", "failed_practices", "next_practice_date"):
+                mistake.pop(field)
+        mistakes.append(mistake)
+    return mistakes
+
+
+def reference_order(mistakes: list, limit: int) -> list:
+    """Indexes of the active mistakes by descending priority, ties in input order"""
+    active = [mistake for mistake in mistakes if mistake.get("in_drill_queue", True)]
+    ranked = sorted(active, key=lambda mistake: -reference_priority(mistake, NOW))
+    return [mistake["index"] for mistake in ranked[:limit]]
+
+
+# ============== Scoring Tests ==============
+def test_scores_match_the_reference_formula():
+    """Every active mistake scores what the per-item formula gives; inactive ones score -1"""
+    mistakes = make_mistakes(200)
+
+    scores = score_mistakes(mistakes, NOW)
+
+    expected = [
+        reference_priority(mistake, NOW) if mistake.get("in_drill_queue", True) else -1.0
+        for mistake in mistakes
+    ]
+    assert scores.tolist() == pytest.approx(expected)
+
+
+# ============== Top-k Tests ==============
+@pytest.mark.parametrize("limit", [0, 1, 10, 57, 500])
+def test_top_k_matches_a_full_stable_sort(limit):
+    """Selecting with argpartition returns the same mistakes, in the same order, as sorting them all"""
+    mistakes = make_mistakes(300)
+
+    prioritized = prioritize_mistakes_for_review(mistakes, limit=limit, now=NOW)
+
+    assert [mistake["index"] for mistake in prioritized] == reference_order(mistakes, limit)
+    assert all(
+        mistake["priority_score"] == pytest.approx(reference_priority(mistake, NOW))
+        for mistake in prioritized
+    )
+
+
+def test_ties_at_the_cut_off_keep_input_order():
+    """Identical mistakes are returned in input order, even when the limit splits them"""
+    mistakes = [{"index": index, "last_occurred": NOW, "next_practice_date": NOW} for index in range(8)]
+
+    prioritized = prioritize_mistakes_for_review(mistakes, limit=3, now=NOW)
+
+    assert [mistake["index"] for mistake in prioritized] == [0, 1, 2]
+
+
+def test_no_active_mistakes():
+    """Empty input and mistakes outside the drill queue give nothing to review"""
+    assert prioritize_mistakes_for_review([], now=NOW) == []
+    assert prioritize_mistakes_for_review([{"in_drill_queue": False}], now=NOW) == []
@@ -0,0 +1,73 @@
+import os
+import sys
+import pytest
+from datetime import datetime, timedelta
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.task_metrics import Histogram, TaskMetrics
+
+QUEUE_STATS = {
+    "depth": [{"status": "pending", "task_name": "process_feedback_for_mistakes", "count": 4}],
+    "oldest_pending_age_seconds": 12.5
+}
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    """Task metrics with fixed queue statistics instead of database reads"""
+    metrics = TaskMetrics()
+    monkeypatch.setattr(metrics, "get_queue_stats", lambda: {**QUEUE_STATS, "depth": list(QUEUE_STATS["depth"])})
+    return metrics
+
+
+# ============== Histogram Tests ==============
+def test_histogram_buckets_are_cumulative():
+    """Each bucket counts every observation at or below its bound, +Inf counts all"""
+    histogram = Histogram((1, 5))
+    for value in (0.5, 1, 3, 10):
+        histogram.observe(value)
+
+    assert histogram.to_dict() == {
+        "buckets": [{"le": 1, "count": 2}, {"le": 5, "count": 3}, {"le": "+Inf", "count": 4}],
+        "sum": 14.5,
+        "count": 4
+    }
+
+
+# ============== Task Metrics Tests ==============
+def test_snapshot_counts_outcomes_per_task(metrics):
+    """Lag, duration and outcomes are kept per task name"""
+    started = datetime.utcnow()
+    metrics.observe_start("a", started - timedelta(seconds=3), started)
+    metrics.observe_start("a", None, started)
+    metrics.observe_finish("a", 0.2, succeeded=True)
+    metrics.observe_finish("a", 0.4, succeeded=False)
+    metrics.observe_finish("b", 1.0, succeeded=True)
+
+    tasks = metrics.get_snapshot()["tasks"]
+
+    assert (tasks["a"]["completed"], tasks["a"]["failed"]) == (1, 1)
+    assert tasks["a"]["lag_seconds"]["count"] == 1
+    assert tasks["a"]["lag_seconds"]["sum"] == pytest.approx(3)
+    assert tasks["b"]["lag_seconds"] is None
+    assert tasks["b"]["duration_seconds"]["count"] == 1
+
+
+def test_prometheus_exposition(metrics):
+    """Gauges, counters and histograms are rendered with their labels"""
+    metrics.observe_start("a", datetime(2024, 1, 1, 0, 0, 0), datetime(2024, 1, 1, 0, 0, 2))
+    metrics.observe_finish("a", 0.03, succeeded=True)
+
+    lines = metrics.render_prometheus().splitlines()
+
+    assert 'scheduled_tasks_queue_depth{status="pending",task_name="process_feedback_for_mistakes"} 4' in lines
+    assert "scheduled_tasks_oldest_pending_age_seconds 12.5" in lines
+    assert 'scheduled_tasks_completed_total{task_name="a"} 1' in lines
+    assert 'scheduled_tasks_failed_total{task_name="a"} 0' in lines
+    assert 'scheduled_tasks_lag_seconds_bucket{task_name="a",le="1"} 0' in lines
+    assert 'scheduled_tasks_lag_seconds_bucket{task_name="a",le="5"} 1' in lines
+    assert 'scheduled_tasks_duration_seconds_bucket{task_name="a",le="+Inf"} 1' in lines
+    assert 'scheduled_tasks_duration_seconds_count{task_name="a"} 1' in lines
+    assert "# TYPE scheduled_tasks_lag_seconds histogram" in lines
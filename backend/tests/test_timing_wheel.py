@@ -0,0 +1,98 @@
+import os
+import sys
+import math
+import random
+import pytest
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.timing_wheel import TimingWheel
+
+
+@pytest.fixture
+def wheel():
+    """A small wheel: two levels of four slots cover 16 ticks, later items overflow"""
+    return TimingWheel(tick_seconds=1.0, slots_per_level=4, levels=2, start=0.0)
+
+
+# ============== Advance Tests ==============
+def test_items_due_now_are_ready_immediately(wheel):
+    """An item due at or before the current tick is returned by the next advance"""
+    wheel.add(0.0, "now")
+    wheel.add(-5.0, "late")
+
+    assert wheel.next_deadline() == 0.0
+    assert wheel.advance(0.0) == ["now", "late"]
+    assert len(wheel) == 0
+
+
+def test_items_are_never_emitted_early(wheel):
+    """A due time between ticks is rounded up to the next tick"""
+    wheel.add(2.5, "item")
+
+    assert wheel.advance(2.9) == []
+    assert wheel.advance(3.0) == ["item"]
+
+
+def test_items_cascade_through_every_level(wheel):
+    """Level-0, level-1 and overflow items each come out exactly on their tick"""
+    due_times = {"level0": 3, "level1": 9, "overflow": 40, "far_overflow": 75}
+    for name, due in due_times.items():
+        wheel.add(due, name)
+
+    emitted = {}
+    for tick in range(100):
+        for name in wheel.advance(tick):
+            emitted[name] = tick
+
+    assert emitted == due_times
+    assert len(wheel) == 0
+
+
+def test_long_jump_returns_items_in_due_order(wheel):
+    """One advance over a long idle period returns everything due, ordered by due time"""
+    wheel.add(50, "c")
+    wheel.add(7, "b")
+    wheel.add(7, "b2")
+    wheel.add(2, "a")
+
+    assert wheel.advance(1000) == ["a", "b", "b2", "c"]
+
+
+def test_matches_a_sorted_reference():
+    """Random adds and advances emit the same items at the same ticks as a sorted list"""
+    rng = random.Random(42)
+    wheel = TimingWheel(tick_seconds=0.5, slots_per_level=8, levels=3, start=100.0)
+    pending = []
+    now = 100.0
+    for step in range(300):
+        for _ in range(rng.randint(0, 3)):
+            due = now + rng.uniform(-1, 400)
+            wheel.add(due, (due, step))
+            pending.append((due, step))
+
+        now += rng.choice([0.1, 0.5, 3, 40])
+        expected = sorted(item for item in pending if math.ceil(item[0] / 0.5) <= math.floor(now / 0.5))
+        pending = [item for item in pending if item not in expected]
+
+        assert sorted(wheel.advance(now)) == expected
+        assert len(wheel) == len(pending)
+
+
+# ============== Deadline Tests ==============
+def test_next_deadline_is_none_when_empty(wheel):
+    """An empty wheel has nothing to wait for"""
+    assert wheel.next_deadline() is None
+
+
+def test_next_deadline_never_passes_the_earliest_item(wheel):
+    """The deadline is the earliest item or an earlier cascade, never later"""
+    wheel.add(13, "item")
+
+    deadline = wheel.next_deadline()
+    while not wheel.advance(deadline):
+        assert deadline <= 13
+        deadline = wheel.next_deadline()
+
+    assert deadline == 13
@@ -0,0 +1,84 @@
+import os
+import sys
+import asyncio
+import httpx
+import pytest
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.tts_client_service import TTSClient
+
+
+def make_client(handler):
+    """A TTS client whose shared HTTP client answers with `handler`"""
+    tts = TTSClient()
+    tts._client = httpx.AsyncClient(base_url="http://tts.test", transport=httpx.MockTransport(handler))
+    return tts
+
+
+def audio(request):
+    """A TTS response with a short body"""
+    return httpx.Response(200, content=b"audio")
+
+
+# ============== Stream Accounting Tests ==============
+def test_stream_is_in_flight_until_closed():
+    """An open response counts as in flight; closing it twice releases it once"""
+    async def scenario():
+        tts = make_client(audio)
+        response = await tts.open_stream("POST", "/v1/audio/speech", json={"input": "hi"})
+        in_flight = tts.in_flight
+        await tts.close_stream(response)
+        await tts.close_stream(response)
+        await tts.close()
+        return tts, response, in_flight
+
+    tts, response, in_flight = asyncio.run(scenario())
+
+    assert in_flight == 1
+    assert tts.in_flight == 0
+    assert response.is_closed
+    snapshot = tts.get_snapshot()
+    assert (snapshot["requests"], snapshot["peak_in_flight"], snapshot["errors"]) == (1, 1, 0)
+    assert snapshot["response_seconds"]["count"] == 1
+
+
+def test_peak_counts_concurrent_streams():
+    """Streams open at the same time all count towards the peak"""
+    async def scenario():
+        tts = make_client(audio)
+        responses = await asyncio.gather(*[tts.open_stream("GET", "/health") for _ in range(3)])
+        in_flight = tts.in_flight
+        for response in responses:
+            await tts.close_stream(response)
+        await tts.close()
+        return tts, in_flight
+
+    tts, in_flight = asyncio.run(scenario())
+
+    assert in_flight == 3
+    assert tts.peak_in_flight == 3
+    assert tts.in_flight == 0
+
+
+@pytest.mark.parametrize("error, counter", [
+    (httpx.ConnectError("refused"), "errors"),
+    (httpx.PoolTimeout("pool full"), "pool_timeouts")
+])
+def test_failed_request_is_not_left_in_flight(error, counter):
+    """Errors are counted by kind and never leak an in-flight slot"""
+    def failing(request):
+        raise error
+
+    async def scenario():
+        tts = make_client(failing)
+        with pytest.raises(type(error)):
+            await tts.open_stream("GET", "/health")
+        await tts.close()
+        return tts
+
+    tts = asyncio.run(scenario())
+
+    assert getattr(tts, counter) == 1
+    assert tts.in_flight == 0